@@ -1,11 +1,109 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 from .models import (Class, Enrollment, Institution, Preferences, Profile,
                      WaitingList)
 
-admin.site.register(Class)
-admin.site.register(Profile)
-admin.site.register(Enrollment)
-admin.site.register(Institution)
-admin.site.register(Preferences)
-admin.site.register(WaitingList)
+# Unfiltered changelists of tables estimated above this size show the
+# estimate instead of running COUNT(*).
+ESTIMATE_ABOVE = 100_000
+
+
+def estimated_row_count(model, using: str = 'default') -> int | None:
+    """Returns the row count the database keeps in its statistics.
+        None on databases without cheap table statistics."""
+    connection = connections[using]
+    table = model._meta.db_table  # pylint: disable=protected-access
+    if connection.vendor == 'mysql':
+        sql = ("SELECT TABLE_ROWS FROM information_schema.TABLES "
+               "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s")
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator estimating the size of big unfiltered tables."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > ESTIMATE_ABOVE:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin for tables too big to count or list without indexes."""
+    paginator = EstimatedCountPaginator
+    # Skips the second, unfiltered COUNT(*) of filtered changelists.
+    show_full_result_count = False
+    ordering = ['-id']
+
+
+@admin.register(Institution)
+class InstitutionAdmin(admin.ModelAdmin):
+    list_display = ['short_code', 'name', 'city', 'country']
+    search_fields = ['short_code', 'name']
+
+
+@admin.register(Class)
+class ClassAdmin(admin.ModelAdmin):
+    list_display = ['short_code', 'long_name', 'institution', 'instructor']
+    list_select_related = ['institution', 'instructor']
+    search_fields = ['short_code', 'long_name']
+    autocomplete_fields = ['institution', 'instructor']
+
+
+@admin.register(Profile)
+class ProfileAdmin(LargeTableAdmin):
+    list_display = ['user', 'account_type', 'streak_days', 'time_zone']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user']
+
+
+@admin.register(Preferences)
+class PreferencesAdmin(LargeTableAdmin):
+    list_display = ['user', 'language', 'email_notifications']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user']
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ['student', 'class_id', 'date_enrolled']
+    list_select_related = ['student', 'class_id']
+    list_filter = ['date_enrolled']
+    search_fields = ['=student__username', '=class_id__short_code']
+    autocomplete_fields = ['student', 'class_id']
+
+
+@admin.register(WaitingList)
+class WaitingListAdmin(LargeTableAdmin):
+    list_display = ['email', 'is_registered', 'date_joined']
+    list_filter = ['is_registered', 'date_joined']
+    # Prefix searches can use the email index.
+    search_fields = ['^email']
+    actions = ['mark_registered', 'mark_not_registered']
+
+    @admin.action(description="Mark selected entries as registered")
+    def mark_registered(self, request, queryset):
+        updated = queryset.update(is_registered=True)
+        self.message_user(request, f"Marked {updated} entries as registered.")
+
+    @admin.action(description="Mark selected entries as not registered")
+    def mark_not_registered(self, request, queryset):
+        updated = queryset.update(is_registered=False)
+        self.message_user(request,
+                          f"Marked {updated} entries as not registered.")
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from accounts import signals  # pylint: disable=import-outside-toplevel,unused-import
+        # Times the queries of every connection, see SLOW_QUERIES.
+        from capitalize import slowqueries  # pylint: disable=import-outside-toplevel,unused-import
@@ -0,0 +1,34 @@
+"""
+    Enrollment sets.
+    The ids of the classes each user is enrolled in, cached so scoping
+    reads to a user's classes costs no join. Enrollment signals drop a
+    user's set once the change commits.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import Enrollment
+
+CACHE_KEY = 'enrolled_classes_{}'
+# Bounds how long a set missed by an invalidation can be served.
+CACHE_TTL = 60 * 60
+
+
+def enrolled_class_ids(user_id: int) -> frozenset:
+    """Returns the ids of the classes the user is enrolled in."""
+    key = CACHE_KEY.format(user_id)
+    class_ids = cache.get(key)
+    if class_ids is None:
+        # pylint: disable=no-member
+        class_ids = frozenset(
+            Enrollment.objects.filter(student_id=user_id).values_list(
+                'class_id', flat=True))
+        cache.set(key, class_ids, CACHE_TTL)
+    return class_ids
+
+
+def invalidate_enrolled_classes(*user_ids: int):
+    """Drops the cached sets of the users once the transaction commits."""
+    keys = [CACHE_KEY.format(user_id) for user_id in set(user_ids) if user_id]
+    transaction.on_commit(lambda: cache.delete_many(keys))
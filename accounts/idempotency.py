@@ -0,0 +1,145 @@
+"""
+    Idempotency keys.
+    Replays the stored response of a POST retried with the same
+    `Idempotency-Key` header instead of running the view again.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from accounts.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+CACHE_KEY = 'idempotency_{}'
+LOCK_KEY = 'idempotency_lock_{}'
+LOCK_TIMEOUT = 60
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    HEADER,
+    str,
+    OpenApiParameter.HEADER,
+    description="Unique key of the request. Retries with the same key "
+    "replay the first successful response instead of running again.")
+
+
+class KeyInUse(exceptions.APIException):
+    """Raised when a request with the same key is still running."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this idempotency key is in progress."
+    default_code = 'idempotency_key_in_use'
+
+
+class KeyMismatch(exceptions.APIException):
+    """Raised when a key is reused for a different request body."""
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This idempotency key was used for a different request."
+    default_code = 'idempotency_key_mismatch'
+
+
+def digest(value: str) -> str:
+    """Returns the hex SHA-256 digest of a string."""
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def scoped_key(request, key: str) -> str:
+    """Scopes a client key to the user, method and path of the request."""
+    user = request.user.pk if request.user.is_authenticated else ''
+    return digest(f"{user}:{request.method}:{request.path}:{key}")
+
+
+def fingerprint(request) -> str:
+    """Returns a digest of the request body."""
+    return digest(json.dumps(request.data, sort_keys=True, cls=JSONEncoder))
+
+
+def lookup(key: str, database: bool = True) -> dict | None:
+    """Returns the stored response of a key, from the cache or database."""
+    stored = cache.get(CACHE_KEY.format(key))
+    if stored is not None or not database:
+        return stored
+    ttl = settings.IDEMPOTENCY['TTL']
+    # pylint: disable=no-member
+    record = IdempotencyKey.objects.filter(
+        key=key,
+        created_at__gte=timezone.now() - timedelta(seconds=ttl)).first()
+    if record is None:
+        return None
+    stored = {
+        'fingerprint': record.fingerprint,
+        'status': record.status_code,
+        'body': record.body
+    }
+    remaining = ttl - (timezone.now() - record.created_at).total_seconds()
+    cache.set(CACHE_KEY.format(key), stored, max(int(remaining), 1))
+    return stored
+
+
+def store(key: str, request_fingerprint: str, response: Response):
+    """Saves a response in the database and the cache."""
+    stored = {
+        'fingerprint': request_fingerprint,
+        'status': response.status_code,
+        'body': json.loads(json.dumps(response.data, cls=JSONEncoder))
+    }
+    # Replaces an expired record of the same key not yet pruned.
+    IdempotencyKey.objects.update_or_create(  # pylint: disable=no-member
+        key=key,
+        defaults={
+            'fingerprint': stored['fingerprint'],
+            'status_code': stored['status'],
+            'body': stored['body'],
+            'created_at': timezone.now()
+        })
+    cache.set(CACHE_KEY.format(key), stored, settings.IDEMPOTENCY['TTL'])
+
+
+def idempotent(method):
+    """Makes an APIView method honour the `Idempotency-Key` header.
+
+    The first successful response for a key is stored for
+    `IDEMPOTENCY["TTL"]` seconds and replayed, with an `Idempotent-Replayed`
+    header, for later requests with the same key. Failed requests are not
+    stored, so they can be retried.
+    """
+
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        client_key = request.headers.get(HEADER)
+        if not client_key:
+            return method(view, request, *args, **kwargs)
+        if len(client_key) > 255:
+            raise exceptions.ValidationError(
+                f"The {HEADER} header must be at most 255 characters long.")
+        key = scoped_key(request, client_key)
+        request_fingerprint = fingerprint(request)
+        stored = lookup(key)
+        if stored is None:
+            if not cache.add(LOCK_KEY.format(key), 1, LOCK_TIMEOUT):
+                raise KeyInUse()
+            try:
+                # The response is cached before the lock is released.
+                stored = lookup(key, database=False)
+                if stored is None:
+                    response = method(view, request, *args, **kwargs)
+                    if status.is_success(response.status_code):
+                        store(key, request_fingerprint, response)
+                    return response
+            finally:
+                cache.delete(LOCK_KEY.format(key))
+        if stored['fingerprint'] != request_fingerprint:
+            raise KeyMismatch()
+        return Response(stored['body'],
+                        status=stored['status'],
+                        headers={'Idempotent-Replayed': 'true'})
+
+    return wrapper
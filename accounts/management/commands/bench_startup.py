@@ -0,0 +1,44 @@
+"""
+    Reports the worker startup cost per imported module.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from capitalize.startup import check_budget, measure_startup
+
+
+class Command(BaseCommand):
+    """Boots a worker under `python -X importtime` and reports the cost."""
+    help = "Measures worker startup time and import cost per module."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit',
+                            type=int,
+                            default=20,
+                            help="Number of modules to report.")
+        parser.add_argument('--top-level',
+                            action='store_true',
+                            help="Only report imports made by the boot.")
+        parser.add_argument('--check',
+                            action='store_true',
+                            help="Fail if the startup budget is exceeded.")
+
+    def handle(self, *args, **options):
+        report = measure_startup()
+        costs = report.top_level() if options['top_level'] else report.imports
+        costs = sorted(costs, key=lambda c: c.cumulative_us,
+                       reverse=True)[:options['limit']]
+
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for cost in costs:
+            self.stdout.write(f"{cost.cumulative_us / 1000:>14.1f} "
+                              f"{cost.self_us / 1000:>9.1f}  {cost.module}")
+        self.stdout.write(f"\nStartup: {report.seconds:.3f}s, "
+                          f"{report.module_count} modules loaded.")
+
+        if options['check']:
+            errors = check_budget(report)
+            if errors:
+                raise CommandError(' '.join(errors))
+            self.stdout.write(self.style.SUCCESS("Within startup budget."))
+
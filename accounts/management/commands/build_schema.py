@@ -0,0 +1,37 @@
+"""
+    Builds the OpenAPI schema artifact served at `/v1/schema/`.
+    Run once per deploy, after the code is in place.
+"""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.schema import generate_schema, write_schema
+
+
+class Command(BaseCommand):
+    """Generates `schema.yml` and its gzip copy from the live URLconf."""
+    help = "Generates the OpenAPI schema artifact served by the API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file',
+                            default=None,
+                            help="Output path. Defaults to SCHEMA_FILE.")
+        parser.add_argument('--check',
+                            action='store_true',
+                            help="Fail if the artifact is out of date.")
+
+    def handle(self, *args, **options):
+        content = generate_schema(validate=True)
+        path = Path(options['file'] or settings.SCHEMA_FILE)
+        if options['check']:
+            if not path.exists() or path.read_bytes() != content:
+                raise CommandError(
+                    f"{path} is out of date. Run `manage.py build_schema`.")
+            self.stdout.write(f"{path} is up to date.")
+            return
+        path = write_schema(content, path)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {path} ({len(content)} bytes)."))
@@ -0,0 +1,90 @@
+"""
+    Backfills `WaitingList.normalized_email` and removes duplicate entries.
+"""
+
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import WaitingList
+from accounts.normalization import normalize_email
+
+
+class Command(BaseCommand):
+    """Walks the wait-list in primary key order, one chunk at a time.
+
+    The oldest entry for each normalized email is kept. Later duplicates
+    are deleted after their registration state and join date are merged
+    into the kept entry. Only one chunk is held in memory; duplicates in
+    other chunks are found through the normalized_email index.
+    """
+    help = "Backfills normalized wait-list emails and removes duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run',
+                            action='store_true',
+                            help="Report changes without writing them.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        last_id = 0
+        updated = deleted = 0
+
+        while True:
+            # pylint: disable=no-member
+            chunk = list(
+                WaitingList.objects.filter(id__gt=last_id).order_by('id')
+                [:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            chunk_updated, chunk_deleted = self.process_chunk(chunk, dry_run)
+            updated += chunk_updated
+            deleted += chunk_deleted
+            self.stdout.write(f"Processed up to id {last_id}: "
+                              f"{updated} normalized, {deleted} duplicates.")
+
+        prefix = "Would have normalized" if dry_run else "Normalized"
+        self.stdout.write(
+            self.style.SUCCESS(f"{prefix} {updated} entries and removed "
+                               f"{deleted} duplicates."))
+
+    def process_chunk(self, chunk, dry_run: bool) -> tuple:
+        """Normalizes one chunk and merges its duplicates."""
+        normalized = {entry.id: normalize_email(entry.email) for entry in chunk}
+        # Entries of later chunks may be normalized already, by a signup
+        # since the deploy; the lowest id of all is kept.
+        # pylint: disable=no-member
+        entries = defaultdict(list)
+        for entry in WaitingList.objects.filter(
+                normalized_email__in=set(normalized.values())).exclude(
+                    id__in=normalized.keys()):
+            entries[entry.normalized_email].append(entry)
+        for entry in chunk:
+            entries[normalized[entry.id]].append(entry)
+
+        to_update, to_delete = {}, []
+        for email, group in entries.items():
+            keeper, *duplicates = sorted(group, key=lambda entry: entry.id)
+            if keeper.normalized_email != email:
+                keeper.normalized_email = email
+                to_update[keeper.id] = keeper
+            for entry in duplicates:
+                to_delete.append(entry.id)
+                keeper.is_registered = (keeper.is_registered
+                                        or entry.is_registered)
+                keeper.date_joined = min(keeper.date_joined,
+                                         entry.date_joined)
+                to_update[keeper.id] = keeper
+
+        if not dry_run:
+            with transaction.atomic():
+                # Duplicates go first so they cannot clash with the index.
+                WaitingList.objects.filter(id__in=to_delete).delete()
+                WaitingList.objects.bulk_update(
+                    to_update.values(),
+                    ['normalized_email', 'is_registered', 'date_joined'])
+        return len(to_update), len(to_delete)
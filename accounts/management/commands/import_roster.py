@@ -0,0 +1,53 @@
+"""
+    Imports institutions, classes and enrollments from a CSV roster.
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.rosters import RosterError, import_roster
+
+
+class Command(BaseCommand):
+    """Streams a roster file of any size, see `accounts.rosters` for the
+        format. Chunks are written as they are validated, so rows before
+        a failure stay imported."""
+    help = "Imports institutions, classes and enrollments from a CSV roster."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV roster, or - for stdin.")
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--dry-run',
+                            action='store_true',
+                            help="Report problems without writing anything.")
+
+    def handle(self, *args, **options):
+        try:
+            if options['path'] == '-':
+                report = import_roster(sys.stdin, options['dry_run'],
+                                       options['chunk_size'])
+            else:
+                with open(options['path'], newline='',
+                          encoding='utf-8-sig') as roster:
+                    report = import_roster(roster, options['dry_run'],
+                                           options['chunk_size'])
+        except (OSError, RosterError) as e:
+            raise CommandError(str(e)) from e
+
+        for error in report['errors']:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        unlisted = report['error_count'] - len(report['errors'])
+        if unlisted:
+            self.stderr.write(f"... and {unlisted} more.")
+        prefix = "Would have imported" if options['dry_run'] else "Imported"
+        summary = (f"{prefix} {report['rows']} rows: "
+                   f"{report['institutions']} institutions, "
+                   f"{report['classes']} classes, "
+                   f"{report['enrollments']} new enrollments "
+                   f"({report['existing_enrollments']} existing), "
+                   f"{report['error_count']} rejected.")
+        if report['error_count']:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,25 @@
+"""
+    Deletes idempotency keys older than their TTL.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    """Prunes idempotency keys that no longer replay."""
+    help = "Deletes idempotency keys older than IDEMPOTENCY['TTL']."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.IDEMPOTENCY['TTL'])
+        # pylint: disable=no-member
+        deleted, _ = IdempotencyKey.objects.filter(
+            created_at__lt=cutoff).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} idempotency keys."))
@@ -0,0 +1,32 @@
+"""
+    Counts the last day of activity towards every profile's streak.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.streaks import update_streaks
+
+
+class Command(BaseCommand):
+    """Updates `Profile.streak_days`.
+        Meant to run hourly, each profile is counted once its local day
+        ends. Pass --date to count a missed day, oldest first."""
+    help = "Updates activity streaks for the day that just ended."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date',
+                            help="Local day to count, as YYYY-MM-DD. "
+                            "Defaults to yesterday in each time zone.")
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError as ve:
+                raise CommandError("--date must be YYYY-MM-DD.") from ve
+        updated = update_streaks(day, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} streaks."))
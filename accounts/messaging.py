@@ -1,11 +1,16 @@
-import boto3
+import logging
+
 from django.contrib.auth.models import User
 
+logger = logging.getLogger(__name__)
+
 
 class EmailService:
     """Service for sending emails using AWS SES"""
 
     def __init__(self):
+        # boto3 is imported on first use to keep it out of worker startup.
+        import boto3  # pylint: disable=import-outside-toplevel
         self.ses = boto3.client('ses')
 
     def send_invite_email(self, user: User):
@@ -36,14 +41,17 @@ class EmailService:
                     }
                 },
                 ReplyToAddresses=["no-reply@capitalizelearning.com"])
-            print(res)
-            return res
-        except Exception as e:
-            print(e)
-            raise e 
+        except Exception:
+            logger.exception("Sending an invite email failed",
+                             extra={'user_id': user.id})
+            raise
+        logger.info("Sent an invite email",
+                    extra={
+                        'user_id': user.id,
+                        'message_id': res.get('MessageId')
+                    })
+        return res
 
     def verify_email(self, email: str):
         """Adds an email address to the list of verified email addresses"""
-        res = self.ses.verify_email_identity(EmailAddress=email)
-        print(res)
-        return res
+        return self.ses.verify_email_identity(EmailAddress=email)
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_profile_registration_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waitinglist',
+            name='normalized_email',
+            field=models.CharField(max_length=254, null=True, unique=True),
+        ),
+    ]
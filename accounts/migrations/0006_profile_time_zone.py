@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:47
+
+import accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='last_active_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='time_zone',
+            field=models.CharField(default='UTC', max_length=63, validators=[accounts.models.validate_time_zone]),
+        ),
+    ]
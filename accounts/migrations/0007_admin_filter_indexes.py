@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_profile_time_zone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='enrollment',
+            name='date_enrolled',
+            field=models.DateField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='waitinglist',
+            name='date_joined',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='waitinglist',
+            name='is_registered',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:58
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def remove_duplicate_enrollments(apps, schema_editor):
+    """Keeps the first enrollment of each student in a class."""
+    Enrollment = apps.get_model('accounts', 'Enrollment')
+    duplicates = Enrollment.objects.values('student', 'class_id').annotate(
+        first=Min('id'), count=Count('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        Enrollment.objects.filter(
+            student=duplicate['student'],
+            class_id=duplicate['class_id']).exclude(
+                id=duplicate['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_admin_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_enrollments,
+                             migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='enrollment',
+            unique_together={('student', 'class_id')},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 02:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_enrollment_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='account_type',
+            field=models.CharField(max_length=10),
+        ),
+    ]
@@ -2,15 +2,21 @@
     Account models for the application.
     Contains account related models and their serializers.
 """
+import logging
 from enum import Enum
 from secrets import token_urlsafe
+from zoneinfo import available_timezones
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.utils import IntegrityError
 from rest_framework import exceptions, serializers
 
 from accounts.messaging import EmailService
+from accounts.normalization import normalize_email
+
+logger = logging.getLogger(__name__)
 
 
 class WaitingList(models.Model):
@@ -19,12 +25,18 @@ class WaitingList(models.Model):
 
     id = models.AutoField(primary_key=True)
     email = models.EmailField(unique=True)
-    date_joined = models.DateTimeField(auto_now_add=True)
-    is_registered = models.BooleanField(default=False)
+    # Canonical form of `email`, see `accounts.normalization`.
+    normalized_email = models.CharField(max_length=254, unique=True, null=True)
+    date_joined = models.DateTimeField(auto_now_add=True, db_index=True)
+    is_registered = models.BooleanField(default=False, db_index=True)
 
     def __str__(self):
         return f"<WaitingList: {self.id}>"
 
+    def save(self, *args, **kwargs):
+        self.normalized_email = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
 
 class CreateWaitingListSerializer(serializers.Serializer):
     """Serializer for adding a user to the waiting list."""
@@ -64,6 +76,12 @@ class ProfileType(Enum):
     ADMIN = 'admin'
 
 
+def validate_time_zone(value: str):
+    """Validates an IANA time zone name."""
+    if value not in available_timezones():
+        raise ValidationError(f"Unknown time zone: {value}")
+
+
 class Profile(models.Model):
     """User profile model. 
         Extends the default User model with additional fields through a one-to-one relationship."""
@@ -78,6 +96,11 @@ class Profile(models.Model):
     phone_number = models.CharField(max_length=15, unique=True, blank=True)
     is_2fa_enabled = models.BooleanField(default=False)
     streak_days = models.IntegerField(default=0)
+    # IANA time zone the streak days are counted in, see `accounts.streaks`.
+    time_zone = models.CharField(max_length=63,
+                                 default='UTC',
+                                 validators=[validate_time_zone])
+    last_active_on = models.DateField(null=True, blank=True)
 
     def __init__(self, *args, set_token: bool = False, **kwargs):
         super().__init__(*args, **kwargs)
@@ -146,10 +169,11 @@ class CreateTestUserSerializer(serializers.Serializer):
         except IntegrityError as ie:
             raise exceptions.ValidationError("User already exists") from ie
         except Exception as e:
-            print(e)
-            if user.id:
+            logger.exception("Creating a test user failed",
+                             extra={'waiting_list_id': wl.id})
+            if user is not None and user.id:
                 user.delete()
-            if profile.id:
+            if profile is not None and profile.id:
                 profile.delete()
             raise exceptions.APIException(
                 "An error occurred while creating the test user") from e
@@ -198,8 +222,9 @@ class ProfileSerializer(serializers.HyperlinkedModelSerializer):
         model = Profile
         fields = [
             'id', 'account_type', 'user', 'phone_number', 'is_2fa_enabled',
-            'streak_days'
+            'streak_days', 'time_zone'
         ]
+        read_only_fields = ['streak_days']
 
 
 class Preferences(models.Model):
@@ -299,11 +324,15 @@ class Enrollment(models.Model):
     id = models.AutoField(primary_key=True)
     student = models.ForeignKey(User, on_delete=models.CASCADE)
     class_id = models.ForeignKey(Class, on_delete=models.CASCADE)
-    date_enrolled = models.DateField(auto_now_add=True)
+    date_enrolled = models.DateField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"<Enrollment: {self.student.username} in {self.class_id.long_name}>"  # pylint: disable=no-member
 
+    class Meta:
+        """One enrollment per student and class."""
+        unique_together = ['student', 'class_id']
+
 
 class EnrollmentSerializer(serializers.HyperlinkedModelSerializer):
     """Serializer for the enrollment model."""
@@ -312,3 +341,97 @@ class EnrollmentSerializer(serializers.HyperlinkedModelSerializer):
         """Meta class for the enrollment serializer."""
         model = Enrollment
         fields = ['id', 'student', 'class_id', 'date_enrolled']
+
+
+class IdempotencyKey(models.Model):
+    """Idempotency key model.
+        Stores the response of a request made with an `Idempotency-Key`
+        header so retries can replay it, see `accounts.idempotency`."""
+
+    id = models.AutoField(primary_key=True)
+    # Digest of the key scoped to the user, method and path.
+    key = models.CharField(max_length=64, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    body = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"<IdempotencyKey: {self.key}>"
+
+
+class RosterImportSerializer(serializers.Serializer):
+    """Serializer for a CSV roster upload."""
+    file = serializers.FileField(help_text="CSV roster, UTF-8.")
+    dry_run = serializers.BooleanField(
+        default=False, help_text="Validate the roster without writing it.")
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class RosterRowErrorSerializer(serializers.Serializer):
+    """Serializer for a rejected roster row."""
+    line = serializers.IntegerField()
+    error = serializers.CharField()
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class RosterReportSerializer(serializers.Serializer):
+    """Serializer for the report of a roster import."""
+    rows = serializers.IntegerField()
+    institutions = serializers.IntegerField(
+        help_text="Institutions created or updated.")
+    classes = serializers.IntegerField(help_text="Classes created or updated.")
+    enrollments = serializers.IntegerField(help_text="Enrollments created.")
+    existing_enrollments = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = RosterRowErrorSerializer(
+        many=True, help_text="The first rejected rows, see error_count.")
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class SlowQuerySerializer(serializers.Serializer):
+    """Serializer for a recorded slow query, see `capitalize.slowqueries`."""
+    id = serializers.IntegerField()
+    recorded_at = serializers.DateTimeField()
+    alias = serializers.CharField(help_text="Database alias.")
+    duration_ms = serializers.FloatField()
+    fingerprint = serializers.CharField(
+        help_text="Hash of the normalized SQL, shared by runs of a query.")
+    sql = serializers.CharField(help_text="SQL with its values left out.")
+    callsite = serializers.CharField(
+        allow_null=True, help_text="Innermost project code running it.")
+    stack = serializers.ListField(child=serializers.CharField(),
+                                  help_text="Project frames, innermost first.")
+    request_id = serializers.CharField(allow_null=True)
+    plan = serializers.ListField(child=serializers.DictField(),
+                                 allow_null=True,
+                                 help_text="EXPLAIN output, once requested.")
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
@@ -0,0 +1,45 @@
+"""
+    Email normalization.
+    Maps every spelling of an address to the canonical form used for
+    wait-list deduplication.
+"""
+
+# Domains that are aliases of another provider's domain.
+DOMAIN_ALIASES = {
+    'googlemail.com': 'gmail.com',
+    'hotmail.com': 'outlook.com',
+    'live.com': 'outlook.com',
+    'msn.com': 'outlook.com',
+    'me.com': 'icloud.com',
+    'mac.com': 'icloud.com',
+    'ymail.com': 'yahoo.com',
+}
+
+# Providers that ignore dots in the local part.
+DOTLESS_DOMAINS = {'gmail.com'}
+
+# Separator that starts a sub-address tag, per provider.
+TAG_SEPARATORS = {
+    'gmail.com': '+',
+    'outlook.com': '+',
+    'icloud.com': '+',
+    'fastmail.com': '+',
+    'protonmail.com': '+',
+    'proton.me': '+',
+    'yahoo.com': '-',
+}
+
+
+def normalize_email(email: str) -> str:
+    """Returns the canonical form of an email address.
+        Case and surrounding whitespace are ignored everywhere; dots and
+        sub-address tags are only dropped for providers that ignore them."""
+    local, _, domain = email.strip().casefold().rpartition('@')
+    domain = domain.rstrip('.')
+    domain = DOMAIN_ALIASES.get(domain, domain)
+    separator = TAG_SEPARATORS.get(domain)
+    if separator:
+        local = local.split(separator, 1)[0]
+    if domain in DOTLESS_DOMAINS:
+        local = local.replace('.', '')
+    return f"{local}@{domain}"
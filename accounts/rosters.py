@@ -0,0 +1,358 @@
+"""
+    Roster imports.
+    Upserts institutions, classes and enrollments from a CSV roster with
+    one row per enrollment. The roster is read and written one chunk at a
+    time, so files of any size are imported in bounded memory.
+
+    A row with an `institution_name` creates or updates its institution,
+    a row with a `class_name` creates or updates its class, and a row with
+    a `student` enrolls them in its class. Rows only referencing an
+    institution or class need just its short code. Students and
+    instructors are usernames or email addresses of existing users.
+"""
+
+import csv
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.enrollments import invalidate_enrolled_classes
+from accounts.models import Class, Enrollment, Institution
+from capitalize.db import upsert_options
+
+# CSV column -> model field
+INSTITUTION_COLUMNS = {
+    'institution': 'short_code',
+    'institution_name': 'name',
+    'street_address': 'street_address',
+    'city': 'city',
+    'state': 'state',
+    'postal_code': 'postal_code',
+    'country': 'country',
+    'phone_number': 'phone_number',
+    'contact_person': 'contact_person',
+}
+CLASS_COLUMNS = {
+    'class': 'short_code',
+    'class_name': 'long_name',
+    'class_short_name': 'short_name',
+    'class_description': 'description',
+}
+REQUIRED_COLUMNS = ['class', 'student']
+# Required as soon as the roster defines institutions or classes.
+DEFINITION_COLUMNS = {
+    'institution_name': [
+        'institution', 'street_address', 'city', 'state', 'postal_code',
+        'country'
+    ],
+    'class_name': ['institution', 'instructor'],
+}
+
+
+class RosterError(ValueError):
+    """Raised when a roster cannot be read at all."""
+
+
+def field_error(model, fields: Dict[str, str]) -> str | None:
+    """Returns why values do not fit the model fields, if they do not."""
+    for name, value in fields.items():
+        field = model._meta.get_field(name)  # pylint: disable=protected-access
+        if not value and not field.blank:
+            return f"{name} is required."
+        if field.max_length and len(value) > field.max_length:
+            return f"{name} is longer than {field.max_length} characters."
+    return None
+
+
+class RosterImport:
+    """Imports a roster, see the module docstring for its format."""
+
+    def __init__(self, dry_run: bool = False, chunk_size: int | None = None):
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size or settings.ROSTER_IMPORT['CHUNK_SIZE']
+        self.report = {
+            'rows': 0,
+            'institutions': 0,
+            'classes': 0,
+            'enrollments': 0,
+            'existing_enrollments': 0,
+            'error_count': 0,
+            'errors': [],
+        }
+        self.institution_fields = []
+        self.class_fields = []
+        # Short codes defined by earlier chunks, dry runs do not write them.
+        self.defined_institutions = set()
+        self.defined_classes = set()
+
+    def run(self, lines: Iterable[str]) -> dict:
+        """Imports the roster lines and returns the report."""
+        reader = csv.DictReader(lines)
+        try:
+            columns = set(reader.fieldnames or [])
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise RosterError(f"Unreadable header: {e}") from e
+        missing = [
+            column for column in REQUIRED_COLUMNS if column not in columns
+        ]
+        for column, required in DEFINITION_COLUMNS.items():
+            if column in columns:
+                missing += [
+                    name for name in required
+                    if name not in columns and name not in missing
+                ]
+        if missing:
+            raise RosterError(f"Missing columns: {', '.join(missing)}.")
+        self.institution_fields = [
+            field for column, field in INSTITUTION_COLUMNS.items()
+            if column in columns
+        ]
+        self.class_fields = [
+            field for column, field in CLASS_COLUMNS.items()
+            if column in columns
+        ]
+
+        chunk = []
+        try:
+            for row in reader:
+                chunk.append((reader.line_num, row))
+                if len(chunk) == self.chunk_size:
+                    self.import_chunk(chunk)
+                    chunk = []
+        except csv.Error as e:
+            self.error(reader.line_num, f"Unreadable row, import stopped: {e}")
+        except UnicodeDecodeError as e:
+            # Raised reading the next line, before line_num counts it.
+            self.error(reader.line_num + 1,
+                       f"Unreadable row, import stopped: {e}")
+        if chunk:
+            self.import_chunk(chunk)
+        return self.report
+
+    def error(self, line: int, message: str):
+        """Adds a rejected row to the report."""
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < settings.ROSTER_IMPORT['MAX_ERRORS']:
+            self.report['errors'].append({'line': line, 'error': message})
+
+    def import_chunk(self, chunk: List[tuple]):
+        """Validates and writes a chunk of rows."""
+        institutions = {}
+        classes = {}
+        enrollments = []
+        for line, row in chunk:
+            self.report['rows'] += 1
+            values = {
+                column: (value or '').strip()
+                for column, value in row.items() if column
+            }
+            if values.get('institution_name'):
+                institutions[values['institution']] = (line, {
+                    field: values[column]
+                    for column, field in INSTITUTION_COLUMNS.items()
+                    if column in values
+                })
+            if values.get('class_name'):
+                classes[values['class']] = (line, {
+                    field: values[column]
+                    for column, field in CLASS_COLUMNS.items()
+                    if column in values
+                }, values['institution'], values['instructor'])
+            if values['student']:
+                enrollments.append((line, values['class'], values['student']))
+
+        # One query per kind of row resolves every reference in the chunk.
+        # pylint: disable=no-member
+        institution_codes = set(institutions) | {
+            institution
+            for _, _, institution, _ in classes.values()
+        }
+        phones = {
+            fields.get('phone_number', '')
+            for _, fields in institutions.values()
+        }
+        institution_ids = {}
+        phone_owners = {}
+        for id_, code, phone in Institution.objects.filter(
+                Q(short_code__in=institution_codes)
+                | Q(phone_number__in=phones)).values_list(
+                    'id', 'short_code', 'phone_number'):
+            if code in institution_codes:
+                institution_ids[code] = id_
+            phone_owners[phone] = code
+        class_ids = dict(
+            Class.objects.filter(
+                short_code__in=set(classes)
+                | {code
+                   for _, code, _ in enrollments}).values_list(
+                       'short_code', 'id'))
+        users = self.user_lookup({
+            instructor
+            for _, _, _, instructor in classes.values()
+        } | {student
+             for _, _, student in enrollments})
+
+        valid_institutions = self.check_institutions(institutions,
+                                                     institution_ids,
+                                                     phone_owners)
+        known_institutions = (set(institution_ids) | set(valid_institutions)
+                              | self.defined_institutions)
+        valid_classes = {}
+        for code, (line, fields, institution, instructor) in classes.items():
+            error = field_error(Class, fields)
+            if error is None and institution not in known_institutions:
+                error = f"Unknown institution {institution}."
+            if error is None:
+                error = self.user_error(users, 'instructor', instructor)
+            if error:
+                self.error(line, error)
+            else:
+                valid_classes[code] = (fields, institution, users[instructor])
+        known_classes = (set(class_ids) | set(valid_classes)
+                         | self.defined_classes)
+        pairs = {}
+        for line, code, student in enrollments:
+            error = None if code in known_classes else (
+                f"Unknown class {code}." if code else "class is required.")
+            if error is None:
+                error = self.user_error(users, 'student', student)
+            if error:
+                self.error(line, error)
+            else:
+                pairs.setdefault((code, users[student]), line)
+
+        if not self.dry_run:
+            with transaction.atomic():
+                self.write(valid_institutions, valid_classes, class_ids, pairs)
+        else:
+            existing = self.existing_enrollments(pairs, class_ids)
+            self.report['enrollments'] += len(pairs) - len(existing)
+            self.report['existing_enrollments'] += len(existing)
+        self.report['institutions'] += len(valid_institutions)
+        self.report['classes'] += len(valid_classes)
+        self.defined_institutions.update(valid_institutions)
+        self.defined_classes.update(valid_classes)
+
+    def check_institutions(self, institutions: Dict, institution_ids: Dict,
+                           phone_owners: Dict) -> Dict[str, dict]:
+        """Returns the valid institution rows by short code."""
+        valid = {}
+        for code, (line, fields) in institutions.items():
+            error = field_error(Institution, fields)
+            # Phone numbers are unique, and on MySQL an upsert would update
+            # whichever institution already has the number.
+            phone = fields.get('phone_number',
+                              None if code in institution_ids else '')
+            if error is None and phone is not None:
+                if phone_owners.get(phone, code) != code:
+                    error = (f"phone_number {phone or '(blank)'} belongs to "
+                             f"institution {phone_owners[phone]}.")
+                else:
+                    phone_owners[phone] = code
+            if error:
+                self.error(line, error)
+            else:
+                valid[code] = fields
+        return valid
+
+    @staticmethod
+    def user_lookup(references: set) -> Dict[str, int | None]:
+        """Maps usernames and emails to user ids.
+            Emails shared by several users map to None."""
+        users = {}
+        by_email = {}
+        emails = {reference for reference in references if '@' in reference}
+        for id_, username, email in User.objects.filter(
+                Q(username__in=references)
+                | Q(email__in=emails)).values_list('id', 'username',
+                                                   'email'):
+            if username in references:
+                users[username] = id_
+            if email in emails:
+                by_email[email] = id_ if by_email.get(email,
+                                                      id_) == id_ else None
+        for email, id_ in by_email.items():
+            users.setdefault(email, id_)
+        return users
+
+    @staticmethod
+    def user_error(users: Dict, kind: str, reference: str) -> str | None:
+        """Returns why a user reference does not resolve, if it does not."""
+        if reference not in users:
+            return f"Unknown {kind} {reference}."
+        if users[reference] is None:
+            return f"Several users have the email {reference}."
+        return None
+
+    @staticmethod
+    def existing_enrollments(pairs: Dict, class_ids: Dict) -> set:
+        """Returns the pairs of known classes already enrolled."""
+        ids = {class_ids[code] for code, _ in pairs if code in class_ids}
+        # pylint: disable=no-member
+        enrolled = set(
+            Enrollment.objects.filter(
+                class_id__in=ids,
+                student_id__in={student
+                                for _, student in pairs}).values_list(
+                                    'class_id', 'student_id'))
+        return {(code, student)
+                for code, student in pairs
+                if (class_ids.get(code), student) in enrolled}
+
+    def write(self, institutions: Dict, classes: Dict, class_ids: Dict,
+              pairs: Dict):
+        """Upserts the valid rows of a chunk."""
+        # pylint: disable=no-member
+        if institutions:
+            Institution.objects.bulk_create(
+                [Institution(**fields) for fields in institutions.values()],
+                **upsert_options(['short_code'], [
+                    field for field in self.institution_fields
+                    if field != 'short_code'
+                ]))
+        if classes:
+            # MySQL does not return the ids of upserted rows.
+            institution_ids = dict(
+                Institution.objects.filter(short_code__in={
+                    institution
+                    for _, institution, _ in classes.values()
+                }).values_list('short_code', 'id'))
+            Class.objects.bulk_create(
+                [
+                    Class(institution_id=institution_ids[institution],
+                          instructor_id=instructor,
+                          **fields)
+                    for fields, institution, instructor in classes.values()
+                ], **upsert_options(['short_code'], [
+                    field for field in self.class_fields
+                    if field != 'short_code'
+                ] + ['institution', 'instructor']))
+        missing = {code for code, _ in pairs if code not in class_ids}
+        if missing:
+            class_ids.update(
+                Class.objects.filter(short_code__in=missing).values_list(
+                    'short_code', 'id'))
+        existing = self.existing_enrollments(pairs, class_ids)
+        created = [
+            Enrollment(class_id_id=class_ids[code], student_id=student)
+            for code, student in pairs if (code, student) not in existing
+        ]
+        # Conflicts are enrollments made since the lookup above.
+        Enrollment.objects.bulk_create(created, ignore_conflicts=True)
+        # Bulk inserts send no signals.
+        invalidate_enrolled_classes(
+            *{enrollment.student_id
+              for enrollment in created})
+        self.report['enrollments'] += len(created)
+        self.report['existing_enrollments'] += len(existing)
+
+
+def import_roster(lines: Iterable[str],
+                  dry_run: bool = False,
+                  chunk_size: int | None = None) -> dict:
+    """Imports a roster and returns the report.
+        Dry runs validate the roster without writing it."""
+    return RosterImport(dry_run, chunk_size).run(lines)
@@ -0,0 +1,61 @@
+"""
+    OpenAPI schema artifact.
+    Builds the schema once at deploy time and serves it from disk.
+"""
+
+import gzip
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+
+def generate_schema(validate: bool = False) -> bytes:
+    """Introspects the live URLconf and returns the rendered YAML schema."""
+    # Generation only runs at build time, keep it out of worker startup.
+    # pylint: disable=import-outside-toplevel
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+    from drf_spectacular.settings import spectacular_settings
+    from drf_spectacular.validation import validate_schema
+
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    if validate:
+        validate_schema(schema)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+def write_schema(content: bytes, path: Path | None = None) -> Path:
+    """Writes the schema and its pre-compressed copy next to it."""
+    path = Path(path or settings.SCHEMA_FILE)
+    path.write_bytes(content)
+    gzip_path(path).write_bytes(gzip.compress(content, mtime=0))
+    load_schema.cache_clear()
+    return path
+
+
+def gzip_path(path: Path) -> Path:
+    """Returns the path of the pre-compressed copy of the schema."""
+    return path.with_name(path.name + '.gz')
+
+
+class SchemaArtifact:
+    """The schema file loaded into memory with its gzip copy and ETag."""
+
+    def __init__(self, path: Path):
+        self.content = path.read_bytes()
+        compressed = gzip_path(path)
+        if compressed.exists() and gzip.decompress(
+                compressed.read_bytes()) == self.content:
+            self.compressed = compressed.read_bytes()
+        else:
+            self.compressed = gzip.compress(self.content, mtime=0)
+        self.etag = f'"{hashlib.sha256(self.content).hexdigest()[:32]}"'
+        self.gzip_etag = f'"{self.etag[1:-1]}-gz"'
+
+
+@lru_cache(maxsize=1)
+def load_schema() -> SchemaArtifact:
+    """Loads the schema artifact once per process."""
+    return SchemaArtifact(Path(settings.SCHEMA_FILE))
@@ -0,0 +1,26 @@
+"""
+    Account signal handlers.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.enrollments import invalidate_enrolled_classes
+from accounts.models import Enrollment
+
+
+@receiver(pre_save, sender=Enrollment)
+def remember_enrolled_student(sender, instance: Enrollment, **kwargs):
+    """Keeps the previous student of an enrollment to drop their set."""
+    # pylint: disable=no-member
+    instance.previous_student_id = sender.objects.filter(
+        id=instance.id).values_list('student_id', flat=True).first(
+        ) if instance.id else None
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def drop_enrolled_classes(sender, instance: Enrollment, **kwargs):
+    """Drops the cached class sets of the students of an enrollment."""
+    invalidate_enrolled_classes(
+        instance.student_id, getattr(instance, 'previous_student_id', None))
@@ -0,0 +1,123 @@
+"""
+    Activity streaks.
+    Maintains `Profile.streak_days`, the number of consecutive days with
+    activity, counted in each user's own time zone.
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache, reduce
+from operator import or_
+from typing import Dict, Set
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import Profile
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    """Returns a time zone by name, UTC if it is unknown."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def day_window(zone: ZoneInfo, day: date) -> tuple:
+    """Returns the start and end of a local day as aware datetimes."""
+    return (datetime.combine(day, time.min, zone),
+            datetime.combine(day + timedelta(days=1), time.min, zone))
+
+
+def counted_days(day: date | None) -> Dict[str, date]:
+    """Returns the day counted in each time zone in use, `day` if given,
+        otherwise yesterday there."""
+    now = timezone.now()
+    # pylint: disable=no-member
+    return {
+        zone_name: day or now.astimezone(get_zone(zone_name)).date() -
+        timedelta(days=1)
+        for zone_name in Profile.objects.values_list(
+            'time_zone', flat=True).distinct().order_by()
+    }
+
+
+def active_users(days: Dict[str, date]) -> Set[int]:
+    """Returns the ids of the users with activity on the day counted in
+        their time zone. Runs one query per activity source."""
+    active = set()
+    for label, user_field, time_field in settings.STREAKS['ACTIVITY']:
+        model = apps.get_model(label)
+        conditions = []
+        for zone_name, day in days.items():
+            start, end = day_window(get_zone(zone_name), day)
+            conditions.append(
+                Q(**{
+                    f'{user_field}__profile__time_zone': zone_name,
+                    f'{time_field}__gte': start,
+                    f'{time_field}__lt': end
+                }))
+        active.update(
+            model.objects.filter(reduce(or_, conditions)).values_list(
+                user_field, flat=True).distinct().order_by())
+    return active
+
+
+def advance(profile: Profile, day: date, active: bool) -> bool:
+    """Moves a streak to the end of `day`; returns whether it changed.
+        Counting a day twice changes nothing, so runs can be repeated."""
+    if active:
+        if profile.last_active_on is not None and profile.last_active_on >= day:
+            return False
+        continued = profile.last_active_on == day - timedelta(days=1)
+        profile.streak_days = profile.streak_days + 1 if continued else 1
+        profile.last_active_on = day
+        return True
+    if profile.streak_days and (profile.last_active_on is None
+                                or profile.last_active_on < day):
+        profile.streak_days = 0
+        return True
+    return False
+
+
+def update_streaks(day: date | None = None,
+                   chunk_size: int | None = None) -> int:
+    """Counts a day towards every streak; returns the profiles updated.
+
+    The counted day is `day` if given, otherwise yesterday in each user's
+    time zone, so running the job hourly picks up every user shortly after
+    their local midnight. Only the profiles of users active that day are
+    read, in chunks; every other streak not counted up to that day is reset
+    by a single UPDATE.
+    """
+    chunk_size = chunk_size or settings.STREAKS['CHUNK_SIZE']
+    days = counted_days(day)
+    if not days:
+        return 0
+    active = sorted(active_users(days))
+    updated = 0
+    for index in range(0, len(active), chunk_size):
+        # pylint: disable=no-member
+        chunk = Profile.objects.filter(
+            user_id__in=active[index:index + chunk_size]).only(
+                'id', 'user_id', 'time_zone', 'streak_days', 'last_active_on')
+        # A profile whose time zone just changed is counted next run.
+        changed = [
+            profile for profile in chunk if profile.time_zone in days
+            and advance(profile, days[profile.time_zone], True)
+        ]
+        Profile.objects.bulk_update(changed,
+                                    ['streak_days', 'last_active_on'])
+        updated += len(changed)
+    # Active profiles were counted up to their day above, the others were
+    # not active on it; counting a day twice changes nothing either way.
+    return updated + Profile.objects.filter(streak_days__gt=0).filter(
+        reduce(or_, [
+            Q(time_zone=zone_name) & (Q(last_active_on__isnull=True)
+                                      | Q(last_active_on__lt=counted))
+            for zone_name, counted in days.items()
+        ])).update(streak_days=0)
@@ -1,3 +1,503 @@
-from django.test import TestCase
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta
+from io import StringIO
+from unittest import mock
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.admin import EstimatedCountPaginator
+from accounts.models import Class, Enrollment, Profile, WaitingList
+from accounts.rosters import RosterError, import_roster
+from accounts.schema import generate_schema, load_schema
+from accounts.streaks import update_streaks
+from accounts.throttling import WaitListIPThrottle
+from capitalize import slowqueries, warmup
+from capitalize.logs import (BackgroundHandler, JsonFormatter, RequestIdFilter,
+                             request_id)
+from capitalize.startup import check_budget, measure_startup
+from lessons.models import (CONTENT_CACHE_KEY, QUIZ_CACHE_KEY, Content, Quiz,
+                            QuizQuestion, QuizResponse)
+from lessons.versions import publish
+
+
+class SchemaArtifactTests(SimpleTestCase):
+    """Tests for the prebuilt OpenAPI schema artifact."""
+
+    def test_artifact_matches_urlconf(self):
+        """The checked-in schema must match the live URLconf."""
+        self.assertEqual(
+            settings.SCHEMA_FILE.read_bytes(), generate_schema(),
+            "schema.yml is out of date. Run `manage.py build_schema`.")
+
+    def test_serves_etag_and_not_modified(self):
+        """The schema is served with an ETag and honours If-None-Match."""
+        response = self.client.get('/v1/schema/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, load_schema().content)
+        self.assertIn('max-age', response['Cache-Control'])
+
+        response = self.client.get('/v1/schema/',
+                                   headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_serves_gzip(self):
+        """Clients accepting gzip get the pre-compressed artifact."""
+        response = self.client.get('/v1/schema/',
+                                   headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response.content, load_schema().compressed)
+        self.assertNotEqual(response['ETag'], load_schema().etag)
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """Guards the worker startup time and import footprint."""
+
+    def test_within_startup_budget(self):
+        """Booting a worker stays within STARTUP_BUDGET."""
+        report = measure_startup()
+        self.assertEqual(check_budget(report), [])
+
+
+class WarmupTests(TestCase):
+    """Tests for the cache warmup."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_failures_are_reported(self):
+        """Failing items, and failing to list them, fail only their step."""
+        run = warmup.Warmup(budget=10)
+        run.step('items', lambda: [1, 0, 2], lambda item: 1 / item)
+        run.step('listing', lambda: 1 / 0, str)
+        items, listing = run.report.steps
+        self.assertEqual(items.warmed, ['1', '2'])
+        self.assertEqual(len(items.failed), 1)
+        self.assertEqual(listing.warmed, [])
+        self.assertEqual(len(listing.failed), 1)
+        self.assertTrue(run.report.complete)
+
+    def test_budget_exhausted(self):
+        """Steps that do not fit in the budget are reported as such."""
+        run = warmup.Warmup(budget=0)
+        run.step('items', lambda: [1, 2], str)
+        self.assertTrue(run.report.steps[0].exhausted)
+        self.assertFalse(run.report.complete)
+
+    def test_warms_published_quizzes_and_content(self):
+        """The shared rows of quizzes and content end up in the cache."""
+        admin = User.objects.create_user('admin', is_staff=True)
+        content = Content.objects.create(title='Budgeting',
+                                         description='Saving money',
+                                         content_uri='videos/b.mp4',
+                                         content_type='video')
+        quiz = Quiz.objects.create(title='Quiz',
+                                   description='Quiz',
+                                   content_id=content,
+                                   owner_id=admin)
+        QuizQuestion.objects.create(quiz=quiz,
+                                    question='Question',
+                                    options=['a', 'b'],
+                                    correct_index=0)
+        publish(quiz, admin)
+        cache.clear()
+
+        report = warmup.warm_up(budget=10)
+        self.assertTrue(report.complete)
+        self.assertEqual([step.name for step in report.steps], [
+            'connections', 'imports', 'urls', 'quizzes', 'content'
+        ])
+        self.assertIsNotNone(cache.get(QUIZ_CACHE_KEY.format(quiz.id)))
+        self.assertIsNotNone(cache.get(CONTENT_CACHE_KEY.format(content.id)))
+
+    def test_boot_never_raises(self):
+        """A worker boots even when its warmup fails, and leaves no
+            connection open for the processes forked from it."""
+        with mock.patch.object(warmup,
+                               'warm_up',
+                               side_effect=OperationalError("no such table")), \
+                mock.patch.object(warmup.connections, 'close_all') as close_all, \
+                self.assertLogs('capitalize.warmup', 'ERROR'):
+            warmup.warm_up_on_boot()
+        close_all.assert_called_once()
+
+    def test_boot_skips_connections(self):
+        """Boot warmup does not open connections to hand to forks."""
+        with mock.patch.object(warmup.connections, 'close_all'):
+            with mock.patch.object(warmup, 'warm_up',
+                                   wraps=warmup.warm_up) as warm_up:
+                warmup.warm_up_on_boot()
+        self.assertFalse(warm_up.call_args.kwargs['connect'])
+
+
+class StructuredLoggingTests(SimpleTestCase):
+    """Tests for the JSON logs and request ids."""
+
+    def test_records_are_json_with_request_id_and_extra(self):
+        """Records carry the current request id and their extra fields."""
+        record = logging.makeLogRecord({
+            'name': 'lessons.views',
+            'levelname': 'INFO',
+            'msg': "Answered %s",
+            'args': (3, ),
+            'quiz_id': 7,
+        })
+        token = request_id.set('abc123')
+        try:
+            RequestIdFilter().filter(record)
+        finally:
+            request_id.reset(token)
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['message'], "Answered 3")
+        self.assertEqual(entry['request_id'], 'abc123')
+        self.assertEqual(entry['quiz_id'], 7)
+
+    def test_request_id_header(self):
+        """Valid incoming ids are kept, others replaced by a new one."""
+        response = self.client.get('/v1/schema/',
+                                   headers={'X-Request-ID': 'edge-42'})
+        self.assertEqual(response['X-Request-ID'], 'edge-42')
+        response = self.client.get('/v1/schema/',
+                                   headers={'X-Request-ID': 'bad id!'})
+        self.assertNotEqual(response['X-Request-ID'], 'bad id!')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_dropped_records_are_reported(self):
+        """Records dropped while the queue is full are counted in one
+            warning once the queue takes records again."""
+        handler = BackgroundHandler(StringIO(), queue_size=2)
+        handler.pid = os.getpid()  # No writer thread, the test drains it.
+        for number in range(4):
+            handler.enqueue(logging.makeLogRecord({'msg': f'{number}'}))
+        self.assertEqual(handler.dropped, 2)
+        handler.queue.get_nowait()
+        handler.queue.get_nowait()
+
+        handler.enqueue(logging.makeLogRecord({'msg': 'next'}))
+        self.assertEqual(handler.dropped, 0)
+        self.assertEqual(handler.queue.get_nowait().msg, 'next')
+        warning = handler.queue.get_nowait()
+        self.assertEqual(warning.levelno, logging.WARNING)
+        self.assertEqual(warning.getMessage(),
+                         "Dropped 2 log records while the queue was full")
+        self.assertTrue(handler.queue.empty())
+
+
+class WaitListThrottleTests(SimpleTestCase):
+    """Tests for the wait-list throttles."""
+
+    def ident(self, forwarded_for: str) -> str:
+        request = APIRequestFactory().post('/v1/auth/waitlist/',
+                                           REMOTE_ADDR='10.0.0.2',
+                                           HTTP_X_FORWARDED_FOR=forwarded_for)
+        return WaitListIPThrottle().get_cache_key(request, None)
+
+    def test_spoofed_forwarded_for_is_ignored(self):
+        """Clients cannot pick their throttle key with X-Forwarded-For."""
+        self.assertEqual(self.ident('1.1.1.1'), self.ident('2.2.2.2'))
+        with override_settings(REST_FRAMEWORK={
+                **settings.REST_FRAMEWORK, 'NUM_PROXIES': 1
+        }):
+            self.assertEqual(self.ident('1.1.1.1, 203.0.113.7'),
+                             self.ident('2.2.2.2, 203.0.113.7'))
+            self.assertIn('203.0.113.7', self.ident('1.1.1.1, 203.0.113.7'))
+
+
+class DedupeWaitListTests(TestCase):
+    """Tests for the wait-list deduplication backfill."""
+
+    def test_keeps_the_oldest_entry_across_chunks(self):
+        """An entry normalized already, in a later chunk, is merged into
+            the older entry rather than kept."""
+        # pylint: disable=no-member
+        WaitingList.objects.bulk_create([
+            WaitingList(email='Jane.Doe@gmail.com'),
+            WaitingList(email='someone@example.com'),
+        ])
+        WaitingList.objects.create(email='janedoe+news@gmail.com',
+                                   is_registered=True)
+        oldest, other, newest = WaitingList.objects.order_by('id')
+
+        call_command('dedupe_wait_list', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(
+            list(WaitingList.objects.order_by('id').values_list(
+                'id', 'normalized_email', 'is_registered')),
+            [(oldest.id, 'janedoe@gmail.com', True),
+             (other.id, 'someone@example.com', False)])
+        self.assertFalse(WaitingList.objects.filter(id=newest.id).exists())
+
+
+class StreakTests(TestCase):
+    """Tests for the daily streak job."""
+
+    def setUp(self):
+        self.day = date(2026, 1, 10)
+        owner = User.objects.create_user('owner')
+        quiz = Quiz.objects.create(title='Quiz',
+                                   description='Quiz',
+                                   content_id=Content.objects.create(
+                                       title='Budgeting',
+                                       description='Saving money',
+                                       content_uri='videos/b.mp4',
+                                       content_type='video'),
+                                   owner_id=owner)
+        self.question = QuizQuestion.objects.create(quiz=quiz,
+                                                    question='Question',
+                                                    options=['a', 'b'],
+                                                    correct_index=0)
+
+    def profile(self, name: str, time_zone: str, streak_days: int,
+                last_active_on: date | None) -> Profile:
+        return Profile.objects.create(
+            account_type='student',
+            user=User.objects.create_user(name),
+            phone_number=name,
+            time_zone=time_zone,
+            streak_days=streak_days,
+            last_active_on=last_active_on)
+
+    def answer(self, profile: Profile, local_time: datetime):
+        QuizResponse.objects.create(
+            quiz=self.question.quiz,
+            question=self.question,
+            student=profile.user,
+            score=1,
+            created_at=local_time.replace(
+                tzinfo=ZoneInfo(profile.time_zone)))
+
+    def test_counts_active_days_and_resets_the_others(self):
+        """Active users extend or start a streak on their local day; the
+            streaks of the others are reset. Counting twice changes
+            nothing."""
+        yesterday = self.day - timedelta(days=1)
+        continued = self.profile('continued', 'UTC', 2, yesterday)
+        started = self.profile('started', 'America/New_York', 3,
+                               self.day - timedelta(days=3))
+        broken = self.profile('broken', 'Pacific/Auckland', 4, yesterday)
+        self.profile('idle', 'UTC', 0, None)
+        self.answer(continued, datetime(2026, 1, 10, 0, 30))
+        self.answer(started, datetime(2026, 1, 10, 23, 30))
+        # The next local day in Auckland, not counted yet.
+        self.answer(broken, datetime(2026, 1, 11, 0, 30))
+
+        self.assertEqual(update_streaks(self.day, chunk_size=1), 3)
+        self.assertEqual(update_streaks(self.day), 0)
+        self.assertEqual(
+            {
+                profile.user.username:
+                (profile.streak_days, profile.last_active_on)
+                for profile in Profile.objects.select_related('user')
+            }, {
+                'continued': (3, self.day),
+                'started': (1, self.day),
+                'broken': (0, yesterday),
+                'idle': (0, None),
+            })
+
+
+class RosterImportTests(TestCase):
+    """Tests for the CSV roster import."""
+
+    ROSTER = [
+        'institution,institution_name,street_address,city,state,'
+        'postal_code,country,class,class_name,instructor,student',
+        'UNI,University,1 Main St,Springfield,IL,62701,US,FIN1,Finance,'
+        'teacher,alice',
+        'UNI,,,,,,,FIN1,,,bob@example.com',
+        'UNI,,,,,,,FIN1,,,carol',
+        'UNI,,,,,,,FIN2,,,alice',
+        'UNI,,,,,,,FIN1,,,alice',
+    ]
+
+    def setUp(self):
+        User.objects.create_user('teacher')
+        User.objects.create_user('alice')
+        User.objects.create_user('bob', email='bob@example.com')
+
+    def enrolled(self) -> set:
+        # pylint: disable=no-member
+        return set(
+            Enrollment.objects.values_list('class_id__short_code',
+                                           'student__username'))
+
+    def test_imports_across_chunks_and_reports_rejected_rows(self):
+        """Valid rows are written, the others reported by line."""
+        report = import_roster(self.ROSTER, chunk_size=2)
+        self.assertEqual(
+            {key: report[key]
+             for key in ('rows', 'institutions', 'classes', 'enrollments',
+                         'existing_enrollments', 'error_count')},
+            {
+                'rows': 5,
+                'institutions': 1,
+                'classes': 1,
+                'enrollments': 2,
+                'existing_enrollments': 1,
+                'error_count': 2
+            })
+        self.assertEqual(report['errors'], [{
+            'line': 4,
+            'error': 'Unknown student carol.'
+        }, {
+            'line': 5,
+            'error': 'Unknown class FIN2.'
+        }])
+        self.assertEqual(self.enrolled(), {('FIN1', 'alice'),
+                                           ('FIN1', 'bob')})
+        self.assertEqual(Class.objects.get().instructor.username, 'teacher')  # pylint: disable=no-member
+
+        again = import_roster(self.ROSTER)
+        self.assertEqual((again['enrollments'], again['existing_enrollments']),
+                         (0, 2))
+
+    def test_dry_runs_write_nothing(self):
+        report = import_roster(self.ROSTER, dry_run=True, chunk_size=2)
+        self.assertEqual((report['classes'], report['enrollments'],
+                          report['error_count']), (1, 3, 2))
+        self.assertEqual(self.enrolled(), set())
+
+    def test_rejects_rosters_missing_columns(self):
+        with self.assertRaisesMessage(RosterError,
+                                      "Missing columns: student."):
+            import_roster(['class,instructor', 'FIN1,teacher'])
+
+    def test_endpoint(self):
+        """Staff upload rosters; the report lists the rejected rows."""
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='alice'))
+        upload = SimpleUploadedFile('roster.csv',
+                                    '\n'.join(self.ROSTER).encode('utf-8-sig'))
+        self.assertEqual(
+            client.post('/v1/auth/rosters/import/', {
+                'file': upload
+            }).status_code, 403)
+
+        client.force_authenticate(
+            User.objects.create_user('admin', is_staff=True))
+        upload.seek(0)
+        response = client.post('/v1/auth/rosters/import/', {
+            'file': upload,
+            'dry_run': True
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['error_count'], 2)
+
+
+@override_settings(SLOW_QUERIES={
+    **settings.SLOW_QUERIES, 'THRESHOLD_MS': 0,
+    'BUFFER_SIZE': 3
+})
+class SlowQueryTests(TestCase):
+    """Tests for the slow query capture."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def capture(self, run):
+        """Runs queries through the wrapper, once, and returns the
+            recorded queries."""
+        if any(
+                isinstance(wrapper, slowqueries.SlowQueryWrapper)
+                for wrapper in connection.execute_wrappers):
+            run()
+        else:
+            with connection.execute_wrapper(
+                    slowqueries.SlowQueryWrapper(connection.alias)):
+                run()
+        return slowqueries.recent()
+
+    def test_normalize(self):
+        self.assertEqual(
+            slowqueries.normalize(
+                "SELECT * FROM t WHERE a = 'it''s' AND b IN (1, 2.5,\n %s)"),
+            "SELECT * FROM t WHERE a = ? AND b IN (?)")
+
+    def test_records_queries_with_their_callsite(self):
+        """Queries are recorded normalized with the test code that ran
+            them, the oldest overwritten once the buffer is full."""
+        # pylint: disable=no-member
+        last = cache.get(slowqueries.COUNT_KEY, 0)
+        recorded = self.capture(lambda: [
+            User.objects.filter(username=name).exists()
+            for name in ('a', 'b', 'c', 'd')
+        ])
+        self.assertEqual([entry['id'] for entry in recorded],
+                         [last + 4, last + 3, last + 2])
+        self.assertIn('WHERE "auth_user"."username" = ?', recorded[0]['sql'])
+        self.assertTrue(
+            recorded[0]['callsite'].startswith('accounts/tests.py:'))
+        self.assertIsNone(slowqueries.get(last + 1))
+
+        listed = self.client.get('/v1/slow-queries/', {
+            'fingerprint': recorded[0]['fingerprint']
+        }).json()
+        self.assertEqual(len(listed), 3)
+        self.assertNotIn('raw_sql', listed[0])
+
+    def test_explains_single_selects_only(self):
+        """EXPLAIN runs for recorded SELECT queries only."""
+        # pylint: disable=no-member
+        select = self.capture(
+            lambda: User.objects.filter(username='a').exists())[0]
+        response = self.client.post(
+            f'/v1/slow-queries/{select["id"]}/explain/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['plan'])
+        self.assertTrue(slowqueries.get(select['id'])['plan'])
+
+        update = self.capture(lambda: User.objects.filter(
+            username='a').update(first_name='A'))[0]
+        self.assertTrue(update['raw_sql'].startswith('UPDATE'))
+        response = self.client.post(
+            f'/v1/slow-queries/{update["id"]}/explain/')
+        self.assertEqual(response.status_code, 400)
+        with self.assertRaises(slowqueries.ExplainError):
+            slowqueries.explain({**select, 'many': True})
+        self.assertEqual(
+            self.client.post('/v1/slow-queries/999/explain/').status_code,
+            404)
+
+
+class LargeTableAdminTests(TestCase):
+    """Tests for the admin of large tables."""
+
+    def test_estimates_unfiltered_counts(self):
+        """Big unfiltered tables are not counted, filtered lists are."""
+        # pylint: disable=no-member
+        WaitingList.objects.create(email='someone@example.com')
+        with mock.patch('accounts.admin.estimated_row_count',
+                        return_value=250_000) as estimate:
+            self.assertEqual(
+                EstimatedCountPaginator(WaitingList.objects.all(), 100).count,
+                250_000)
+            self.assertEqual(
+                EstimatedCountPaginator(
+                    WaitingList.objects.filter(is_registered=False),
+                    100).count, 1)
+        estimate.assert_called_once()
+        self.assertEqual(
+            EstimatedCountPaginator(WaitingList.objects.all(), 100).count, 1)
+
+    def test_response_changelist(self):
+        """The changelist loads and offers the bulk delete action only."""
+        self.client.force_login(
+            User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        response = self.client.get('/admin/lessons/quizresponse/')
+        self.assertEqual(response.status_code, 200)
+        actions = [name for name, _ in response.context['action_form'].fields[
+            'action'].choices]
+        self.assertIn('delete_responses', actions)
+        self.assertNotIn('delete_selected', actions)
@@ -0,0 +1,76 @@
+"""
+    Request throttling.
+    Sliding-window counters kept in the shared cache.
+"""
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Throttle using a sliding-window counter instead of a request log.
+
+    Each window stores a single integer counter. The request rate is
+    estimated from the current window's count plus the previous window's
+    count weighted by how much of it still overlaps the sliding window,
+    so a check costs one `get_many` and one `incr` regardless of the rate.
+    """
+
+    def allow_request(self, request, view):
+        """Checks the estimated rate and counts the request if allowed."""
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f"{self.key}_{window}"
+        previous_key = f"{self.key}_{window - 1}"
+        counts = self.cache.get_many([current_key, previous_key])
+        overlap = 1 - (self.now % self.duration) / self.duration
+        estimated = (counts.get(previous_key, 0) * overlap +
+                     counts.get(current_key, 0))
+        if estimated >= self.num_requests:
+            return self.throttle_failure()
+
+        # Counters outlive their window so they can weight the next one.
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr(), start the window again.
+            self.cache.set(current_key, 1, self.duration * 2)
+        return True
+
+    def wait(self):
+        """Returns the seconds until the current window rolls over."""
+        return self.duration - (self.now % self.duration)
+
+
+class WaitListIPThrottle(SlidingWindowThrottle):
+    """Limits wait-list sign-ups per client IP address.
+        The address is the one the trusted proxies saw, see NUM_PROXIES;
+        the rest of X-Forwarded-For is set by the client."""
+    scope = 'wait_list_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+class WaitListDomainThrottle(SlidingWindowThrottle):
+    """Limits wait-list sign-ups per email domain."""
+    scope = 'wait_list_domain'
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email')
+        if not isinstance(email, str) or '@' not in email:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': email.rsplit('@', 1)[1].strip().lower()[:255]
+        }
@@ -24,6 +24,7 @@ urlpatterns = [
     path('wait-list/', accounts_views.WaitListView.as_view()),
     path("register/", accounts_views.CreateTestUserView.as_view()),
     path("register/<str:registration_token>/", accounts_views.SetTestUserPassword.as_view()),
+    path('rosters/import/', accounts_views.RosterImportView.as_view()),
     path('token/', TokenObtainPairView.as_view()),
     path('token/refresh/', TokenRefreshView.as_view()),
 ]
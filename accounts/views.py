@@ -2,17 +2,32 @@
     This module contains the views for the accounts app.
 """
 
+import codecs
 import re
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import redirect
-from drf_spectacular.utils import extend_schema
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views import View
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import exceptions, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts import models
+from accounts.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
+from accounts.rosters import RosterError, import_roster
+from accounts.schema import load_schema
+from accounts.throttling import WaitListDomainThrottle, WaitListIPThrottle
+from capitalize import slowqueries
 
 
 class ApiRoot(APIView):
@@ -25,6 +40,31 @@ class ApiRoot(APIView):
         return redirect('/v1/schema/swagger/')
 
 
+class SchemaView(View):
+    """Serves the prebuilt OpenAPI schema artifact.
+        The schema is generated at deploy time by `manage.py build_schema`."""
+
+    def get(self, request):
+        """Returns the schema, gzip compressed when the client accepts it."""
+        schema = load_schema()
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = schema.gzip_etag if use_gzip else schema.etag
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                schema.compressed if use_gzip else schema.content,
+                content_type='application/vnd.oai.openapi; charset=utf-8')
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            f"public, max-age={settings.SCHEMA_CACHE_MAX_AGE}")
+        patch_vary_headers(response, ['Accept-Encoding'])
+        return response
+
+
 class ProfileView(APIView):
     """Profile view."""
     permission_classes = [IsAuthenticated]
@@ -44,19 +84,32 @@ class WaitListView(APIView):
     permission_classes = [AllowAny]
     serializer_class = models.WaitListSerializer
 
+    def get_throttles(self):
+        """Throttles sign-ups before they reach the database."""
+        if self.request.method == 'POST':
+            return [WaitListIPThrottle(), WaitListDomainThrottle()]
+        return super().get_throttles()
+
     @extend_schema(request=models.CreateWaitingListSerializer)
     def post(self, request):
         """Adds an email to the wait-list"""
         email: str = request.data.get('email')
-        if not email or not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        if not isinstance(email, str):
             raise exceptions.ValidationError("Invalid email address")
+        email = email.strip()
+        try:
+            validate_email(email)
+        except ValidationError as ve:
+            raise exceptions.ValidationError("Invalid email address") from ve
 
-        # Check if user is already in the wait-list
-        existing = models.WaitingList.objects.filter(email=email).first()  # pylint: disable=no-member
-        if existing is not None:
+        # The unique constraints on email and normalized_email detect
+        # duplicates, in any spelling, in one query.
+        try:
+            with transaction.atomic():
+                models.WaitingList.objects.create(email=email)  # pylint: disable=no-member
+        except IntegrityError:
             return Response({"message": "You are already on the wait-list"},
                             status=status.HTTP_200_OK)
-        models.WaitingList.objects.create(email=email)  # pylint: disable=no-member
 
         return Response(
             {
@@ -81,7 +134,9 @@ class CreateTestUserView(APIView):
     permission_classes = [IsAdminUser]
     serializer_class = models.RegistrationTokenSerializer
 
-    @extend_schema(request=models.CreateTestUserSerializer)
+    @extend_schema(request=models.CreateTestUserSerializer,
+                   parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
     def post(self, request):
         """Creates a test user"""
         serializer = models.CreateTestUserSerializer(data=request.data)
@@ -127,3 +182,79 @@ class SetTestUserPassword(APIView):
         user.save()
         return Response({"message": "Password updated successfully"},
                         status=status.HTTP_200_OK)
+
+
+class RosterImportView(APIView):
+    """Import institutions, classes and enrollments from a CSV roster."""
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+    serializer_class = models.RosterReportSerializer
+
+    @extend_schema(
+        description="Upserts the institutions, classes and enrollments of "
+        "a CSV roster, one row per enrollment, and reports rejected rows. "
+        "Rows are written in chunks, valid chunks are kept when later rows "
+        "fail. Requires staff permissions.",
+        request=models.RosterImportSerializer,
+        responses={200: models.RosterReportSerializer})
+    def post(self, request):
+        """Imports a roster."""
+        data = models.RosterImportSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        # Large uploads are spooled to disk and read one line at a time.
+        lines = codecs.iterdecode(data.validated_data['file'], 'utf-8-sig')
+        try:
+            report = import_roster(lines, data.validated_data['dry_run'])
+        except RosterError as e:
+            raise exceptions.ValidationError(str(e)) from e
+        return Response(models.RosterReportSerializer(report).data)
+
+
+class SlowQueryList(APIView):
+    """Recently recorded slow database queries."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.SlowQuerySerializer
+
+    @extend_schema(
+        description="Returns the most recent queries slower than the "
+        "SLOW_QUERIES threshold, newest first, with the project code that "
+        "ran them. Requires staff permissions.",
+        parameters=[
+            OpenApiParameter("fingerprint",
+                             str,
+                             description="Only runs of this query."),
+        ],
+        responses={200: models.SlowQuerySerializer(many=True)})
+    def get(self, request):
+        """Returns the recorded slow queries."""
+        entries = slowqueries.recent()
+        if 'fingerprint' in request.query_params:
+            entries = [
+                entry for entry in entries
+                if entry['fingerprint'] == request.query_params['fingerprint']
+            ]
+        return Response(models.SlowQuerySerializer(entries, many=True).data)
+
+
+class SlowQueryExplain(APIView):
+    """Query plan of a recorded slow query."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.SlowQuerySerializer
+
+    @extend_schema(
+        description="Runs EXPLAIN for a recorded SELECT query with its "
+        "original parameters and keeps the plan with the query. Requires "
+        "staff permissions.",
+        request=None,
+        responses={200: models.SlowQuerySerializer})
+    def post(self, request, query_id: int):
+        """Explains a recorded slow query."""
+        entry = slowqueries.get(query_id)
+        if entry is None:
+            raise exceptions.NotFound(
+                "The requested query is no longer recorded.")
+        try:
+            slowqueries.explain(entry)
+        except slowqueries.ExplainError as ee:
+            raise exceptions.ValidationError(str(ee)) from ee
+        return Response(models.SlowQuerySerializer(entry).data)
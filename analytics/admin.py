@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from accounts.admin import LargeTableAdmin
+
+from .models import DailyActiveStudents, DailyQuizRollup, HourlyQuizRollup
+
+
+@admin.register(DailyActiveStudents)
+class DailyActiveStudentsAdmin(admin.ModelAdmin):
+    list_display = ['date', 'students']
+    ordering = ['-date']
+
+
+@admin.register(DailyQuizRollup)
+class DailyQuizRollupAdmin(LargeTableAdmin):
+    list_display = [
+        'date', 'quiz', 'responses', 'points', 'max_points', 'students',
+        'completions'
+    ]
+    list_select_related = ['quiz']
+    ordering = ['-date']
+
+
+@admin.register(HourlyQuizRollup)
+class HourlyQuizRollupAdmin(LargeTableAdmin):
+    list_display = ['hour', 'quiz', 'responses', 'points', 'max_points']
+    list_select_related = ['quiz']
+    ordering = ['-hour']
@@ -0,0 +1,25 @@
+"""
+    Rebuilds the analytics rollups from every quiz response.
+"""
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import reset, roll_up
+
+
+class Command(BaseCommand):
+    """Empties the rollups and folds the whole response history back in,
+        one chunk per transaction so the job can be stopped and resumed
+        with `rollup_analytics`."""
+    help = "Rebuilds the analytics rollups from all quiz responses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        reset()
+        total = 0
+        while folded := roll_up(options['chunk_size']):
+            total += folded
+            self.stdout.write(f"Rolled up {total} responses...")
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {total} responses."))
@@ -0,0 +1,22 @@
+"""
+    Folds new quiz responses into the analytics rollups.
+"""
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import roll_up
+
+
+class Command(BaseCommand):
+    """Rolls up responses past the watermark until caught up.
+        Meant to run every few minutes."""
+    help = "Folds new quiz responses into the analytics rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        total = 0
+        while folded := roll_up(options['chunk_size']):
+            total += folded
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {total} responses."))
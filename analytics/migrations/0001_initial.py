@@ -0,0 +1,71 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0007_admin_filter_indexes'),
+        ('lessons', '0016_quizresponse_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActiveStudents',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField(unique=True)),
+                ('students', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('gaps', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyQuizRollup',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('responses', models.IntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('max_points', models.IntegerField(default=0)),
+                ('date', models.DateField()),
+                ('students', models.IntegerField(default=0)),
+                ('completions', models.IntegerField(default=0)),
+                ('class_id', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.class')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lessons.content')),
+                ('institution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.institution')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lessons.quiz')),
+            ],
+            options={
+                'unique_together': {('date', 'quiz')},
+            },
+        ),
+        migrations.CreateModel(
+            name='HourlyQuizRollup',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('responses', models.IntegerField(default=0)),
+                ('points', models.IntegerField(default=0)),
+                ('max_points', models.IntegerField(default=0)),
+                ('hour', models.DateTimeField()),
+                ('class_id', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.class')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lessons.content')),
+                ('institution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='accounts.institution')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lessons.quiz')),
+            ],
+            options={
+                'unique_together': {('hour', 'quiz')},
+            },
+        ),
+    ]
@@ -0,0 +1,127 @@
+"""
+    Analytics models.
+    Rollup tables of quiz activity, maintained by `analytics.rollups`, and
+    the serializers of the reports read from them.
+"""
+
+from django.db import models
+from rest_framework import serializers
+
+from accounts.models import Class, Institution
+from lessons.models import Content, Quiz
+
+
+class RollupWatermark(models.Model):
+    """Rollup watermark model.
+        The last source row folded into the rollups."""
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # Ids below last_id not seen yet, their transactions may still commit,
+    # mapped to when they were first missed.
+    gaps = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"<RollupWatermark: {self.name} @ {self.last_id}>"
+
+
+class QuizRollup(models.Model):
+    """Fields shared by the quiz rollups.
+        Class, institution and content are copied from the quiz so reports
+        can filter and group by them without joins."""
+    id = models.AutoField(primary_key=True)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    class_id = models.ForeignKey(Class,
+                                 on_delete=models.SET_NULL,
+                                 null=True,
+                                 blank=True)
+    institution = models.ForeignKey(Institution,
+                                    on_delete=models.SET_NULL,
+                                    null=True,
+                                    blank=True)
+    content = models.ForeignKey(Content, on_delete=models.CASCADE)
+    responses = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+    # Sum of the weights of the questions answered.
+    max_points = models.IntegerField(default=0)
+
+    class Meta:
+        """Abstract base of the rollups."""
+        abstract = True
+
+
+class HourlyQuizRollup(QuizRollup):
+    """Hourly quiz rollup model.
+        Responses to a quiz within an hour, UTC."""
+    hour = models.DateTimeField()
+
+    def __str__(self):
+        return f"<HourlyQuizRollup: {self.quiz_id} @ {self.hour}>"  # pylint: disable=no-member
+
+    class Meta:
+        """One row per hour and quiz."""
+        unique_together = ['hour', 'quiz']
+
+
+class DailyQuizRollup(QuizRollup):
+    """Daily quiz rollup model.
+        Responses to a quiz within a day, UTC."""
+    date = models.DateField()
+    # Distinct students who answered the quiz that day.
+    students = models.IntegerField(default=0)
+    # Students who answered the last question of the quiz that day.
+    completions = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"<DailyQuizRollup: {self.quiz_id} @ {self.date}>"  # pylint: disable=no-member
+
+    class Meta:
+        """One row per day and quiz."""
+        unique_together = ['date', 'quiz']
+
+
+class DailyActiveStudents(models.Model):
+    """Daily active students model.
+        Distinct students with quiz responses within a day, UTC."""
+    id = models.AutoField(primary_key=True)
+    date = models.DateField(unique=True)
+    students = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"<DailyActiveStudents: {self.date}>"
+
+
+class ActiveStudentsSerializer(serializers.ModelSerializer):
+    """Serializer for the daily active students rollup."""
+
+    class Meta:
+        """Daily active students serializer meta class."""
+        model = DailyActiveStudents
+        fields = ['date', 'students']
+
+
+class QuizReportRowSerializer(serializers.Serializer):
+    """Serializer for a row of the quiz activity report."""
+    key = serializers.CharField(
+        allow_null=True,
+        help_text="Date, hour or id of the group, per `group_by`.")
+    responses = serializers.IntegerField()
+    points = serializers.IntegerField()
+    max_points = serializers.IntegerField()
+    average_score = serializers.FloatField(
+        allow_null=True, help_text="Points as a percentage of max_points.")
+    students = serializers.IntegerField(
+        required=False,
+        help_text="Daily distinct students per quiz, summed. "
+        "Daily reports only.")
+    completions = serializers.IntegerField(required=False,
+                                           help_text="Daily reports only.")
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
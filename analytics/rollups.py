@@ -0,0 +1,355 @@
+"""
+    Analytics rollups.
+    Folds new quiz responses into the rollup tables. A watermark on the
+    response id records how far the rollups got, so every response is
+    counted once however often, or however late, the job runs.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from analytics.models import (DailyActiveStudents, DailyQuizRollup,
+                              HourlyQuizRollup, RollupWatermark)
+from lessons.models import QuizQuestion, QuizResponse, QuizVersion
+
+WATERMARK = 'quiz_responses'
+SUMS = ['responses', 'points', 'max_points']
+# Response values folded, see `fold`.
+FIELDS = [
+    'id', 'quiz_id', 'student_id', 'score', 'created_at', 'question__weight',
+    'quiz__class_id', 'quiz__class_id__institution_id', 'quiz__content_id',
+    'question_id', 'version_id'
+]
+
+
+def roll_up(chunk_size: int | None = None) -> int:
+    """Folds the next chunk of responses into the rollups.
+        Returns the number of responses folded, 0 once caught up."""
+    config = settings.ANALYTICS
+    chunk_size = chunk_size or config['CHUNK_SIZE']
+    now = timezone.now()
+    # Responses this recent may still have lower ids in flight.
+    cutoff = now - timedelta(seconds=config['SETTLE_SECONDS'])
+    with transaction.atomic():
+        # The lock serializes runs, nothing else writes the rollups.
+        # pylint: disable=no-member
+        watermark, _ = RollupWatermark.objects.select_for_update(
+        ).get_or_create(name=WATERMARK)
+        # Buffered responses get their id when flushed but keep an older
+        # created_at, the cutoff cannot hold the watermark back for them.
+        expiry = now - timedelta(seconds=config['GAP_SECONDS'])
+        gaps = {
+            int(gap): seen
+            for gap, seen in watermark.gaps.items()
+            if datetime.fromisoformat(seen) > expiry
+        }
+        responses = QuizResponse.objects.order_by('id').values_list(*FIELDS)
+        late = list(responses.filter(id__in=gaps))
+        rows = []
+        for row in responses.filter(id__gt=watermark.last_id)[:chunk_size]:
+            if row[4] > cutoff:
+                break
+            rows.append(row)
+        if rows:
+            for gap in missing_ids(watermark.last_id,
+                                   [row[0] for row in rows],
+                                   config['MAX_GAPS']):
+                gaps[gap] = now.isoformat()
+        for row in late:
+            del gaps[row[0]]
+        if late or rows:
+            fold(late + rows, watermark.last_id)
+        if rows:
+            watermark.last_id = rows[-1][0]
+        if late or rows or len(gaps) != len(watermark.gaps):
+            watermark.gaps = dict(
+                sorted(gaps.items())[-config['MAX_GAPS']:])
+            watermark.save()
+    return len(late) + len(rows)
+
+
+def missing_ids(previous_id: int, ids: List[int], limit: int) -> List[int]:
+    """Returns the ids between previous_id and the last of the sorted ids
+        that are not among them, the highest `limit` of them."""
+    missing = []
+    upper = ids[-1]
+    for lower in reversed([previous_id] + ids[:-1]):
+        missing += range(upper - 1, lower, -1)[:limit - len(missing)]
+        if len(missing) >= limit:
+            break
+        upper = lower
+    return missing
+
+
+def fold(rows: list, previous_id: int):
+    """Adds a chunk of response rows to the rollups, the responses after
+        previous_id and late ones below it."""
+    hourly = defaultdict(Counter)
+    daily = defaultdict(Counter)
+    dimensions = {}
+    answered = defaultdict(set)
+    last_day = {}
+    versions = {}
+    for (_, quiz, student, score, created_at, weight, class_id, institution,
+         content, question, version) in rows:
+        if version:
+            # Scored against a frozen version, whose weight may differ.
+            weight = QuizVersion.frozen(version).weights().get(
+                question, weight)
+        hour = created_at.astimezone(dt_timezone.utc).replace(minute=0,
+                                                              second=0,
+                                                              microsecond=0)
+        dimensions[quiz] = (class_id, institution, content)
+        for totals in (hourly[hour, quiz], daily[hour.date(), quiz]):
+            totals.update(responses=1, points=score, max_points=weight)
+        answered[quiz, student].add(question)
+        last_day[quiz, student] = hour.date()
+        versions[quiz, student] = version
+
+    count_new_students(rows, previous_id, daily)
+    count_completions(answered, last_day, versions,
+                      max(previous_id, rows[-1][0]), daily)
+    apply(HourlyQuizRollup, 'hour', hourly, dimensions, SUMS)
+    apply(DailyQuizRollup, 'date', daily, dimensions,
+          SUMS + ['students', 'completions'])
+
+
+def count_new_students(rows: list, previous_id: int, daily: Dict):
+    """Counts the students active on a day for the first time, per quiz
+        and overall, looking back only at responses already folded."""
+    days = {row[4].astimezone(dt_timezone.utc).date() for row in rows}
+    start, end = day_range(min(days), max(days))
+    # pylint: disable=no-member
+    seen = set(
+        QuizResponse.objects.filter(
+            student_id__in={row[2]
+                            for row in rows},
+            id__lte=previous_id,
+            created_at__gte=start,
+            created_at__lt=end).exclude(id__in=[
+                row[0] for row in rows if row[0] <= previous_id
+            ]).annotate(day=TruncDate(
+                'created_at', tzinfo=dt_timezone.utc)).values_list(
+                    'day', 'quiz_id', 'student_id').distinct())
+    seen_days = {(day, student) for day, _, student in seen}
+    active = Counter()
+    for row in rows:
+        day, quiz, student = row[4].astimezone(
+            dt_timezone.utc).date(), row[1], row[2]
+        if (day, quiz, student) not in seen:
+            seen.add((day, quiz, student))
+            daily[day, quiz]['students'] += 1
+        if (day, student) not in seen_days:
+            seen_days.add((day, student))
+            active[day] += 1
+
+    existing = {
+        rollup.date: rollup
+        for rollup in DailyActiveStudents.objects.filter(date__in=active)
+    }
+    created = []
+    for day, students in active.items():
+        if day in existing:
+            existing[day].students += students
+        else:
+            created.append(DailyActiveStudents(date=day, students=students))
+    DailyActiveStudents.objects.bulk_update(existing.values(), ['students'])
+    DailyActiveStudents.objects.bulk_create(created)
+
+
+def required_questions(versions: Dict) -> Dict[Tuple, set]:
+    """Returns the questions completing the quiz of each (quiz, student)
+        pair: the questions of the version of their response, or for
+        legacy responses, of no version, the questions not archived."""
+    legacy = defaultdict(set)
+    # pylint: disable=no-member
+    for quiz, question in QuizQuestion.objects.filter(
+            quiz_id__in={quiz
+                         for (quiz, _), version in versions.items()
+                         if not version},
+            archived=False).values_list('quiz_id', 'id'):
+        legacy[quiz].add(question)
+    return {(quiz, student): set(QuizVersion.frozen(version).question_ids())
+            if version else legacy[quiz]
+            for (quiz, student), version in versions.items()}
+
+
+def count_completions(answered: Dict, last_day: Dict, versions: Dict,
+                      last_id: int, daily: Dict):
+    """Counts the students whose responses in the chunk completed a quiz,
+        on the day of their last response. A quiz is complete once every
+        required question, see `required_questions`, is answered."""
+    required = required_questions(versions)
+    totals = defaultdict(set)
+    # pylint: disable=no-member
+    for quiz, student, question in QuizResponse.objects.filter(
+            quiz_id__in={quiz
+                         for quiz, _ in answered},
+            student_id__in={student
+                            for _, student in answered},
+            id__lte=last_id).values_list('quiz_id', 'student_id',
+                                         'question_id'):
+        totals[quiz, student].add(question)
+    for pair, questions in answered.items():
+        # Each question is answered once, a chunk answering one of the
+        # required questions while all are answered completed the quiz.
+        if required[pair] & questions and required[pair] <= totals[pair]:
+            daily[last_day[pair], pair[0]]['completions'] += 1
+
+
+def unfold(responses):
+    """Takes responses about to be deleted back out of the rollups.
+        Runs in the deleting transaction, before the delete; responses not
+        folded yet are left alone."""
+    with transaction.atomic():
+        # pylint: disable=no-member
+        watermark = RollupWatermark.objects.select_for_update().filter(
+            name=WATERMARK).first()
+        if watermark is None:
+            return
+        skipped = [int(gap) for gap in watermark.gaps]
+        rows = list(
+            responses.filter(id__lte=watermark.last_id).exclude(
+                id__in=skipped).order_by('id').values_list(*FIELDS))
+        if not rows:
+            return
+        hourly = defaultdict(Counter)
+        daily = defaultdict(Counter)
+        dimensions = {}
+        versions = {}
+        for (_, quiz, student, score, created_at, weight, class_id,
+             institution, content, question, version) in rows:
+            if version:
+                weight = QuizVersion.frozen(version).weights().get(
+                    question, weight)
+            hour = created_at.astimezone(dt_timezone.utc).replace(
+                minute=0, second=0, microsecond=0)
+            dimensions[quiz] = (class_id, institution, content)
+            for totals in (hourly[hour, quiz], daily[hour.date(), quiz]):
+                totals.update(responses=-1, points=-score, max_points=-weight)
+            versions[quiz, student] = version
+
+        folded = QuizResponse.objects.filter(
+            id__lte=watermark.last_id).exclude(id__in=skipped)
+        uncount_students(rows, folded, daily)
+        uncount_completions(rows, folded, versions, daily)
+        apply(HourlyQuizRollup, 'hour', hourly, dimensions, SUMS)
+        apply(DailyQuizRollup, 'date', daily, dimensions,
+              SUMS + ['students', 'completions'])
+
+
+def uncount_students(rows: list, folded, daily: Dict):
+    """Takes off the students left with no folded response on a day, per
+        quiz and overall."""
+    days = {row[4].astimezone(dt_timezone.utc).date() for row in rows}
+    start, end = day_range(min(days), max(days))
+    remaining = set(
+        folded.filter(student_id__in={row[2]
+                                      for row in rows},
+                      created_at__gte=start,
+                      created_at__lt=end).exclude(
+                          id__in=[row[0] for row in rows]).annotate(
+                              day=TruncDate('created_at',
+                                            tzinfo=dt_timezone.utc)).
+        values_list('day', 'quiz_id', 'student_id').distinct())
+    remaining_days = {(day, student) for day, _, student in remaining}
+    deleted = {(row[4].astimezone(dt_timezone.utc).date(), row[1], row[2])
+               for row in rows}
+    for day, quiz, student in deleted - remaining:
+        daily[day, quiz]['students'] -= 1
+    inactive = Counter(
+        day for day, student in {(day, student)
+                                 for day, _, student in deleted} -
+        remaining_days)
+    # pylint: disable=no-member
+    rollups = list(DailyActiveStudents.objects.filter(date__in=inactive))
+    for rollup in rollups:
+        rollup.students -= inactive[rollup.date]
+    DailyActiveStudents.objects.bulk_update(rollups, ['students'])
+
+
+def uncount_completions(rows: list, folded, versions: Dict, daily: Dict):
+    """Takes off the completions the deleted responses were part of, on
+        the day of the last answer to a required question."""
+    required = required_questions(versions)
+    deleted = {row[0] for row in rows}
+    before, after = defaultdict(set), defaultdict(set)
+    last_answer = {}
+    for response, quiz, student, question, created_at in folded.filter(
+            quiz_id__in={quiz
+                         for quiz, _ in versions},
+            student_id__in={student
+                            for _, student in versions}).order_by(
+                                'id').values_list('id', 'quiz_id',
+                                                  'student_id', 'question_id',
+                                                  'created_at'):
+        pair = (quiz, student)
+        if pair not in required:
+            continue
+        before[pair].add(question)
+        if response not in deleted:
+            after[pair].add(question)
+        if question in required[pair]:
+            last_answer[pair] = created_at
+    for pair, questions in required.items():
+        if questions <= before[pair] and not questions <= after[pair]:
+            day = last_answer[pair].astimezone(dt_timezone.utc).date()
+            daily[day, pair[0]]['completions'] -= 1
+
+
+def apply(model, period_field: str, increments: Dict[Tuple, Counter],
+          dimensions: Dict, fields: list):
+    """Adds the increments to the rollup rows, creating missing ones."""
+    # pylint: disable=no-member
+    existing = {
+        (getattr(rollup, period_field), rollup.quiz_id): rollup
+        for rollup in model.objects.filter(
+            **{
+                f'{period_field}__in': {period
+                                        for period, _ in increments},
+                'quiz_id__in': {quiz
+                                for _, quiz in increments},
+            })
+    }
+    created = []
+    for (period, quiz), totals in increments.items():
+        rollup = existing.get((period, quiz))
+        if rollup is None:
+            class_id, institution, content = dimensions[quiz]
+            created.append(
+                model(quiz_id=quiz,
+                      class_id_id=class_id,
+                      institution_id=institution,
+                      content_id=content,
+                      **{period_field: period},
+                      **{field: totals[field]
+                         for field in fields}))
+            continue
+        for field in fields:
+            setattr(rollup, field, getattr(rollup, field) + totals[field])
+    model.objects.bulk_update(
+        [existing[key] for key in increments if key in existing], fields)
+    model.objects.bulk_create(created)
+
+
+def reset():
+    """Empties the rollups and rewinds the watermark, for a backfill."""
+    with transaction.atomic():
+        # pylint: disable=no-member
+        RollupWatermark.objects.filter(name=WATERMARK).delete()
+        HourlyQuizRollup.objects.all().delete()
+        DailyQuizRollup.objects.all().delete()
+        DailyActiveStudents.objects.all().delete()
+
+
+def day_range(start: date, end: date) -> Tuple[datetime, datetime]:
+    """Returns the UTC datetimes bounding whole days from start to end."""
+    return (datetime.combine(start, datetime.min.time(), dt_timezone.utc),
+            datetime.combine(end + timedelta(days=1), datetime.min.time(),
+                             dt_timezone.utc))
@@ -0,0 +1,272 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import (DailyActiveStudents, DailyQuizRollup,
+                              HourlyQuizRollup, RollupWatermark)
+from analytics.rollups import WATERMARK, reset, roll_up, unfold
+from lessons.models import Content, Quiz, QuizQuestion, QuizResponse
+from lessons.versions import publish, remove_question
+
+
+@override_settings(ANALYTICS={**settings.ANALYTICS, 'SETTLE_SECONDS': 0})
+class RollupTestCase(TestCase):
+    """Creates a published quiz of two questions and three students."""
+
+    def setUp(self):
+        # Row ids are reused once a test rolls back.
+        cache.clear()
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.students = [
+            User.objects.create_user(f'student{number}')
+            for number in range(3)
+        ]
+        self.content = Content.objects.create(title='Budgeting',
+                                              description='Saving money',
+                                              content_uri='videos/b.mp4',
+                                              content_type='video')
+        self.quiz = Quiz.objects.create(title='Quiz',
+                                        description='Quiz',
+                                        content_id=self.content,
+                                        owner_id=self.admin)
+        self.questions = [
+            QuizQuestion.objects.create(quiz=self.quiz,
+                                        question=f'Question {number}',
+                                        options=['a', 'b'],
+                                        correct_index=0,
+                                        weight=number + 1)
+            for number in range(2)
+        ]
+        self.version = publish(self.quiz, self.admin)
+        self.yesterday = timezone.now() - timedelta(days=1)
+
+    def answer(self, student: User, question: QuizQuestion, score: int,
+               version=True, created_at=None) -> QuizResponse:
+        """Saves a response, by default to the published version."""
+        return QuizResponse.objects.create(
+            quiz=self.quiz,
+            question=question,
+            student=student,
+            score=score,
+            version=self.version if version is True else version,
+            created_at=created_at or self.yesterday)
+
+    def daily(self) -> DailyQuizRollup:
+        return DailyQuizRollup.objects.get(quiz=self.quiz,
+                                           date=self.yesterday.date())
+
+
+class RollupTests(RollupTestCase):
+    """Tests for folding quiz responses into the rollups."""
+
+    def test_completions_count_the_version_questions(self):
+        """A quiz is complete once every question of the version answered
+            is, however the draft changed since."""
+        remove_question(self.questions[1])
+        QuizQuestion.objects.create(quiz=self.quiz,
+                                    question='Draft question',
+                                    options=['a', 'b'],
+                                    correct_index=0)
+        self.answer(self.students[0], self.questions[0], 1)
+        roll_up()
+        self.assertEqual(self.daily().completions, 0)
+
+        self.answer(self.students[0], self.questions[1], 2)
+        roll_up()
+        self.assertEqual(self.daily().completions, 1)
+
+    def test_legacy_completions_skip_archived_questions(self):
+        """Responses of no version count the questions not archived."""
+        remove_question(self.questions[1])
+        self.answer(self.students[0], self.questions[0], 1, version=None)
+        roll_up()
+        self.assertEqual(self.daily().completions, 1)
+
+    def test_sums_and_distinct_students(self):
+        """Responses, points and weights add up per hour and day; students
+            count once per quiz and day however many runs see them."""
+        self.answer(self.students[0], self.questions[0], 1)
+        self.answer(self.students[1], self.questions[0], 0)
+        self.answer(self.students[1], self.questions[1], 2)
+        self.assertEqual(roll_up(), 3)
+        self.answer(self.students[0], self.questions[1], 2)
+        self.assertEqual(roll_up(), 1)
+        self.assertEqual(roll_up(), 0)
+
+        daily = self.daily()
+        self.assertEqual(
+            (daily.responses, daily.points, daily.max_points, daily.students,
+             daily.completions), (4, 5, 6, 2, 2))
+        hourly = HourlyQuizRollup.objects.get(quiz=self.quiz)
+        self.assertEqual((hourly.responses, hourly.points, hourly.max_points),
+                         (4, 5, 6))
+        self.assertEqual(
+            DailyActiveStudents.objects.get(
+                date=self.yesterday.date()).students, 2)
+
+    def test_resumes_from_the_watermark(self):
+        """Chunked runs fold every response once, like a single run."""
+        responses = [
+            self.answer(student, question, 1) for student in self.students
+            for question in self.questions
+        ]
+        folded = []
+        while count := roll_up(chunk_size=4):
+            folded.append(count)
+        self.assertEqual(folded, [4, 2])
+        self.assertEqual(
+            RollupWatermark.objects.get(name=WATERMARK).last_id,
+            responses[-1].id)
+        daily = self.daily()
+        self.assertEqual((daily.responses, daily.students, daily.completions),
+                         (6, 3, 3))
+
+    def test_waits_for_recent_responses(self):
+        """Responses within the settle time are left for the next run."""
+        self.answer(self.students[0], self.questions[0], 1,
+                    created_at=timezone.now())
+        with override_settings(ANALYTICS={
+                **settings.ANALYTICS, 'SETTLE_SECONDS': 60
+        }):
+            self.assertEqual(roll_up(), 0)
+        self.assertEqual(roll_up(), 1)
+
+    def test_folds_late_ids_below_the_watermark(self):
+        """A response committed after higher ids were folded, as buffered
+            responses are, is still folded once."""
+        self.answer(self.students[0], self.questions[0], 1)
+        late = self.answer(self.students[1], self.questions[0], 1)
+        self.answer(self.students[0], self.questions[1], 2)
+        values = {
+            field.attname: getattr(late, field.attname)
+            for field in QuizResponse._meta.concrete_fields
+        }
+        late.delete()
+        self.assertEqual(roll_up(), 2)
+        self.assertEqual(
+            list(RollupWatermark.objects.get(name=WATERMARK).gaps),
+            [str(values['id'])])
+
+        QuizResponse.objects.create(**values)
+        self.assertEqual(roll_up(), 1)
+        self.assertEqual(roll_up(), 0)
+        daily = self.daily()
+        self.assertEqual((daily.responses, daily.students), (3, 2))
+        self.assertEqual(
+            DailyActiveStudents.objects.get(
+                date=self.yesterday.date()).students, 2)
+
+    def test_gaps_expire(self):
+        """Ids never filled stop being watched after GAP_SECONDS."""
+        skipped = self.answer(self.students[0], self.questions[0], 1)
+        self.answer(self.students[0], self.questions[1], 1)
+        skipped.delete()
+        roll_up()
+        with override_settings(ANALYTICS={
+                **settings.ANALYTICS, 'SETTLE_SECONDS': 0,
+                'GAP_SECONDS': 0
+        }):
+            roll_up()
+        self.assertEqual(
+            RollupWatermark.objects.get(name=WATERMARK).gaps, {})
+
+    def test_deleted_responses_are_taken_out(self):
+        """Unfolding responses before deleting them leaves the rollups a
+            rebuild from the remaining responses would have."""
+        def rollups():
+            # pylint: disable=no-member
+            return [
+                list(model.objects.order_by(*order).values_list(*fields))
+                for model, order, fields in (
+                    (DailyQuizRollup, ['date'],
+                     ['date', 'responses', 'points', 'max_points',
+                      'students', 'completions']),
+                    (HourlyQuizRollup, ['hour'],
+                     ['hour', 'responses', 'points', 'max_points']),
+                    (DailyActiveStudents, ['date'], ['date', 'students']),
+                )
+            ]
+
+        today = timezone.now() - timedelta(hours=1)
+        self.answer(self.students[0], self.questions[0], 1)
+        completing = self.answer(self.students[0], self.questions[1], 2)
+        only = self.answer(self.students[1], self.questions[0], 1)
+        self.answer(self.students[2], self.questions[0], 1, created_at=today)
+        roll_up()
+        pending = self.answer(self.students[2], self.questions[1], 2,
+                              created_at=today)
+        deleted = QuizResponse.objects.filter(
+            id__in=[completing.id, only.id, pending.id])
+
+        unfold(deleted)
+        deleted.delete()
+        roll_up()
+        unfolded = rollups()
+        self.assertEqual(unfolded[0][0][1:], (1, 1, 1, 1, 0))
+        reset()
+        roll_up()
+        self.assertEqual(unfolded, rollups())
+
+
+class ReportTests(RollupTestCase):
+    """Tests for the reports read from the rollups."""
+
+    def setUp(self):
+        super().setUp()
+        self.answer(self.students[0], self.questions[0], 1)
+        self.answer(self.students[0], self.questions[1], 0)
+        self.answer(self.students[1], self.questions[0], 1)
+        roll_up()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.day = self.yesterday.date().isoformat()
+
+    def test_quiz_report(self):
+        """Rows per day or group carry sums and the average score."""
+        rows = self.client.get('/v1/analytics/quizzes/', {
+            'start': self.day,
+            'end': self.day
+        }).json()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['key'], self.day)
+        self.assertEqual((rows[0]['responses'], rows[0]['points'],
+                          rows[0]['max_points'], rows[0]['students'],
+                          rows[0]['completions']), (3, 2, 4, 2, 1))
+        self.assertEqual(rows[0]['average_score'], 50.0)
+
+        rows = self.client.get('/v1/analytics/quizzes/', {
+            'start': self.day,
+            'end': self.day,
+            'period': 'hour',
+            'group_by': 'content'
+        }).json()
+        self.assertEqual([(row['key'], row['responses']) for row in rows],
+                         [(str(self.content.id), 3)])
+
+    def test_active_students_report(self):
+        rows = self.client.get('/v1/analytics/active-students/', {
+            'start': self.day,
+            'end': self.day
+        }).json()
+        self.assertEqual(rows, [{'date': self.day, 'students': 2}])
+
+    def test_reports_validate_and_require_staff(self):
+        """Bad ranges are refused, and reports are for staff only."""
+        self.assertEqual(
+            self.client.get('/v1/analytics/quizzes/', {
+                'start': '2024-01-02',
+                'end': '2024-01-01'
+            }).status_code, 400)
+        self.assertEqual(
+            self.client.get('/v1/analytics/quizzes/', {
+                'group_by': 'student'
+            }).status_code, 400)
+        student = APIClient()
+        student.force_authenticate(self.students[0])
+        self.assertEqual(
+            student.get('/v1/analytics/quizzes/').status_code, 403)
@@ -0,0 +1,9 @@
+"""`analytics` App URL Configuration"""
+from django.urls import path
+
+import analytics.views as analytics_views
+
+urlpatterns = [
+    path("active-students/", analytics_views.ActiveStudentsReport.as_view()),
+    path("quizzes/", analytics_views.QuizReport.as_view()),
+]
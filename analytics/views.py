@@ -0,0 +1,152 @@
+"""
+    Analytics views
+    Staff reports, read from the rollup tables only.
+"""
+
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import exceptions
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from analytics import models
+from analytics.rollups import day_range
+
+DATE_PARAMETERS = [
+    OpenApiParameter("start",
+                     date,
+                     description="First day, UTC. Defaults to 29 days "
+                     "before `end`."),
+    OpenApiParameter("end", date, description="Last day, UTC. Defaults to "
+                     "today."),
+]
+
+# group_by value -> rollup field
+GROUPS = {
+    'quiz': 'quiz',
+    'class': 'class_id',
+    'institution': 'institution',
+    'content': 'content',
+}
+
+
+def date_range(request, max_days: int) -> tuple:
+    """Returns the start and end days of the report."""
+    try:
+        end = date.fromisoformat(request.query_params['end']) if (
+            'end' in request.query_params) else timezone.now().date()
+        start = date.fromisoformat(request.query_params['start']) if (
+            'start' in request.query_params) else end - timedelta(days=29)
+    except ValueError as ve:
+        raise exceptions.ValidationError(
+            "start and end must be dates as YYYY-MM-DD.") from ve
+    if not 0 <= (end - start).days < max_days:
+        raise exceptions.ValidationError(
+            f"start must be before end, at most {max_days} days apart.")
+    return start, end
+
+
+def report_key(value) -> str | None:
+    """Formats the group of a report row."""
+    if isinstance(value, date):
+        return value.isoformat()
+    return None if value is None else str(value)
+
+
+class ActiveStudentsReport(APIView):
+    """Daily active students."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.ActiveStudentsSerializer
+
+    @extend_schema(description="Returns the number of distinct students "
+                   "with quiz responses on each day.",
+                   parameters=DATE_PARAMETERS,
+                   responses={200: models.ActiveStudentsSerializer(many=True)})
+    def get(self, request):
+        """Returns the daily active students."""
+        start, end = date_range(request, settings.ANALYTICS['MAX_DAYS'])
+        # pylint: disable=no-member
+        rollups = models.DailyActiveStudents.objects.filter(
+            date__range=(start, end)).order_by('date')
+        return Response(
+            models.ActiveStudentsSerializer(rollups, many=True).data)
+
+
+class QuizReport(APIView):
+    """Quiz responses, scores and completions."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.QuizReportRowSerializer
+
+    @extend_schema(
+        description="Returns quiz activity per day or hour, or per quiz, "
+        "class, institution or content over the range.",
+        parameters=DATE_PARAMETERS + [
+            OpenApiParameter("period",
+                             str,
+                             enum=["day", "hour"],
+                             description="Rollup to read. Hourly reports "
+                             "span at most 31 days. Defaults to day."),
+            OpenApiParameter("group_by",
+                             str,
+                             enum=["period", *GROUPS],
+                             description="Defaults to period."),
+            OpenApiParameter("quiz", int),
+            OpenApiParameter("class", int),
+            OpenApiParameter("institution", int),
+            OpenApiParameter("content", int),
+        ],
+        responses={200: models.QuizReportRowSerializer(many=True)})
+    def get(self, request):
+        """Returns the quiz activity report."""
+        period = request.query_params.get('period', 'day')
+        if period not in ('day', 'hour'):
+            raise exceptions.ValidationError("period must be day or hour.")
+        group_by = request.query_params.get('group_by', 'period')
+        if group_by != 'period' and group_by not in GROUPS:
+            raise exceptions.ValidationError(
+                f"group_by must be one of period, {', '.join(GROUPS)}.")
+
+        # pylint: disable=no-member
+        fields = ['responses', 'points', 'max_points']
+        if period == 'day':
+            start, end = date_range(request, settings.ANALYTICS['MAX_DAYS'])
+            rollups = models.DailyQuizRollup.objects.filter(
+                date__range=(start, end))
+            period_field = 'date'
+            fields += ['students', 'completions']
+        else:
+            start, end = date_range(request,
+                                    settings.ANALYTICS['MAX_HOURLY_DAYS'])
+            first, last = day_range(start, end)
+            rollups = models.HourlyQuizRollup.objects.filter(hour__gte=first,
+                                                             hour__lt=last)
+            period_field = 'hour'
+        for name, field in GROUPS.items():
+            if name in request.query_params:
+                try:
+                    rollups = rollups.filter(
+                        **{field: int(request.query_params[name])})
+                except ValueError as ve:
+                    raise exceptions.ValidationError(
+                        f"{name} must be an integer.") from ve
+
+        group = period_field if group_by == 'period' else GROUPS[group_by]
+        rows = rollups.values(group).annotate(
+            **{f'total_{field}': Sum(field)
+               for field in fields}).order_by(group)
+        return Response(
+            models.QuizReportRowSerializer([{
+                'key':
+                report_key(row[group]),
+                'average_score':
+                row['total_points'] / row['total_max_points'] *
+                100 if row['total_max_points'] else None,
+                **{field: row[f'total_{field}']
+                   for field in fields}
+            } for row in rows],
+                                           many=True).data)
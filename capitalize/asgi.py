@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'capitalize.settings')
 
 application = get_asgi_application()
+
+# Imported once the apps are loaded, and only when enabled.
+from django.conf import settings  # pylint: disable=wrong-import-position
+
+if settings.WARMUP['ON_BOOT']:
+    from capitalize.warmup import warm_up_on_boot  # pylint: disable=wrong-import-position
+    warm_up_on_boot()
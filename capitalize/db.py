@@ -0,0 +1,17 @@
+"""
+    Database helpers.
+    Query options that depend on the database backend, shared by the apps.
+"""
+
+from typing import List
+
+from django.db import connection
+
+
+def upsert_options(unique_fields: List[str], update_fields: List[str]) -> dict:
+    """Returns the `bulk_create` options of an upsert on this database.
+        MySQL upserts on any unique key and rejects `unique_fields`."""
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = unique_fields
+    return options
@@ -0,0 +1,202 @@
+"""
+    Structured logging.
+    Log records are written as JSON lines by a background thread, so
+    requests never wait on formatting or stdout. Each record carries the
+    id of the request it was logged in, and high-volume loggers can be
+    sampled, see LOG_SAMPLING.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Ids sent by clients or proxies are kept when they look like ids.
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Attributes of every LogRecord, the others are `extra` fields.
+RECORD_ATTRIBUTES = set(
+    logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {
+        'message', 'asctime', 'request_id', 'sample_rate', 'taskName'
+    }
+
+request_id: ContextVar[str | None] = ContextVar('request_id', default=None)
+request_logger = logging.getLogger('capitalize.requests')
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time':
+            datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        if getattr(record, 'sample_rate', 1.0) < 1.0:
+            entry['sample_rate'] = record.sample_rate
+        entry.update((key, value) for key, value in record.__dict__.items()
+                     if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the id of the current request to records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Django logs failed requests once the middleware has returned.
+        record.request_id = request_id.get() or getattr(
+            getattr(record, 'request', None), 'request_id', None)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a share of the INFO and DEBUG records of the loggers listed
+        in LOG_SAMPLING, and of their children. Warnings and errors are
+        always kept."""
+
+    def __init__(self):
+        super().__init__()
+        self.rates = {}
+
+    def rate(self, name: str) -> float:
+        """Returns the share of records kept for a logger."""
+        if name not in self.rates:
+            rates = settings.LOG_SAMPLING
+            parent = name
+            while parent and parent not in rates:
+                parent = parent.rpartition('.')[0]
+            self.rates[name] = rates.get(parent, 1.0)
+        return self.rates[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate(record.name)
+        if rate >= 1.0:
+            return True
+        record.sample_rate = rate
+        return random.random() < rate
+
+
+class BackgroundHandler(QueueHandler):
+    """Hands records to a thread that formats and writes them to a stream.
+        Records are dropped, and counted, while the queue is full rather
+        than blocking the request. The count is logged as a warning once
+        the queue takes records again."""
+
+    def __init__(self, stream=None, queue_size: int = 10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.target.setFormatter(JsonFormatter())
+        self.listener: QueueListener | None = None
+        self.pid = None
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+
+    def start(self):
+        """Starts the writer thread, again in forked workers."""
+        with self.start_lock:
+            if self.pid != os.getpid():
+                self.listener = QueueListener(self.queue, self.target)
+                self.listener.start()
+                self.pid = os.getpid()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue is in-process, the writer thread formats the record.
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+            return
+        if self.dropped:
+            self.report_dropped()
+
+    def report_dropped(self):
+        """Queues a warning with the number of records dropped so far."""
+        with self.dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if not dropped:
+            return
+        warning = logging.makeLogRecord({
+            'name': __name__,
+            'levelno': logging.WARNING,
+            'levelname': 'WARNING',
+            'msg': "Dropped %d log records while the queue was full",
+            'args': (dropped, ),
+            'dropped': dropped,
+        })
+        try:
+            self.queue.put_nowait(warning)
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += dropped
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
+class RequestIdMiddleware:
+    """Binds a request id to the records logged while handling a request,
+        returns it in the X-Request-ID header and logs the request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        current = incoming if REQUEST_ID_PATTERN.match(
+            incoming) else uuid.uuid4().hex
+        request.request_id = current
+        token = request_id.set(current)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            response[REQUEST_ID_HEADER] = current
+            request_logger.log(
+                logging.ERROR
+                if response.status_code >= 500 else logging.INFO,
+                "%s %s %s",
+                request.method,
+                request.path,
+                response.status_code,
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms':
+                    round((time.perf_counter() - start) * 1000, 1),
+                    'user_id': getattr(request.user, 'id', None)
+                    if hasattr(request, 'user') else None,
+                })
+            return response
+        finally:
+            request_id.reset(token)
@@ -44,10 +44,11 @@ INSTALLED_APPS = [
     "django.contrib.contenttypes", "django.contrib.sessions",
     "django.contrib.staticfiles", "django.contrib.messages", "rest_framework",
     "rest_framework_simplejwt", "drf_spectacular", "corsheaders", "accounts",
-    "lessons"
+    "lessons", "analytics"
 ]
 
 MIDDLEWARE = [
+    "capitalize.logs.RequestIdMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -84,7 +85,14 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES":
     ("rest_framework.permissions.IsAuthenticated", ),
     "DEFAULT_SCHEMA_CLASS":
-    "drf_spectacular.openapi.AutoSchema"
+    "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_RATES": {
+        "wait_list_ip": os.getenv("WAIT_LIST_IP_RATE", "5/min"),
+        "wait_list_domain": os.getenv("WAIT_LIST_DOMAIN_RATE", "120/min"),
+    },
+    # Trusted proxies in front of the app. Throttles read the client IP
+    # they appended to X-Forwarded-For; 0 uses the connection's address.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0")),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -115,6 +123,17 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# OpenAPI schema artifact, built at deploy time with `manage.py build_schema`
+SCHEMA_FILE = BASE_DIR / "schema.yml"
+SCHEMA_CACHE_MAX_AGE = 60 * 60
+
+# Worker startup budget, checked by `manage.py bench_startup --check` and tests
+STARTUP_BUDGET = {
+    "SECONDS": 2.0,
+    "MODULES": 900,
+    "LAZY_MODULES": ["boto3", "botocore", "jsonschema"],
+}
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -135,8 +154,230 @@ DATABASES = {
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASS"),
         "HOST": os.getenv("DB_HOST"),
-        "PORT": os.getenv("DB_PORT")
+        "PORT": os.getenv("DB_PORT"),
+        # Seconds a worker keeps its connection, 0 closes it after each
+        # request. Kept connections are checked before reuse.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+# Cache
+# Shared by all workers when REDIS_URL is set, per-process memory otherwise.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
     }
+
+# Object storage for lesson content
+# ENDPOINT_URL points at any S3-compatible service, e.g. a local stand-in.
+
+CONTENT_STORAGE = {
+    "BUCKET": os.getenv("CONTENT_BUCKET"),
+    "ENDPOINT_URL": os.getenv("CONTENT_STORAGE_ENDPOINT_URL"),
+    "REGION": os.getenv("CONTENT_STORAGE_REGION", "us-east-1"),
+    # Presigned download URLs stay valid for at least URL_TTL seconds and
+    # are re-signed at most once per URL_TTL_BUCKET seconds.
+    "URL_TTL": 15 * 60,
+    "URL_TTL_BUCKET": 5 * 60,
+    # Size of each part of a multipart upload, at least 5 MiB.
+    "UPLOAD_PART_SIZE": 8 * 1024 * 1024,
+}
+
+# Media metadata extraction for new and changed content
+
+MEDIA_METADATA = {
+    "ENABLED": os.getenv("MEDIA_METADATA_ENABLED", "true") == "true",
+    # Files processed at once, and files queued before extraction is skipped
+    "WORKERS": 2,
+    "MAX_PENDING": 64,
+}
+
+# Delta sync of lessons, quizzes and questions
+
+SYNC = {
+    # How far the sync watermark trails the clock, to let writes settle
+    "SETTLE_SECONDS": 5,
+    # How long deletions are kept; older sync tokens get a full snapshot
+    "TOMBSTONE_DAYS": 90,
+}
+
+# Write-behind buffering of quiz responses during exam bursts
+
+QUIZ_RESPONSE_BUFFER = {
+    "ENABLED": os.getenv("QUIZ_RESPONSE_BUFFER_ENABLED", "false") == "true",
+    # Shared Redis list when set, a SQLite file local to the host otherwise
+    "REDIS_URL": os.getenv("QUIZ_RESPONSE_BUFFER_REDIS_URL",
+                           os.getenv("REDIS_URL")),
+    "QUEUE_PATH": os.getenv("QUIZ_RESPONSE_QUEUE_PATH",
+                            BASE_DIR / "quiz_response_queue.sqlite3"),
+    # Responses written per transaction, and seconds between flushes
+    "BATCH_SIZE": 500,
+    "FLUSH_INTERVAL": 1.0,
+    # How long a queued response blocks a duplicate submission
+    "PENDING_TTL": 3600,
+}
+
+# Idempotency-Key support on retried POST endpoints
+
+IDEMPOTENCY = {
+    # Seconds a key replays its response
+    "TTL": 24 * 60 * 60,
+}
+
+# Per-quiz and per-class leaderboards
+
+LEADERBOARDS = {
+    # Shared Redis sorted sets when set, the default cache otherwise
+    "REDIS_URL": os.getenv("LEADERBOARDS_REDIS_URL", os.getenv("REDIS_URL")),
+    # Most students returned by a top-N request
+    "MAX_LIMIT": 100,
+}
+
+# Daily activity streaks of Profile.streak_days
+
+STREAKS = {
+    # Activity counted towards a streak: model, user field, timestamp field
+    "ACTIVITY": [
+        ("lessons.QuizResponse", "student", "created_at"),
+    ],
+    # Profiles of active users read and updated per query
+    "CHUNK_SIZE": 1000,
+}
+
+# Playback progress of video and audio content
+
+PLAYBACK = {
+    # Seconds between writes of the coalesced heartbeats
+    "FLUSH_INTERVAL": 30,
+    # How long the latest position is served from the cache
+    "CACHE_TTL": 24 * 60 * 60,
+}
+
+# Learning analytics rollups
+
+ANALYTICS = {
+    # Responses folded into the rollups per transaction
+    "CHUNK_SIZE": 5000,
+    # How long a response settles before it is folded, like SYNC
+    "SETTLE_SECONDS": 5,
+    # Ids the watermark passed over are watched this long for late inserts,
+    # buffered responses keep their submission time; at most MAX_GAPS ids.
+    "GAP_SECONDS": 300,
+    "MAX_GAPS": 1000,
+    # Longest report range, in days
+    "MAX_DAYS": 366,
+    "MAX_HOURLY_DAYS": 31,
+}
+
+# CSV roster imports of institutions, classes and enrollments
+
+ROSTER_IMPORT = {
+    # Rows validated and written per transaction
+    "CHUNK_SIZE": 1000,
+    # Rejected rows listed in the report, all are counted
+    "MAX_ERRORS": 100,
+}
+
+# JSON quiz document imports
+
+QUIZ_IMPORT = {
+    "MAX_QUIZZES": 50,
+    "MAX_QUESTIONS": 2000,
+}
+
+# Single-flight reads of hot quizzes, versions and content
+
+SINGLE_FLIGHT = {
+    # How long shared quiz and content rows are cached
+    "TTL": 60,
+    # Seconds a process may hold the fill lock of a key, how long the
+    # others wait for it before reading the database themselves, and how
+    # often they check the cache meanwhile
+    "LOCK_TTL": 10,
+    "LOCK_WAIT": 5,
+    "POLL_INTERVAL": 0.05,
+}
+
+# Cache warmup, on deploy with `manage.py warm_cache` and on worker boot
+
+WARMUP = {
+    "ON_BOOT": os.getenv("WARMUP_ON_BOOT", "false") == "true",
+    # Seconds spent warming at most, on deploy and on each worker boot
+    "BUDGET": 60,
+    "BOOT_BUDGET": 5,
+    # Most active quizzes and content preloaded, ranked over the last DAYS
+    "QUIZZES": 200,
+    "CONTENT": 100,
+    "DAYS": 7,
+    # Modules imported on first use, loaded before the first request
+    "IMPORTS": STARTUP_BUDGET["LAZY_MODULES"],
+}
+
+# Structured logging
+# JSON lines on stdout, formatted and written by a background thread.
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "request_id": {
+            "()": "capitalize.logs.RequestIdFilter"
+        },
+        "sampling": {
+            "()": "capitalize.logs.SamplingFilter"
+        },
+    },
+    "handlers": {
+        "background": {
+            "()": "capitalize.logs.BackgroundHandler",
+            "stream": "ext://sys.stdout",
+            # Records waiting to be written; more are dropped
+            "queue_size": 10000,
+            "filters": ["sampling", "request_id"],
+        },
+    },
+    "root": {
+        "handlers": ["background"],
+        "level": os.getenv("LOG_LEVEL", "INFO"),
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["background"],
+            "level": os.getenv("LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+# Share of the INFO and DEBUG records kept per logger, children included.
+# Warnings and errors are always kept.
+
+LOG_SAMPLING = {
+    # One line per request
+    "capitalize.requests": float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.1")),
+}
+
+# Slow query capture, listed for staff at /v1/slow-queries/
+
+SLOW_QUERIES = {
+    "ENABLED": os.getenv("SLOW_QUERIES_ENABLED", "true") == "true",
+    # Queries taking at least this long are recorded
+    "THRESHOLD_MS": float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200")),
+    # Most recent slow queries kept, shared by all workers
+    "BUFFER_SIZE": 200,
+    # Frames of project code recorded per query, innermost first
+    "STACK_DEPTH": 5,
 }
 
 # Password validation
@@ -0,0 +1,170 @@
+"""
+    Slow query capture.
+    Every database connection runs its queries through an execute wrapper
+    that times them. Queries slower than SLOW_QUERIES['THRESHOLD_MS'] are
+    recorded with their normalized SQL, the project code that ran them and
+    the request they ran in, in a ring buffer in the shared cache. Staff
+    can list them and EXPLAIN them on demand.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+from typing import List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+from capitalize.logs import request_id
+
+COUNT_KEY = 'slow_query_count'
+SLOT_KEY = 'slow_query_{}'
+# Normalization: literals and placeholders become ?, lists of them (?).
+STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+PLACEHOLDER = re.compile(r'%s|\?')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+logger = logging.getLogger(__name__)
+
+
+class ExplainError(ValueError):
+    """Raised when a recorded query cannot be explained."""
+
+
+def normalize(sql: str) -> str:
+    """Returns the SQL with its values left out, so runs of the same
+        query with different parameters read the same."""
+    sql = STRING_LITERAL.sub('?', sql)
+    sql = NUMBER_LITERAL.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = VALUE_LIST.sub('(?)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def callers(depth: int) -> List[str]:
+    """Returns the innermost frames of project code on the stack."""
+    root = str(settings.BASE_DIR) + os.sep
+    frames = []
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    while frame is not None and len(frames) < depth:
+        path = frame.f_code.co_filename
+        if (path.startswith(root) and path != __file__
+                and 'site-packages' not in path):
+            name = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+            frames.append(
+                f"{path[len(root):]}:{frame.f_lineno} in {name}")
+        frame = frame.f_back
+    return frames
+
+
+def slot_key(query_id: int) -> str:
+    """Returns the cache key of the ring buffer slot of a query."""
+    return SLOT_KEY.format(query_id % settings.SLOW_QUERIES['BUFFER_SIZE'])
+
+
+def record(entry: dict):
+    """Adds a slow query to the ring buffer, overwriting the oldest."""
+    cache.add(COUNT_KEY, 0, None)
+    entry['id'] = cache.incr(COUNT_KEY)
+    cache.set(slot_key(entry['id']), entry, None)
+
+
+def recent() -> List[dict]:
+    """Returns the recorded slow queries, newest first."""
+    entries = cache.get_many([
+        SLOT_KEY.format(slot)
+        for slot in range(settings.SLOW_QUERIES['BUFFER_SIZE'])
+    ])
+    return sorted(entries.values(), key=lambda entry: entry['id'], reverse=True)
+
+
+def get(query_id: int) -> dict | None:
+    """Returns a recorded slow query, None once it was overwritten."""
+    entry = cache.get(slot_key(query_id))
+    return entry if entry is not None and entry['id'] == query_id else None
+
+
+def explain(entry: dict) -> List[dict]:
+    """Runs EXPLAIN for a recorded query and keeps the plan with it."""
+    if entry['many'] or not entry['raw_sql'].lstrip().upper().startswith(
+            ('SELECT', 'WITH')):
+        raise ExplainError("Only single SELECT queries can be explained.")
+    connection = connections[entry['alias']]
+    prefix = ('EXPLAIN QUERY PLAN'
+              if connection.vendor == 'sqlite' else 'EXPLAIN')
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {entry['raw_sql']}", entry['params'])
+        columns = [column[0] for column in cursor.description]
+        entry['plan'] = [
+            dict(zip(columns, row)) for row in cursor.fetchall()
+        ]
+    if get(entry['id']) is not None:
+        cache.set(slot_key(entry['id']), entry, None)
+    return entry['plan']
+
+
+class SlowQueryWrapper:
+    """Execute wrapper timing the queries of a connection."""
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            if duration >= settings.SLOW_QUERIES['THRESHOLD_MS']:
+                self.capture(sql, params, many, duration)
+
+    def capture(self, sql, params, many: bool, duration: float):
+        """Records and logs a slow query."""
+        config = settings.SLOW_QUERIES
+        normalized = normalize(sql)
+        stack = callers(config['STACK_DEPTH'])
+        entry = {
+            'recorded_at': timezone.now(),
+            'alias': self.alias,
+            'duration_ms': round(duration, 1),
+            'fingerprint': hashlib.sha1(normalized.encode()).hexdigest()[:12],
+            'sql': normalized,
+            'callsite': stack[0] if stack else None,
+            'stack': stack,
+            'request_id': request_id.get(),
+            'many': many,
+            # Kept for EXPLAIN, never returned by the API.
+            'raw_sql': sql,
+            'params': None if many else params,
+            'plan': None,
+        }
+        logger.warning("Slow query took %.1f ms",
+                       duration,
+                       extra={
+                           key: entry[key]
+                           for key in ('alias', 'duration_ms', 'fingerprint',
+                                       'sql', 'callsite')
+                       })
+        try:
+            record(entry)
+        except Exception:  # pylint: disable=broad-except
+            # Recording must never fail the query.
+            logger.exception("Recording a slow query failed")
+
+
+@receiver(connection_created)
+def wrap_connection(sender, connection, **kwargs):
+    """Times the queries of each new connection, once."""
+    if settings.SLOW_QUERIES['ENABLED'] and not any(
+            isinstance(wrapper, SlowQueryWrapper)
+            for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryWrapper(connection.alias))
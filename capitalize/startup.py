@@ -0,0 +1,102 @@
+"""
+    Worker startup measurements.
+    Boots the application in a fresh interpreter under `python -X importtime`
+    and reports how long it took and which modules it imported.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from typing import List
+
+from django.conf import settings
+
+# Runs in the child interpreter: boots the WSGI app and loads the URLconf,
+# which is what every worker does before serving its first request.
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "modules": sorted(sys.modules)}))
+"""
+
+
+@dataclass
+class ImportCost:
+    """Import cost of a single module, in microseconds."""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupReport:
+    """Result of booting a worker in a fresh interpreter."""
+    seconds: float
+    modules: List[str]
+    imports: List[ImportCost] = field(default_factory=list)
+
+    @property
+    def module_count(self) -> int:
+        """Number of modules loaded once the worker is ready."""
+        return len(self.modules)
+
+    def top_level(self) -> List[ImportCost]:
+        """Returns the imports triggered directly by the boot script."""
+        return [cost for cost in self.imports if cost.depth == 0]
+
+
+def parse_importtime(output: str) -> List[ImportCost]:
+    """Parses the stderr of `python -X importtime`."""
+    costs = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        costs.append(
+            ImportCost(module=name.strip(),
+                       self_us=int(self_us),
+                       cumulative_us=int(cumulative_us),
+                       depth=depth))
+    return costs
+
+
+def measure_startup() -> StartupReport:
+    """Boots the application in a fresh interpreter and measures it."""
+    env = {
+        **os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE
+    }
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT],
+                            cwd=settings.BASE_DIR,
+                            env=env,
+                            capture_output=True,
+                            text=True,
+                            check=True)
+    boot = json.loads(result.stdout.strip().splitlines()[-1])
+    return StartupReport(seconds=boot['seconds'],
+                         modules=boot['modules'],
+                         imports=parse_importtime(result.stderr))
+
+
+def check_budget(report: StartupReport) -> List[str]:
+    """Returns the ways in which the report exceeds STARTUP_BUDGET."""
+    budget = settings.STARTUP_BUDGET
+    errors = []
+    if report.seconds > budget['SECONDS']:
+        errors.append(f"Startup took {report.seconds:.3f}s, "
+                      f"budget is {budget['SECONDS']}s.")
+    if report.module_count > budget['MODULES']:
+        errors.append(f"{report.module_count} modules loaded, "
+                      f"budget is {budget['MODULES']}.")
+    eager = sorted(set(budget['LAZY_MODULES']) & set(report.modules))
+    if eager:
+        errors.append(f"Lazy modules imported at startup: {', '.join(eager)}.")
+    return errors
@@ -15,18 +15,22 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (SpectacularAPIView, SpectacularRedocView,
-                                   SpectacularSwaggerView)
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
 
 from accounts.urls import urlpatterns as accounts_urls
-from accounts.views import ApiRoot
+from accounts.views import (ApiRoot, SchemaView, SlowQueryExplain,
+                            SlowQueryList)
 
 urlpatterns = [
     path("", ApiRoot.as_view()),
     path('admin/', admin.site.urls),
     path('v1/auth/', include(accounts_urls)),
     path('v1/lessons/', include('lessons.urls')),
-    path('v1/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('v1/analytics/', include('analytics.urls')),
+    path('v1/slow-queries/', SlowQueryList.as_view()),
+    path('v1/slow-queries/<int:query_id>/explain/',
+         SlowQueryExplain.as_view()),
+    path('v1/schema/', SchemaView.as_view(), name='schema'),
     path('v1/schema/swagger/',
          SpectacularSwaggerView.as_view(url_name='schema'),
          name='swagger-ui'),
@@ -0,0 +1,173 @@
+"""
+    Cache warmup.
+    Preloads the shared rows and payloads of the most active quizzes and
+    content into the cache, and primes database connections and lazily
+    imported modules, so the first requests after a deploy or worker boot
+    do not all go to the database. Runs within a time budget; whatever
+    does not fit is reported as skipped.
+"""
+
+import importlib
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Callable, Iterable, List
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Sum
+from django.urls import get_resolver
+from django.utils import timezone
+
+from analytics.models import DailyQuizRollup
+from lessons.delivery import get_delivery_service
+from lessons.models import Content, Quiz, QuizVersion
+from lessons.progress import content_format
+from lessons.versions import version_payload
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupStep:
+    """Items warmed by one step of the warmup."""
+    name: str
+    warmed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    # Items left, the step was cut short once `exhausted`.
+    skipped: int = 0
+    exhausted: bool = False
+    seconds: float = 0.0
+
+
+@dataclass
+class WarmupReport:
+    """Result of a warmup."""
+    budget: float
+    seconds: float = 0.0
+    steps: List[WarmupStep] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every item was warmed within the budget."""
+        return not any(step.exhausted for step in self.steps)
+
+
+class Warmup:
+    """Runs warmup steps until the time budget runs out."""
+
+    def __init__(self, budget: float):
+        self.start = time.monotonic()
+        self.deadline = self.start + budget
+        self.report = WarmupReport(budget=budget)
+
+    def step(self, name: str, items: Callable[[], Iterable],
+             warm: Callable[[Any], Any]):
+        """Warms the items of a step one at a time.
+            A failing item, or failing to list the items, is reported and
+            the warmup goes on."""
+        step = WarmupStep(name)
+        self.report.steps.append(step)
+        started = time.monotonic()
+        step.exhausted = started >= self.deadline
+        try:
+            pending = [] if step.exhausted else list(items())
+        except Exception as e:  # pylint: disable=broad-except
+            pending = []
+            step.failed.append(f"{name}: {e}")
+        for index, item in enumerate(pending):
+            if time.monotonic() >= self.deadline:
+                step.skipped = len(pending) - index
+                step.exhausted = True
+                break
+            try:
+                warm(item)
+                step.warmed.append(str(item))
+            except Exception as e:  # pylint: disable=broad-except
+                step.failed.append(f"{item}: {e}")
+        step.seconds = time.monotonic() - started
+        self.report.seconds = time.monotonic() - self.start
+
+
+def ranked(field_name: str, fallback, limit: int, days: int) -> List[int]:
+    """Returns the ids of the quizzes or content with the most responses
+        over the last days, most active first. Recently updated rows fill
+        in while the analytics rollups are empty or not running."""
+    since = timezone.now().date() - timedelta(days=days)
+    # pylint: disable=no-member
+    ids = list(
+        DailyQuizRollup.objects.filter(date__gte=since).values(
+            field_name).annotate(total=Sum('responses')).order_by(
+                '-total').values_list(field_name, flat=True)[:limit])
+    if len(ids) < limit:
+        ids += fallback.exclude(id__in=ids).order_by('-updated_at').values_list(
+            'id', flat=True)[:limit - len(ids)]
+    return ids
+
+
+def warm_quiz(quiz_id: int):
+    """Caches a quiz and its published version as students read them."""
+    quiz = Quiz.shared(quiz_id)
+    if quiz is not None and quiz.published_version_id is not None:
+        QuizVersion.frozen(quiz.published_version_id)
+        version_payload(quiz.published_version_id)
+
+
+def warm_content(content_id: int):
+    """Caches a content, its format and its download URL."""
+    content = Content.shared(content_id)
+    if content is not None:
+        content_format(content_id)
+        get_delivery_service().presigned_url(content)
+
+
+def warm_up(budget: float | None = None,
+            quizzes: int | None = None,
+            content: int | None = None,
+            connect: bool = True) -> WarmupReport:
+    """Warms this process and the shared cache, see WARMUP."""
+    config = settings.WARMUP
+    warmup = Warmup(config['BUDGET'] if budget is None else budget)
+    quizzes = config['QUIZZES'] if quizzes is None else quizzes
+    content = config['CONTENT'] if content is None else content
+    # pylint: disable=no-member
+    if connect:
+        warmup.step('connections', lambda: connections,
+                    lambda alias: connections[alias].ensure_connection())
+    warmup.step('imports', lambda: config['IMPORTS'], importlib.import_module)
+    warmup.step('urls', lambda: [settings.ROOT_URLCONF],
+                lambda urlconf: get_resolver(urlconf).url_patterns)
+    warmup.step(
+        'quizzes', lambda: ranked(
+            'quiz', Quiz.objects.filter(published_version__isnull=False),
+            quizzes, config['DAYS']), warm_quiz)
+    warmup.step(
+        'content', lambda: ranked('content', Content.objects.all(), content,
+                                  config['DAYS']), warm_content)
+    return warmup.report
+
+
+def warm_up_on_boot():
+    """Warms a booting worker within WARMUP["BOOT_BUDGET"].
+
+    Never raises: a worker that cannot warm up, on a database not migrated
+    yet for instance, starts cold rather than not at all. Connections are
+    closed afterwards, as with `--preload` this runs in the master process
+    and forked workers must not share its connections.
+    """
+    try:
+        report = warm_up(settings.WARMUP['BOOT_BUDGET'], connect=False)
+        logger.info("Warmed up on boot in %.3fs",
+                    report.seconds,
+                    extra={
+                        'complete': report.complete,
+                        'failed': [
+                            failure for step in report.steps
+                            for failure in step.failed
+                        ],
+                    })
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Warming up on boot failed")
+    finally:
+        connections.close_all()
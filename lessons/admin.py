@@ -1,8 +1,98 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Sum
 
-from .models import Content, Quiz, QuizQuestion, QuizResponse
+from accounts.admin import LargeTableAdmin
+from analytics.rollups import unfold
+from lessons.leaderboards import record_responses
 
-admin.site.register(Content)
-admin.site.register(Quiz)
-admin.site.register(QuizQuestion)
-admin.site.register(QuizResponse)
+from .models import (Content, PlaybackProgress, Quiz, QuizQuestion,
+                     QuizResponse, QuizVersion)
+
+
+@admin.register(Content)
+class ContentAdmin(admin.ModelAdmin):
+    list_display = ['title', 'content_type', 'size', 'updated_at']
+    list_filter = ['content_type']
+    search_fields = ['title']
+
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ['title', 'class_id', 'content_id', 'owner_id']
+    list_select_related = ['class_id', 'content_id', 'owner_id']
+    search_fields = ['title']
+    autocomplete_fields = ['class_id', 'content_id', 'owner_id']
+    readonly_fields = ['published_version']
+
+
+@admin.register(QuizQuestion)
+class QuizQuestionAdmin(admin.ModelAdmin):
+    list_display = ['question', 'quiz', 'weight', 'archived']
+    list_select_related = ['quiz']
+    list_filter = ['archived']
+    search_fields = ['question']
+    autocomplete_fields = ['quiz']
+    exclude = ['responses']
+
+
+@admin.register(QuizVersion)
+class QuizVersionAdmin(admin.ModelAdmin):
+    list_display = ['quiz', 'number', 'published_at', 'published_by']
+    list_select_related = ['quiz', 'published_by']
+    search_fields = ['quiz__title']
+
+    # Versions are created by publishing a quiz and never change.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(QuizResponse)
+class QuizResponseAdmin(LargeTableAdmin):
+    list_display = ['id', 'quiz', 'question', 'student', 'score', 'created_at']
+    list_select_related = ['quiz', 'question', 'student']
+    list_filter = ['created_at']
+    search_fields = ['=student__username']
+    autocomplete_fields = ['quiz', 'question', 'version', 'student']
+    actions = ['delete_responses']
+
+    def get_actions(self, request):
+        # The stock action loads every selected response to confirm.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description="Delete selected responses",
+                  permissions=['delete'])
+    def delete_responses(self, request, queryset):
+        # The changelist joins the related rows, deleting needs none.
+        queryset = queryset.select_related(None).order_by()
+        with transaction.atomic():
+            # Points each student loses on a quiz board and its class board.
+            totals = list(
+                queryset.values('quiz_id', 'quiz__class_id',
+                                'student_id').annotate(points=Sum('score')))
+            unfold(queryset)
+            # Raw deletes skip the collector, which loads every response and
+            # sends its signals one by one; the boards are updated below.
+            # pylint: disable=protected-access,no-member
+            QuizQuestion.responses.through.objects.filter(
+                quizresponse__in=queryset.values('id'))._raw_delete(
+                    queryset.db)
+            deleted = queryset._raw_delete(queryset.db)
+            transaction.on_commit(lambda: record_responses(
+                [(row['quiz_id'], row['student_id'], -row['points'])
+                 for row in totals],
+                {row['quiz_id']: row['quiz__class_id'] for row in totals}))
+        self.message_user(request, f"Deleted {deleted} responses.")
+
+
+@admin.register(PlaybackProgress)
+class PlaybackProgressAdmin(LargeTableAdmin):
+    list_display = ['student', 'content', 'position', 'updated_at']
+    list_select_related = ['student', 'content']
+    search_fields = ['=student__username']
+    autocomplete_fields = ['student', 'content']
@@ -0,0 +1,103 @@
+"""
+    Quiz documents.
+    Exports the quizzes of a content with their questions as one JSON
+    document, and imports such a document into a content in a single
+    transaction, to author or clone whole quizzes at once.
+"""
+
+from collections import defaultdict
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework import exceptions
+
+from accounts.models import Class, User
+from lessons.models import Content, Quiz, QuizQuestion
+from lessons.search import get_search_backend
+
+QUESTION_FIELDS = ['question', 'options', 'correct_index', 'weight']
+
+
+def export_quizzes(quizzes: Iterable[Quiz]) -> dict:
+    """Returns the quiz document of the draft of the quizzes, in two
+        queries."""
+    quizzes = list(quizzes)
+    questions = defaultdict(list)
+    # pylint: disable=no-member
+    for question in QuizQuestion.objects.filter(
+            quiz__in=quizzes,
+            archived=False).order_by('id').values('quiz_id',
+                                                  *QUESTION_FIELDS):
+        questions[question.pop('quiz_id')].append(question)
+    return {
+        'quizzes': [{
+            'id': quiz.id,
+            'title': quiz.title,
+            'description': quiz.description,
+            'class_id': quiz.class_id_id,
+            'questions': questions[quiz.id],
+        } for quiz in quizzes]
+    }
+
+
+def check_document(document: dict):
+    """Raises unless the document fits the import limits and its classes
+        exist. The rest of the document is validated by its serializer."""
+    limits = settings.QUIZ_IMPORT
+    if len(document['quizzes']) > limits['MAX_QUIZZES']:
+        raise exceptions.ValidationError(
+            f"A document holds at most {limits['MAX_QUIZZES']} quizzes.")
+    if sum(len(quiz['questions'])
+           for quiz in document['quizzes']) > limits['MAX_QUESTIONS']:
+        raise exceptions.ValidationError(
+            f"A document holds at most {limits['MAX_QUESTIONS']} questions.")
+    class_ids = {document['class_id']} if 'class_id' in document else {
+        quiz['class_id']
+        for quiz in document['quizzes']
+    }
+    class_ids.discard(None)
+    # pylint: disable=no-member
+    unknown = class_ids - set(
+        Class.objects.filter(id__in=class_ids).values_list('id', flat=True))
+    if unknown:
+        raise exceptions.ValidationError(
+            f"Unknown classes: {', '.join(map(str, sorted(unknown)))}.")
+
+
+def import_quizzes(content: Content, document: dict, owner: User) -> List[Quiz]:
+    """Creates the quizzes of a validated document for the content."""
+    check_document(document)
+    quizzes = [
+        Quiz(title=quiz['title'],
+             description=quiz['description'],
+             class_id_id=document.get('class_id', quiz['class_id']),
+             content_id=content,
+             owner_id=owner) for quiz in document['quizzes']
+    ]
+    with transaction.atomic():
+        # pylint: disable=no-member
+        if connection.features.can_return_rows_from_bulk_insert:
+            Quiz.objects.bulk_create(quizzes)
+        else:
+            # MySQL returns no ids from bulk inserts, the questions need them.
+            for quiz in quizzes:
+                quiz.save()
+        questions = QuizQuestion.objects.bulk_create([
+            QuizQuestion(quiz=quiz, **{
+                field: question[field]
+                for field in QUESTION_FIELDS
+            }) for quiz, data in zip(quizzes, document['quizzes'])
+            for question in data['questions']
+        ])
+
+    def index():
+        # Bulk inserts send no signals. Rows without ids were inserted on
+        # MySQL, whose FULLTEXT indexes need no updates.
+        backend = get_search_backend()
+        for obj in [*quizzes, *questions]:
+            if obj.pk is not None:
+                backend.index(obj)
+
+    transaction.on_commit(index)
+    return quizzes
@@ -0,0 +1,305 @@
+"""
+    Write-behind buffering of quiz responses.
+    During exam bursts validated answers are appended to a durable queue and
+    acknowledged at once; a background flusher writes them to `QuizResponse`
+    in batches.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from accounts.models import User
+from lessons.leaderboards import record_responses
+from lessons.models import Quiz, QuizQuestion, QuizResponse
+
+PENDING_KEY = 'quiz_response_pending_{quiz}_{question}_{student}'
+FLUSH_LOCK_KEY = 'quiz_response_flush_lock'
+FLUSH_LOCK_TTL = 60
+FLUSHED_KEY = 'quiz_response_flushed'
+LAST_FLUSH_KEY = 'quiz_response_last_flush'
+FAILED_KEY = 'quiz_response_flush_failures'
+LAST_FAILURE_KEY = 'quiz_response_last_flush_failure'
+# Trims the flushed entries only while the flusher still holds the lock.
+TRIM_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('ltrim', KEYS[2], ARGV[2], -1)
+    return 1
+end
+return 0
+"""
+# Releases the lock only if the flusher still holds it.
+RELEASE_IF_OWNER = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateResponse(Exception):
+    """Raised when the student already answered the question."""
+
+
+class LocalQueue:
+    """Durable queue in a SQLite file, shared by the processes of a host."""
+    name = 'local'
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS queue "
+                       "(id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                       "payload TEXT NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def push(self, payload: dict):
+        """Appends an entry, durably, before the request is acknowledged."""
+        db = self._connect()
+        try:
+            db.execute("INSERT INTO queue (payload) VALUES (?)",
+                       (json.dumps(payload), ))
+        finally:
+            db.close()
+
+    def flush(self, batch_size: int, write) -> int:
+        """Passes the oldest entries to `write` and drops them once written.
+            Entries stay queued if `write` raises."""
+        db = self._connect()
+        try:
+            # Serializes flushers; pushes wait for the batch to commit.
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute("SELECT id, payload FROM queue ORDER BY id "
+                              "LIMIT ?", (batch_size, )).fetchall()
+            if rows:
+                write([json.loads(payload) for _, payload in rows])
+                db.execute("DELETE FROM queue WHERE id <= ?", (rows[-1][0], ))
+            db.execute("COMMIT")
+            return len(rows)
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    def stats(self) -> Tuple[int, dict | None]:
+        """Returns the queue depth and the oldest entry."""
+        db = self._connect()
+        try:
+            depth = db.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+            oldest = db.execute(
+                "SELECT payload FROM queue ORDER BY id LIMIT 1").fetchone()
+            return depth, json.loads(oldest[0]) if oldest else None
+        finally:
+            db.close()
+
+
+class RedisQueue:
+    """Durable queue in a Redis list, shared by every worker."""
+    name = 'redis'
+    key = 'quiz_response_queue'
+
+    def __init__(self, url: str):
+        # Only needed when a shared queue is configured.
+        import redis  # pylint: disable=import-outside-toplevel
+        self.redis = redis.Redis.from_url(url)
+        self.trim_if_owner = self.redis.register_script(TRIM_IF_OWNER)
+        self.release_if_owner = self.redis.register_script(RELEASE_IF_OWNER)
+
+    def push(self, payload: dict):
+        """Appends an entry before the request is acknowledged."""
+        self.redis.rpush(self.key, json.dumps(payload))
+
+    def flush(self, batch_size: int, write) -> int:
+        """Passes the oldest entries to `write` and drops them once written.
+            Entries stay queued if `write` raises.
+
+            Only one flusher at a time may read and trim the list. The lock
+            lives in the same Redis and is checked again when trimming: a
+            flusher that outlived its lock leaves the entries queued, and
+            the next flush drops them as duplicates."""
+        token = uuid.uuid4().hex
+        if not self.redis.set(FLUSH_LOCK_KEY, token, nx=True,
+                              ex=FLUSH_LOCK_TTL):
+            return 0
+        try:
+            entries = self.redis.lrange(self.key, 0, batch_size - 1)
+            if entries:
+                write([json.loads(entry) for entry in entries])
+                if not self.trim_if_owner(keys=[FLUSH_LOCK_KEY, self.key],
+                                          args=[token, len(entries)]):
+                    logger.warning("Flush lock expired before trimming",
+                                   extra={'entries': len(entries)})
+            return len(entries)
+        finally:
+            self.release_if_owner(keys=[FLUSH_LOCK_KEY], args=[token])
+
+    def stats(self) -> Tuple[int, dict | None]:
+        """Returns the queue depth and the oldest entry."""
+        depth = self.redis.llen(self.key)
+        oldest = self.redis.lindex(self.key, 0)
+        return depth, json.loads(oldest) if oldest else None
+
+
+class ResponseBuffer:
+    """Buffers quiz responses and flushes them in batches."""
+
+    def __init__(self, queue, batch_size: int, interval: float):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self.flusher: threading.Thread | None = None
+        self.lock = threading.Lock()
+
+    def submit(self, response: QuizResponse):
+        """Queues a validated response.
+            Raises DuplicateResponse if the student already answered, either
+            in the database or in a response still waiting in the queue."""
+        # pylint: disable=no-member
+        if QuizResponse.objects.filter(quiz_id=response.quiz_id,
+                                       question_id=response.question_id,
+                                       student_id=response.student_id).exists():
+            raise DuplicateResponse()
+        pending = PENDING_KEY.format(quiz=response.quiz_id,
+                                     question=response.question_id,
+                                     student=response.student_id)
+        if not cache.add(pending, 1, settings.QUIZ_RESPONSE_BUFFER['PENDING_TTL']):
+            raise DuplicateResponse()
+        self.queue.push({
+            'quiz': response.quiz_id,
+            'question': response.question_id,
+            'version': response.version_id,
+            'student': response.student_id,
+            'score': response.score,
+            'created_at': response.created_at.isoformat(),
+        })
+        self.start()
+
+    def start(self):
+        """Starts this process's background flusher, once."""
+        with self.lock:
+            if self.flusher is None or not self.flusher.is_alive():
+                self.flusher = threading.Thread(target=self.run,
+                                                name='quiz-response-flusher',
+                                                daemon=True)
+                self.flusher.start()
+
+    def run(self):
+        """Flushes the queue every interval, draining it when behind."""
+        while True:
+            try:
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception:  # pylint: disable=broad-except
+                # Entries stay queued, retried next round.
+                logger.exception("Flushing quiz responses failed")
+                self.record_failure()
+            finally:
+                close_old_connections()
+            time.sleep(self.interval)
+
+    def record_failure(self):
+        """Counts a failed flush for `metrics`."""
+        try:
+            cache.incr(FAILED_KEY)
+        except ValueError:
+            cache.set(FAILED_KEY, 1, None)
+        cache.set(LAST_FAILURE_KEY, timezone.now().isoformat(), None)
+
+    def flush(self) -> int:
+        """Writes one batch of queued responses; returns its size."""
+        return self.queue.flush(self.batch_size, self.write)
+
+    def write(self, entries: List[dict]):
+        """Inserts a batch in one transaction.
+            Conflicts with `unique_together` are dropped like duplicates, and
+            so are responses whose quiz, question or student was deleted.
+            `bulk_create` sends no signals, so the leaderboards are updated
+            here."""
+        # pylint: disable=no-member
+        existing = {
+            'quiz': Quiz.objects,
+            'question': QuizQuestion.objects,
+            'student': User.objects
+        }
+        for field, objects in existing.items():
+            existing[field] = set(
+                objects.filter(id__in={entry[field]
+                                       for entry in entries}).values_list(
+                                           'id', flat=True))
+        responses = {}
+        for entry in entries:
+            key = (entry['quiz'], entry['question'], entry['student'])
+            if key in responses or not all(
+                    entry[field] in ids for field, ids in existing.items()):
+                continue
+            responses[key] = QuizResponse(
+                quiz_id=entry['quiz'],
+                question_id=entry['question'],
+                # Absent from entries queued before versioning.
+                version_id=entry.get('version'),
+                student_id=entry['student'],
+                score=entry['score'],
+                created_at=datetime.fromisoformat(entry['created_at']))
+        with transaction.atomic():
+            answered = QuizResponse.objects.filter(
+                quiz_id__in={key[0]
+                             for key in responses},
+                student_id__in={key[2]
+                                for key in responses}).values_list(
+                                    'quiz_id', 'question_id', 'student_id')
+            for key in answered:
+                responses.pop(key, None)
+            new = list(responses.values())
+            QuizResponse.objects.bulk_create(new, ignore_conflicts=True)
+            transaction.on_commit(lambda: record_responses(
+                (response.quiz_id, response.student_id, response.score)
+                for response in new))
+        try:
+            cache.incr(FLUSHED_KEY, len(entries))
+        except ValueError:
+            cache.set(FLUSHED_KEY, len(entries), None)
+        cache.set(LAST_FLUSH_KEY, timezone.now().isoformat(), None)
+
+    def metrics(self) -> dict:
+        """Returns the queue depth, lag and flush and failure counters."""
+        depth, oldest = self.queue.stats()
+        lag = (timezone.now() - datetime.fromisoformat(
+            oldest['created_at'])).total_seconds() if oldest else 0.0
+        return {
+            'backend': self.queue.name,
+            'depth': depth,
+            'lag_seconds': lag,
+            'flushed': cache.get(FLUSHED_KEY, 0),
+            'last_flush_at': cache.get(LAST_FLUSH_KEY),
+            'failed': cache.get(FAILED_KEY, 0),
+            'last_failure_at': cache.get(LAST_FAILURE_KEY),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_response_buffer() -> ResponseBuffer:
+    """Returns the process-wide response buffer."""
+    config = settings.QUIZ_RESPONSE_BUFFER
+    if config['REDIS_URL']:
+        queue = RedisQueue(config['REDIS_URL'])
+    else:
+        queue = LocalQueue(config['QUEUE_PATH'])
+    return ResponseBuffer(queue, config['BATCH_SIZE'], config['FLUSH_INTERVAL'])
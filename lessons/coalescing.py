@@ -0,0 +1,136 @@
+"""
+    Single-flight reads.
+    Hot shared reads, such as a quiz opened by a whole class at once, are
+    computed once per key however many requests ask for it concurrently.
+    Requests of one process wait for the computation already in flight,
+    and a lock in the shared cache lets one process fill an expired entry
+    while the others wait for it instead of all reading the database.
+"""
+
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+
+LOCK_KEY = 'single_flight_lock_{}'
+METRIC_KEY = 'single_flight_{}'
+# computed: values read from the source and cached
+# coalesced: requests served by a computation in flight in their process
+# lock_waits: computations that waited for another process to fill the cache
+# lock_timeouts: computations that gave up waiting and read the source
+METRICS = ['computed', 'coalesced', 'lock_waits', 'lock_timeouts']
+
+
+class Flight:
+    """A computation in flight and the requests waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent computations of the same key."""
+
+    def __init__(self, lock_ttl: float, lock_wait: float, poll_interval: float):
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.flights = {}
+
+    def do(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Returns the result of compute, shared with the concurrent calls
+            for the same key in this process. Errors are shared too."""
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+            else:
+                flight.waiters += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+            if flight.waiters:
+                count('coalesced', flight.waiters)
+        return flight.result
+
+    def cached(self, key: str, compute: Callable[[], Any],
+               timeout: float | None) -> Any:
+        """Returns the cached value of a key, computing and caching it once
+            across processes when missing. None results are not cached."""
+        value = cache.get(key)
+        if value is None:
+            value = self.do(key, lambda: self.fill(key, compute, timeout))
+        return value
+
+    def fill(self, key: str, compute: Callable[[], Any],
+             timeout: float | None) -> Any:
+        """Computes and caches a value under the cache lock of its key, or
+            waits for the process holding the lock to cache it."""
+        lock_key = LOCK_KEY.format(key)
+        deadline = time.monotonic() + self.lock_wait
+        waited = False
+        while not cache.add(lock_key, 1, self.lock_ttl):
+            if time.monotonic() >= deadline:
+                # The holder is slow or died, do not fail the request.
+                count('lock_timeouts')
+                return compute()
+            if not waited:
+                waited = True
+                count('lock_waits')
+            time.sleep(self.poll_interval)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout)
+            count('computed')
+            return value
+        finally:
+            cache.delete(lock_key)
+
+
+def count(metric: str, amount: int = 1):
+    """Adds to a counter shared by all processes."""
+    key = METRIC_KEY.format(metric)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, None)
+
+
+def metrics() -> dict:
+    """Returns the counters of all processes."""
+    values = cache.get_many([METRIC_KEY.format(metric) for metric in METRICS])
+    return {
+        metric: values.get(METRIC_KEY.format(metric), 0)
+        for metric in METRICS
+    }
+
+
+@lru_cache(maxsize=1)
+def get_single_flight() -> SingleFlight:
+    """Returns the process-wide single flight."""
+    config = settings.SINGLE_FLIGHT
+    return SingleFlight(config['LOCK_TTL'], config['LOCK_WAIT'],
+                        config['POLL_INTERVAL'])
@@ -0,0 +1,100 @@
+"""
+    Content delivery.
+    Turns `Content.content_uri` into short-lived presigned download URLs so
+    media is fetched straight from object storage, never through the API.
+"""
+
+import hashlib
+import time
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class ContentDeliveryService:
+    """Service for signing content downloads against S3-compatible storage"""
+
+    def __init__(self):
+        storage = settings.CONTENT_STORAGE
+        self.bucket = storage['BUCKET']
+        self.ttl = storage['URL_TTL']
+        self.ttl_bucket = storage['URL_TTL_BUCKET']
+        self.endpoint_url = storage['ENDPOINT_URL']
+        self.s3 = storage_client()
+
+    def parse_uri(self, uri: str) -> tuple | None:
+        """Returns the (bucket, key) of a storage URI, see
+            `parse_storage_uri`."""
+        return parse_storage_uri(uri, self.bucket, self.endpoint_url)
+
+    def presigned_url(self, content) -> str:
+        """Returns a download URL for the content, valid for at least the
+            configured TTL. URLs are signed once per TTL bucket and cached,
+            so hot content is not re-signed on every request."""
+        location = self.parse_uri(content.content_uri)
+        if location is None:
+            return content.content_uri
+
+        now = time.time()
+        window = int(now // self.ttl_bucket)
+        uri_hash = hashlib.sha1(content.content_uri.encode()).hexdigest()[:12]
+        key = f"content_url_{content.id}_{uri_hash}_{window}"
+        url = cache.get(key)
+        if url is None:
+            bucket, object_key = location
+            # Signed to outlive its bucket by a full TTL.
+            expires_in = self.ttl + self.ttl_bucket
+            url = self.s3.generate_presigned_url('get_object',
+                                                 Params={
+                                                     'Bucket': bucket,
+                                                     'Key': object_key
+                                                 },
+                                                 ExpiresIn=expires_in)
+            cache.set(key, url, (window + 1) * self.ttl_bucket - now)
+        return url
+
+
+def parse_storage_uri(uri: str, bucket: str | None,
+                      endpoint_url: str | None) -> tuple | None:
+    """Returns the (bucket, key) of a storage URI.
+        Accepts `s3://bucket/key`, S3 and storage endpoint URLs and bare
+        keys, without a scheme, in the default bucket. Returns None for
+        URIs that are not in object storage, such as `gs://` ones."""
+    parsed = urlparse(uri)
+    path = parsed.path.lstrip('/')
+    if parsed.scheme == 's3':
+        return parsed.netloc, path
+    if not parsed.scheme:
+        return (bucket, path) if bucket and path else None
+    if parsed.scheme not in ('http', 'https'):
+        return None
+
+    host = parsed.netloc
+    path_style = (host.startswith(('s3.', 's3-'))
+                  and host.endswith('.amazonaws.com')) or (
+                      endpoint_url and uri.startswith(endpoint_url))
+    if path_style:
+        bucket, _, key = path.partition('/')
+        return bucket, key
+    if host.endswith('.amazonaws.com') and '.s3' in host:
+        return host.split('.s3', 1)[0], path
+    return None
+
+
+@lru_cache(maxsize=1)
+def storage_client():
+    """Returns the process-wide S3 client for content storage."""
+    # boto3 is imported on first use to keep it out of worker startup.
+    import boto3  # pylint: disable=import-outside-toplevel
+    storage = settings.CONTENT_STORAGE
+    return boto3.client('s3',
+                        endpoint_url=storage['ENDPOINT_URL'],
+                        region_name=storage['REGION'])
+
+
+@lru_cache(maxsize=1)
+def get_delivery_service() -> ContentDeliveryService:
+    """Returns the process-wide delivery service."""
+    return ContentDeliveryService()
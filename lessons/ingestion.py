@@ -0,0 +1,107 @@
+"""
+    Content ingestion.
+    Extracts media metadata for new or changed content in a bounded
+    process pool and stores it on the content row.
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from lessons.media import extract_metadata
+from lessons.models import CONTENT_CACHE_KEY, Content, ContentFormat
+
+METADATA_FIELDS = [
+    'size', 'duration', 'page_count', 'width', 'height', 'word_count'
+]
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataPool:
+    """Process pool running metadata extraction off the request path.
+
+    At most `WORKERS` files are processed at once and at most `MAX_PENDING`
+    are queued. Content submitted while the queue is full is left without
+    metadata for `manage.py extract_media_metadata` to pick up.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        # Workers are spawned, not forked, so they never inherit the
+        # parent's threads or database connections.
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, content: Content) -> Future | None:
+        """Queues extraction for the content, if there is room."""
+        if not self.slots.acquire(blocking=False):
+            return None
+        try:
+            future = self.executor.submit(
+                extract_metadata, content.content_uri,
+                format_value(content.content_type), settings.CONTENT_STORAGE)
+        except Exception:
+            self.slots.release()
+            raise
+        content_id, content_uri = content.id, content.content_uri
+        future.add_done_callback(
+            lambda done: self._store(done, content_id, content_uri))
+        return future
+
+    def _store(self, future: Future, content_id: int, content_uri: str):
+        """Saves the extracted metadata, unless the file changed since."""
+        self.slots.release()
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            # Left without metadata for `extract_media_metadata`.
+            logger.error("Extracting content metadata failed",
+                         exc_info=future.exception(),
+                         extra={'content_id': content_id})
+            return
+        try:
+            store_metadata(content_id, content_uri, future.result())
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Storing content metadata failed",
+                             extra={'content_id': content_id})
+        finally:
+            close_old_connections()
+
+
+def format_value(content_type) -> str:
+    """Returns the format value of a content type.
+        Accepts `ContentFormat` members and their stored string forms."""
+    if isinstance(content_type, ContentFormat):
+        return content_type.value
+    return str(content_type).rsplit('.', 1)[-1].lower()
+
+
+def store_metadata(content_id: int, content_uri: str, metadata: dict):
+    """Writes metadata without signals so it does not trigger extraction."""
+    # pylint: disable=no-member
+    Content.objects.filter(id=content_id, content_uri=content_uri).update(
+        **{field: metadata.get(field) for field in METADATA_FIELDS},
+        metadata_extracted_at=timezone.now())
+    # Updates send no signals.
+    cache.delete(CONTENT_CACHE_KEY.format(content_id))
+
+
+@lru_cache(maxsize=1)
+def get_metadata_pool() -> MetadataPool:
+    """Returns the process-wide metadata pool, started on first use."""
+    config = settings.MEDIA_METADATA
+    return MetadataPool(config['WORKERS'], config['MAX_PENDING'])
+
+
+def schedule_extraction(content: Content):
+    """Extracts metadata for the content once the transaction commits."""
+    if settings.MEDIA_METADATA['ENABLED']:
+        transaction.on_commit(lambda: get_metadata_pool().submit(content))
@@ -0,0 +1,283 @@
+"""
+    Leaderboards.
+    Ranks students by the points of their quiz responses, per quiz and per
+    class. Boards are sorted sets, in Redis when it is configured and in
+    the default cache otherwise. A board is built from the database when
+    first read and then kept current incrementally as responses are written.
+"""
+
+import time
+import uuid
+from bisect import bisect_left, insort
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from lessons.models import Quiz, QuizResponse
+
+# Seconds a board build or update may hold its lock, and may wait for it.
+LOCK_TTL = 30
+LOCK_WAIT = 5
+POLL_INTERVAL = 0.01
+# Adds to a board being built are queued and replayed once it is renamed,
+# adds to a missing board are dropped: it is read from the database.
+REDIS_ADD = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('zincrby', KEYS[1], ARGV[1], ARGV[2])
+end
+if redis.call('exists', KEYS[2]) == 1 then
+    redis.call('rpush', KEYS[3], ARGV[2], ARGV[1])
+end
+"""
+# Publishes a built board and replays the adds queued meanwhile.
+REDIS_PUBLISH = """
+if redis.call('get', KEYS[2]) ~= ARGV[1] then
+    redis.call('del', KEYS[4])
+    return 0
+end
+if redis.call('exists', KEYS[4]) == 1 then
+    redis.call('rename', KEYS[4], KEYS[1])
+end
+local pending = redis.call('lrange', KEYS[3], 0, -1)
+for index = 1, #pending, 2 do
+    redis.call('zincrby', KEYS[1], pending[index + 1], pending[index])
+end
+redis.call('del', KEYS[2], KEYS[3])
+return 1
+"""
+
+
+def quiz_board(quiz_id: int) -> str:
+    """Returns the board name of a quiz."""
+    return f'quiz:{quiz_id}'
+
+
+def class_board(class_id: int) -> str:
+    """Returns the board name of a class."""
+    return f'class:{class_id}'
+
+
+def load_board(board: str) -> Dict[int, int]:
+    """Returns the points of every student on a board, from the database."""
+    kind, board_id = board.split(':')
+    # pylint: disable=no-member
+    responses = QuizResponse.objects.filter(
+        quiz_id=board_id) if kind == 'quiz' else QuizResponse.objects.filter(
+            quiz__class_id=board_id)
+    return dict(
+        responses.values('student_id').annotate(
+            points=Sum('score')).values_list('student_id', 'points'))
+
+
+class SortedBoard:
+    """A list of students sorted by descending points.
+        Lookups are binary searches; moving a student shifts the list, a
+        fast memmove but O(n). Redis boards are the O(log n) ones."""
+
+    def __init__(self, points: Dict[int, int]):
+        self.points = points
+        self.ranking = sorted((-score, student)
+                              for student, score in points.items())
+
+    def add(self, student: int, points: int):
+        """Adds points to a student and moves them to their new rank."""
+        previous = self.points.get(student)
+        if previous is not None:
+            self.ranking.pop(bisect_left(self.ranking, (-previous, student)))
+        self.points[student] = (previous or 0) + points
+        insort(self.ranking, (-self.points[student], student))
+
+    def rank(self, student: int) -> int | None:
+        """Returns the zero-based rank of a student."""
+        if student not in self.points:
+            return None
+        return bisect_left(self.ranking, (-self.points[student], student))
+
+    def top(self, limit: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """Returns the size of the board and its best students with points."""
+        return len(self.ranking), [
+            (student, -score) for score, student in self.ranking[:limit]
+        ]
+
+    def standing(self, student: int) -> Tuple[int | None, int | None, int]:
+        """Returns the rank and points of a student, and the board size."""
+        return (self.rank(student), self.points.get(student),
+                len(self.ranking))
+
+
+class CacheLeaderboards:
+    """Boards kept in the default cache, shared by the workers when the
+        cache is. Builds and adds of a board take turns under a lock in the
+        cache; an add that cannot get it marks the board stale, and the
+        next read rebuilds it."""
+    prefix = 'leaderboard_'
+
+    def _key(self, board: str) -> str:
+        return self.prefix + board.replace(':', '_')
+
+    def _acquire(self, board: str) -> bool:
+        deadline = time.monotonic() + LOCK_WAIT
+        while not cache.add(self._key(board) + '_lock', 1, LOCK_TTL):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def _release(self, board: str):
+        cache.delete(self._key(board) + '_lock')
+
+    def _board(self, board: str) -> SortedBoard:
+        key, stale = self._key(board), self._key(board) + '_stale'
+        cached = cache.get_many([key, stale])
+        if key in cached and stale not in cached:
+            return cached[key]
+        if not self._acquire(board):
+            # Busy, answered from the database without storing it.
+            return SortedBoard(load_board(board))
+        try:
+            cache.delete(stale)
+            sorted_board = SortedBoard(load_board(board))
+            cache.set(key, sorted_board, None)
+            return sorted_board
+        finally:
+            self._release(board)
+
+    def add(self, board: str, student: int, points: int):
+        """Adds points to a student on a board already built."""
+        if not self._acquire(board):
+            self.invalidate(board)
+            return
+        try:
+            sorted_board = cache.get(self._key(board))
+            if sorted_board is not None:
+                sorted_board.add(student, points)
+                cache.set(self._key(board), sorted_board, None)
+        finally:
+            self._release(board)
+
+    def invalidate(self, board: str):
+        """Marks a board stale so it is rebuilt on its next read."""
+        cache.set(self._key(board) + '_stale', True, None)
+
+    def top(self, board: str, limit: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """Returns the size of a board and its best students with points."""
+        return self._board(board).top(limit)
+
+    def rank(self, board: str,
+             student: int) -> Tuple[int | None, int | None, int]:
+        """Returns the zero-based rank and points of a student, and the
+            size of the board."""
+        return self._board(board).standing(student)
+
+
+class RedisLeaderboards:
+    """Boards kept in Redis sorted sets, shared by every worker."""
+    prefix = 'leaderboard:'
+
+    def __init__(self, url: str):
+        # Only needed when shared boards are configured.
+        import redis  # pylint: disable=import-outside-toplevel
+        self.redis = redis.Redis.from_url(url)
+        self.add_script = self.redis.register_script(REDIS_ADD)
+        self.publish_script = self.redis.register_script(REDIS_PUBLISH)
+
+    def _keys(self, board: str) -> List[str]:
+        """Returns the keys of a board, of its build and of the adds
+            queued while it is built."""
+        key = self.prefix + board
+        return [key, key + ':building', key + ':pending']
+
+    def _build(self, board: str) -> SortedBoard | None:
+        """Builds a missing board aside and renames it, so readers never
+            see a partial board. Returns the board read from the database
+            when another worker is building it."""
+        key, building, pending = self._keys(board)
+        if self.redis.exists(key):
+            return None
+        token = uuid.uuid4().hex
+        if not self.redis.set(building, token, nx=True, ex=LOCK_TTL):
+            return SortedBoard(load_board(board))
+        # Adds queued so far, or by a failed build, are in the read below.
+        self.redis.delete(pending)
+        points = load_board(board)
+        staging = f'{key}:build:{token}'
+        if points:
+            self.redis.zadd(staging, points)
+        if not self.publish_script(keys=[key, building, pending, staging],
+                                   args=[token]):
+            # Outlived its lock, another worker builds the board.
+            return SortedBoard(points)
+        return None
+
+    def add(self, board: str, student: int, points: int):
+        """Adds points to a student on a board already built or being
+            built."""
+        self.add_script(keys=self._keys(board), args=[points, student])
+
+    def invalidate(self, board: str):
+        """Drops a board, and any build in progress, so it is rebuilt on
+            its next read."""
+        self.redis.delete(*self._keys(board))
+
+    def top(self, board: str, limit: int) -> Tuple[int, List[Tuple[int, int]]]:
+        """Returns the size of a board and its best students with points."""
+        local = self._build(board)
+        if local is not None:
+            return local.top(limit)
+        key = self.prefix + board
+        pipe = self.redis.pipeline()
+        pipe.zcard(key)
+        pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        size, entries = pipe.execute()
+        return size, [(int(student), int(score)) for student, score in entries]
+
+    def rank(self, board: str,
+             student: int) -> Tuple[int | None, int | None, int]:
+        """Returns the zero-based rank and points of a student, and the
+            size of the board."""
+        local = self._build(board)
+        if local is not None:
+            return local.standing(student)
+        key = self.prefix + board
+        pipe = self.redis.pipeline()
+        pipe.zrevrank(key, student)
+        pipe.zscore(key, student)
+        pipe.zcard(key)
+        rank, score, size = pipe.execute()
+        return rank, None if score is None else int(score), size
+
+
+@lru_cache(maxsize=1)
+def get_leaderboards():
+    """Returns the leaderboard backend."""
+    if settings.LEADERBOARDS['REDIS_URL']:
+        return RedisLeaderboards(settings.LEADERBOARDS['REDIS_URL'])
+    return CacheLeaderboards()
+
+
+def record_responses(responses: Iterable[Tuple[int, int, int]],
+                     classes: Dict[int, int | None] | None = None):
+    """Adds `(quiz_id, student_id, points)` entries to the quiz and class
+        boards. Negative points remove deleted responses. The class of each
+        quiz is looked up unless given in `classes`."""
+    totals = defaultdict(int)
+    for quiz_id, student_id, points in responses:
+        totals[quiz_id, student_id] += points
+    if not totals:
+        return
+    classes = dict(classes or {})
+    missing = {quiz_id for quiz_id, _ in totals} - set(classes)
+    if missing:
+        # pylint: disable=no-member
+        classes.update(
+            Quiz.objects.filter(id__in=missing).values_list('id', 'class_id'))
+    leaderboards = get_leaderboards()
+    for (quiz_id, student_id), points in totals.items():
+        leaderboards.add(quiz_board(quiz_id), student_id, points)
+        if classes.get(quiz_id):
+            leaderboards.add(class_board(classes[quiz_id]), student_id,
+                             points)
@@ -0,0 +1,61 @@
+"""
+    Extracts media metadata for content that does not have it yet.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lessons.ingestion import format_value, store_metadata
+from lessons.media import extract_metadata
+from lessons.models import Content
+
+
+class Command(BaseCommand):
+    """Backfills metadata the ingestion pool skipped or failed to extract."""
+    help = "Extracts media metadata for content missing it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all',
+                            action='store_true',
+                            help="Re-extract metadata for all content.")
+        parser.add_argument('--workers',
+                            type=int,
+                            default=settings.MEDIA_METADATA['WORKERS'])
+
+    def handle(self, *args, **options):
+        # pylint: disable=no-member
+        contents = Content.objects.only('id', 'content_uri', 'content_type')
+        if not options['all']:
+            contents = contents.filter(metadata_extracted_at__isnull=True)
+
+        workers = options['workers']
+        self.done = self.failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            for content in contents.iterator(chunk_size=500):
+                # Bound the queue so large tables are not loaded at once.
+                if len(pending) >= workers * 4:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self.store(finished, pending)
+                future = pool.submit(extract_metadata, content.content_uri,
+                                     format_value(content.content_type),
+                                     settings.CONTENT_STORAGE)
+                pending[future] = content
+            self.store(wait(pending)[0], pending)
+        self.stdout.write(
+            self.style.SUCCESS(f"Extracted metadata for {self.done} contents, "
+                               f"{self.failed} failed."))
+
+    def store(self, finished, pending: dict):
+        """Stores the metadata of finished extractions."""
+        for future in finished:
+            content = pending.pop(future)
+            try:
+                store_metadata(content.id, content.content_uri,
+                               future.result())
+                self.done += 1
+            except Exception as e:  # pylint: disable=broad-except
+                self.failed += 1
+                self.stderr.write(f"{content}: {e}")
@@ -0,0 +1,27 @@
+"""
+    Writes buffered quiz responses to the database.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lessons.buffering import get_response_buffer
+
+
+class Command(BaseCommand):
+    """Drains the quiz response write-behind queue."""
+    help = "Flushes buffered quiz responses, or keeps flushing with --follow."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--follow",
+                            action="store_true",
+                            help="Keep flushing as a dedicated flusher.")
+
+    def handle(self, *args, **options):
+        buffer = get_response_buffer()
+        if options["follow"]:
+            buffer.run()
+        flushed = 0
+        while written := buffer.flush():
+            flushed += written
+        self.stdout.write(
+            self.style.SUCCESS(f"Flushed {flushed} quiz responses."))
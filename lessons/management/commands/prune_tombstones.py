@@ -0,0 +1,23 @@
+"""
+    Deletes tombstones older than the delta sync retention.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from lessons.models import Tombstone
+
+
+class Command(BaseCommand):
+    """Prunes tombstones no sync token can reach any more."""
+    help = "Deletes tombstones older than SYNC['TOMBSTONE_DAYS']."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(
+            days=settings.SYNC['TOMBSTONE_DAYS'])
+        # pylint: disable=no-member
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstones."))
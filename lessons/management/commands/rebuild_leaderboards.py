@@ -0,0 +1,30 @@
+"""
+    Rebuilds quiz and class leaderboards from the database.
+"""
+
+from django.core.management.base import BaseCommand
+
+from lessons.leaderboards import class_board, get_leaderboards, quiz_board
+from lessons.models import Quiz
+
+
+class Command(BaseCommand):
+    """Rebuilds leaderboards, for instance after restoring responses.
+        Only shared boards can be rebuilt from here; in-process boards are
+        rebuilt by each worker when they restart."""
+    help = "Rebuilds the leaderboards of every quiz and class."
+
+    def handle(self, *args, **options):
+        # pylint: disable=no-member
+        quizzes = Quiz.objects.values_list('id', 'class_id')
+        boards = {quiz_board(quiz_id) for quiz_id, _ in quizzes}
+        boards |= {
+            class_board(class_id)
+            for _, class_id in quizzes if class_id is not None
+        }
+        leaderboards = get_leaderboards()
+        for board in boards:
+            leaderboards.invalidate(board)
+            leaderboards.top(board, 1)
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(boards)} leaderboards."))
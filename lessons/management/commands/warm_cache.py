@@ -0,0 +1,41 @@
+"""
+    Warms the cache with the most active quizzes and content.
+"""
+
+from django.core.management.base import BaseCommand
+
+from capitalize.warmup import warm_up
+
+
+class Command(BaseCommand):
+    """Run on deploy, before traffic reaches the new workers. The shared
+        cache is warmed for every worker; each worker loads its lazy
+        imports on boot when WARMUP_ON_BOOT is set."""
+    help = "Preloads the most active quizzes and content into the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget',
+                            type=float,
+                            default=None,
+                            help="Seconds to spend at most.")
+        parser.add_argument('--quizzes', type=int, default=None)
+        parser.add_argument('--content', type=int, default=None)
+
+    def handle(self, *args, **options):
+        report = warm_up(options['budget'], options['quizzes'],
+                         options['content'])
+        for step in report.steps:
+            self.stdout.write(f"{step.name:>12}: {len(step.warmed)} warmed, "
+                              f"{len(step.failed)} failed, {step.skipped} "
+                              f"skipped in {step.seconds:.3f}s" +
+                              (", budget exhausted" if step.exhausted else ""))
+            if options['verbosity'] > 1 and step.warmed:
+                self.stdout.write(f"{'':>14}{', '.join(step.warmed)}")
+            for failure in step.failed:
+                self.stderr.write(f"{'':>14}{failure}")
+        summary = (f"Warmed in {report.seconds:.3f}s "
+                   f"of a {report.budget:g}s budget.")
+        if report.complete and not any(step.failed for step in report.steps):
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.WARNING(summary))
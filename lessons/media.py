@@ -0,0 +1,239 @@
+"""
+    Media metadata extraction.
+    Reads format-specific metadata from a content file in object storage,
+    fetching only the byte ranges the format needs. This module runs inside
+    worker processes: it must not import models or otherwise require a
+    configured Django project.
+"""
+
+import io
+import json
+import re
+import shutil
+import struct
+import subprocess
+from typing import Dict
+
+from lessons.delivery import parse_storage_uri
+
+CHUNK_SIZE = 1024 * 1024
+PDF_PAGE = re.compile(rb'/Type\s*/Page(?![a-zA-Z])')
+
+
+class StorageObject(io.RawIOBase):
+    """Seekable, read-only file over an object in storage.
+        Every read is a ranged GET, so formats whose metadata sits in a
+        header never download the rest of the file. `name` is a presigned
+        URL for tools that open the file themselves."""
+
+    def __init__(self, s3, bucket: str, key: str, ttl: int):
+        super().__init__()
+        self.s3, self.bucket, self.key = s3, bucket, key
+        self.size = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.name = s3.generate_presigned_url('get_object',
+                                              Params={
+                                                  'Bucket': bucket,
+                                                  'Key': key
+                                              },
+                                              ExpiresIn=ttl)
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {
+            io.SEEK_SET: 0,
+            io.SEEK_CUR: self.position,
+            io.SEEK_END: self.size
+        }[whence]
+        self.position = max(base + offset, 0)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        end = min(self.position + len(buffer), self.size)
+        if end <= self.position:
+            return 0
+        res = self.s3.get_object(Bucket=self.bucket,
+                                 Key=self.key,
+                                 Range=f'bytes={self.position}-{end - 1}')
+        data = res['Body'].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def open_object(uri: str, storage: dict) -> io.BufferedReader | None:
+    """Opens the object behind a storage URI, read in `CHUNK_SIZE` ranges.
+        Returns None for URIs that are not in object storage."""
+    location = parse_storage_uri(uri, storage['BUCKET'],
+                                 storage['ENDPOINT_URL'])
+    if location is None:
+        return None
+    # Imported here, worker processes only need boto3 for storage reads.
+    import boto3  # pylint: disable=import-outside-toplevel
+    s3 = boto3.client('s3',
+                      endpoint_url=storage['ENDPOINT_URL'],
+                      region_name=storage['REGION'])
+    return io.BufferedReader(StorageObject(s3, *location, storage['URL_TTL']),
+                             CHUNK_SIZE)
+
+
+def extract_metadata(uri: str, content_type: str, storage: dict) -> Dict:
+    """Returns the metadata of the file as model field values.
+        Files outside object storage are skipped and have none."""
+    file = open_object(uri, storage)
+    if file is None:
+        return {}
+    with file:
+        metadata = {'size': file.raw.size}
+        extractor = EXTRACTORS.get(content_type)
+        if extractor:
+            metadata.update(extractor(file))
+        return metadata
+
+
+def media_duration(file) -> Dict:
+    """Reads the duration of an audio or video file in seconds."""
+    duration = probe_duration(file.name)
+    if duration is None:
+        file.seek(0)
+        duration = mp4_duration(file)
+    if duration is None:
+        file.seek(0)
+        duration = wav_duration(file)
+    return {'duration': duration}
+
+
+def probe_duration(path: str) -> float | None:
+    """Reads the duration of a file path or URL with ffprobe, when it is
+        installed."""
+    ffprobe = shutil.which('ffprobe')
+    if not ffprobe:
+        return None
+    res = subprocess.run([
+        ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of',
+        'json', path
+    ],
+                         capture_output=True,
+                         timeout=60,
+                         check=False)
+    try:
+        return float(json.loads(res.stdout)['format']['duration'])
+    except (ValueError, KeyError):
+        return None
+
+
+def mp4_duration(file) -> float | None:
+    """Reads the duration from the `mvhd` box of an MP4/MOV file."""
+    containers = {b'moov'}
+    while True:
+        header = file.read(8)
+        if len(header) < 8:
+            return None
+        size, box = struct.unpack('>I4s', header)
+        if size == 1:
+            size = struct.unpack('>Q', file.read(8))[0] - 8
+        if box in containers:
+            continue
+        if box == b'mvhd':
+            version = file.read(4)[0]
+            if version == 1:
+                _, _, timescale, duration = struct.unpack(
+                    '>QQIQ', file.read(28))
+            else:
+                _, _, timescale, duration = struct.unpack(
+                    '>IIII', file.read(16))
+            return duration / timescale if timescale else None
+        if size < 8:
+            return None
+        file.seek(size - 8, 1)
+
+
+def wav_duration(file) -> float | None:
+    """Reads the duration from the header of a WAV file."""
+    header = file.read(12)
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        return None
+    byte_rate = None
+    while True:
+        chunk = file.read(8)
+        if len(chunk) < 8:
+            return None
+        name, size = struct.unpack('<4sI', chunk)
+        if name == b'fmt ':
+            byte_rate = struct.unpack('<HHII', file.read(12))[3]
+            file.seek(size - 12, 1)
+        elif name == b'data':
+            return size / byte_rate if byte_rate else None
+        else:
+            file.seek(size + size % 2, 1)
+
+
+def pdf_page_count(file) -> Dict:
+    """Counts the page objects of a PDF file."""
+    count, tail = 0, b''
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        data = tail + chunk
+        # Markers near the end may be cut short, count them next round.
+        cut = max(len(data) - 32, 0)
+        count += sum(1 for match in PDF_PAGE.finditer(data)
+                     if match.start() < cut)
+        tail = data[cut:]
+    count += len(PDF_PAGE.findall(tail))
+    return {'page_count': count or None}
+
+
+def image_dimensions(file) -> Dict:
+    """Reads the width and height from a PNG, GIF or JPEG header."""
+    head = file.read(26)
+    width = height = None
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        width, height = struct.unpack('>II', head[16:24])
+    elif head[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', head[6:10])
+    elif head[:2] == b'\xff\xd8':
+        width, height = jpeg_dimensions(file)
+    return {'width': width, 'height': height}
+
+
+def jpeg_dimensions(file) -> tuple:
+    """Reads the width and height from the start-of-frame JPEG marker."""
+    file.seek(2)
+    while True:
+        marker = file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None, None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        size = struct.unpack('>H', file.read(2))[0]
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>xHH', file.read(5))
+            return width, height
+        file.seek(size - 2, 1)
+
+
+def text_word_count(file) -> Dict:
+    """Counts the words of a text file."""
+    count, tail = 0, b''
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        words = (tail + chunk).split()
+        # The last word may continue in the next chunk.
+        tail = words.pop() if words and not chunk[-1:].isspace() else b''
+        count += len(words)
+    return {'word_count': count + (1 if tail else 0)}
+
+
+EXTRACTORS = {
+    'video': media_duration,
+    'audio': media_duration,
+    'pdf': pdf_page_count,
+    'image': image_dimensions,
+    'text': text_word_count,
+}
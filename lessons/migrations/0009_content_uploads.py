@@ -0,0 +1,60 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0008_quizquestion_responses'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ContentUpload',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('content_type', models.CharField(choices=[('video', 'video'), ('audio', 'audio'), ('text', 'text'), ('image', 'image'), ('pdf', 'pdf')], max_length=10)),
+                ('filename', models.CharField(max_length=255)),
+                ('bucket', models.CharField(max_length=63)),
+                ('key', models.CharField(max_length=1024)),
+                ('storage_upload_id', models.CharField(max_length=1024)),
+                ('size', models.BigIntegerField()),
+                ('part_size', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'pending'), ('completed', 'completed'), ('aborted', 'aborted')], default='pending', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='lessons.content')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContentUploadPart',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('part_number', models.IntegerField()),
+                ('etag', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parts', to='lessons.contentupload')),
+            ],
+            options={
+                'unique_together': {('upload', 'part_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# FULLTEXT indexes backing lesson search on MySQL. Other databases use the
+# in-process index in `lessons.search`, so this migration is a no-op there.
+
+from django.db import migrations
+
+FULLTEXT_INDEXES = [
+    ('lessons_content_fulltext', 'lessons_content', 'title, description'),
+    ('lessons_quiz_fulltext', 'lessons_quiz', 'title, description'),
+    ('lessons_quizquestion_fulltext', 'lessons_quizquestion', 'question'),
+]
+
+
+def add_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for name, table, columns in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f"CREATE FULLTEXT INDEX {name} ON {table} ({columns})")
+
+
+def remove_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for name, table, _ in FULLTEXT_INDEXES:
+        schema_editor.execute(f"DROP INDEX {name} ON {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0010_content_media_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_indexes, remove_fulltext_indexes),
+    ]
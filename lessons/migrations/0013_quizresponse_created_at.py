@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0012_delta_sync'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quizresponse',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0013_quizresponse_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizresponse',
+            index=models.Index(fields=['student', 'created_at'], name='lessons_qui_student_f50b63_idx'),
+        ),
+    ]
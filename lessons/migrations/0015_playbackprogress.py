@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0014_quizresponse_student_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaybackProgress',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('position', models.FloatField()),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='lessons.content')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('student', 'content')},
+            },
+        ),
+    ]
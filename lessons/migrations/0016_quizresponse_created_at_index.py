@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-19 00:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0015_playbackprogress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizresponse',
+            index=models.Index(fields=['created_at'], name='lessons_qui_created_6ae31a_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.0.3 on 2026-10-19 01:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def publish_existing_quizzes(apps, schema_editor):
+    """Publishes every quiz with questions as version 1, the version its
+        responses were scored against, so students keep seeing it."""
+    Quiz = apps.get_model('lessons', 'Quiz')
+    QuizQuestion = apps.get_model('lessons', 'QuizQuestion')
+    QuizResponse = apps.get_model('lessons', 'QuizResponse')
+    QuizVersion = apps.get_model('lessons', 'QuizVersion')
+    for quiz in Quiz.objects.iterator():
+        questions = list(
+            QuizQuestion.objects.filter(quiz=quiz).order_by('id').values(
+                'id', 'question', 'options', 'correct_index', 'weight'))
+        if not questions:
+            continue
+        version = QuizVersion.objects.create(quiz=quiz,
+                                             number=1,
+                                             title=quiz.title,
+                                             description=quiz.description,
+                                             questions=questions,
+                                             published_by=quiz.owner_id)
+        Quiz.objects.filter(id=quiz.id).update(published_version=version)
+        QuizResponse.objects.filter(quiz=quiz).update(version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0016_quizresponse_created_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizquestion',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='QuizVersion',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('number', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.TextField()),
+                ('questions', models.JSONField()),
+                ('published_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('published_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='lessons.quiz')),
+            ],
+            options={
+                'unique_together': {('quiz', 'number')},
+            },
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='published_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='lessons.quizversion'),
+        ),
+        migrations.AddField(
+            model_name='quizresponse',
+            name='version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='lessons.quizversion'),
+        ),
+        migrations.RunPython(publish_existing_quizzes,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-19 02:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lessons', '0017_quiz_versions'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='content',
+            old_name='checksum',
+            new_name='etag',
+        ),
+    ]
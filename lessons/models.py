@@ -7,10 +7,23 @@ import json
 from enum import Enum
 from typing import List
 
+from django.conf import settings
 from django.db import models
-from rest_framework import serializers
+from django.utils import timezone
+from rest_framework import exceptions, serializers
 
+from accounts.enrollments import enrolled_class_ids
 from accounts.models import Class, User
+from lessons.coalescing import get_single_flight
+from lessons.delivery import get_delivery_service
+
+CONTENT_CACHE_KEY = 'content_{}'
+QUIZ_CACHE_KEY = 'quiz_{}'
+VERSION_CACHE_KEY = 'quiz_version_{}'
+# Question fields frozen into a quiz version
+VERSION_QUESTION_FIELDS = [
+    'id', 'question', 'options', 'correct_index', 'weight'
+]
 
 
 class ContentFormat(Enum):
@@ -33,8 +46,18 @@ class Content(models.Model):
     content_type = models.CharField(max_length=10,
                                     choices=[(tag, tag.value)
                                              for tag in ContentFormat])
+    size = models.BigIntegerField(null=True, blank=True)  # bytes
+    # Storage ETag; for multipart uploads not a digest of the file
+    etag = models.CharField(max_length=64, blank=True)
+    # Media metadata, filled in by `lessons.ingestion`
+    duration = models.FloatField(null=True, blank=True)  # seconds
+    page_count = models.IntegerField(null=True, blank=True)
+    width = models.IntegerField(null=True, blank=True)  # pixels
+    height = models.IntegerField(null=True, blank=True)  # pixels
+    word_count = models.IntegerField(null=True, blank=True)
+    metadata_extracted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def quiz_id_list(self):
@@ -44,6 +67,16 @@ class Content(models.Model):
     def __str__(self):
         return f"<Content: {self.title}>"  # pylint: disable=no-member
 
+    @staticmethod
+    def shared(content_id: int) -> 'Content | None':
+        """Returns a content from the cache, read once by concurrent
+            requests. Saves and deletes drop the cached row."""
+        # pylint: disable=no-member
+        return get_single_flight().cached(
+            CONTENT_CACHE_KEY.format(content_id),
+            lambda: Content.objects.filter(id=content_id).first(),
+            settings.SINGLE_FLIGHT['TTL'])
+
 
 class Quiz(models.Model):
     """Quiz model.
@@ -57,38 +90,96 @@ class Quiz(models.Model):
     content_id = models.ForeignKey(Content, on_delete=models.CASCADE)
     owner_id = models.ForeignKey(User, on_delete=models.CASCADE)
     description = models.TextField()
+    # Version students see, the quiz and its questions are the next draft.
+    published_version = models.ForeignKey('QuizVersion',
+                                          on_delete=models.SET_NULL,
+                                          null=True,
+                                          blank=True,
+                                          related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     @property
     def questions(self):
-        """Returns the quiz questions."""
-        return QuizQuestion.objects.filter(quiz=self)  # pylint: disable=no-member
+        """Returns the draft questions of the quiz."""
+        return QuizQuestion.objects.filter(quiz=self, archived=False)  # pylint: disable=no-member
 
     def __str__(self):
         return f"<Quiz: {self.title}>"  # pylint: disable=no-member
 
+    @staticmethod
+    def shared(quiz_id: int) -> 'Quiz | None':
+        """Returns a quiz from the cache, read once by concurrent requests.
+            Saves and deletes drop the cached row."""
+        # pylint: disable=no-member
+        return get_single_flight().cached(
+            QUIZ_CACHE_KEY.format(quiz_id),
+            lambda: Quiz.objects.filter(id=quiz_id).first(),
+            settings.SINGLE_FLIGHT['TTL'])
+
+    @staticmethod
+    def visible_to(user) -> models.QuerySet:
+        """Returns the quizzes a user may see.
+            Staff see every quiz, others the published quizzes without a
+            class or of the classes they are enrolled in."""
+        quizzes = Quiz.objects.all()  # pylint: disable=no-member
+        if user.is_staff:
+            return quizzes
+        return quizzes.filter(
+            models.Q(class_id__isnull=True)
+            | models.Q(class_id__in=enrolled_class_ids(user.id)),
+            published_version__isnull=False)
+
+    def current_version(self) -> 'QuizVersion':
+        """Returns the published version, or an unsaved version of the
+            draft while the quiz was never published."""
+        if self.published_version_id is not None:
+            return QuizVersion.frozen(self.published_version_id)
+        return QuizVersion(quiz=self,
+                           number=0,
+                           title=self.title,
+                           description=self.description,
+                           questions=list(self.questions.order_by('id').values(
+                               *VERSION_QUESTION_FIELDS)))
+
+    def student_questions(self, student: User) -> List[dict]:
+        """Returns the questions of the current version without their
+            answers, with the scores of the student's responses."""
+        # pylint: disable=no-member
+        scores = dict(
+            QuizResponse.objects.filter(quiz=self,
+                                        student=student).values_list(
+                                            'question_id', 'score'))
+        return self.current_version().student_questions(scores)
+
     def is_completed_by(self, student: User) -> bool:
         """Checks if the quiz is completed by the student."""
-        questions = self.questions
+        questions = self.current_version().question_ids()
         # pylint: disable=no-member
-        responses = QuizResponse.objects.filter(quiz=self, student=student)
-        return len(responses) == len(questions)
+        responses = QuizResponse.objects.filter(quiz=self,
+                                                student=student,
+                                                question_id__in=questions)
+        return responses.count() == len(questions)
 
     def score(self, student: User) -> int:
-        """Returns the total score for the student."""
+        """Returns the total score for the student.
+            Answers are weighed by the version they were given to, so
+            editing a question never changes past scores."""
         if not self.is_completed_by(student):
             return None
+        weights = self.current_version().weights()
         total_score = 0
         total_weight = 0
-        for question in self.questions:
-            # pylint: disable=no-member
-            response = QuizResponse.objects.filter(quiz=self,
-                                                   student=student,
-                                                   question=question).first()
-            if response:
-                total_score += response.score
-                total_weight += question.weight
-        return total_score / total_weight * 100
+        # pylint: disable=no-member
+        for question_id, version_id, score in QuizResponse.objects.filter(
+                quiz=self, student=student,
+                question_id__in=weights).values_list('question_id',
+                                                     'version_id', 'score'):
+            total_score += score
+            total_weight += QuizVersion.frozen(version_id).weights().get(
+                question_id,
+                weights[question_id]) if version_id else weights[question_id]
+        return total_score / total_weight * 100 if total_weight else None
 
 
 class QuizQuestion(models.Model):
@@ -102,7 +193,10 @@ class QuizQuestion(models.Model):
     responses = models.ManyToManyField('QuizResponse',
                                        related_name='question_responses')
     correct_index = models.IntegerField()
+    # Deleted from the draft while published versions still ask it.
+    archived = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"<QuizQuestion: {self.question}>"  # pylint: disable=no-member
@@ -116,15 +210,90 @@ class QuizQuestion(models.Model):
         return answer == self.correct_index
 
 
+class QuizVersion(models.Model):
+    """Quiz version model.
+        A snapshot of a quiz and its questions taken when it is published,
+        see `lessons.versions`. Versions never change once created."""
+    id = models.AutoField(primary_key=True)
+    quiz = models.ForeignKey(Quiz,
+                             on_delete=models.CASCADE,
+                             related_name='versions')
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=100)
+    description = models.TextField()
+    # [{id, question, options, correct_index, weight}], in question order
+    questions = models.JSONField()
+    published_at = models.DateTimeField(default=timezone.now)
+    published_by = models.ForeignKey(User,
+                                     on_delete=models.SET_NULL,
+                                     null=True,
+                                     blank=True)
+
+    def __str__(self):
+        return f"<QuizVersion: {self.quiz_id} v{self.number}>"  # pylint: disable=no-member
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Quiz versions are immutable.")
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def frozen(version_id: int) -> 'QuizVersion':
+        """Returns a version from the cache, where it is kept forever."""
+        return get_single_flight().cached(
+            VERSION_CACHE_KEY.format(version_id),
+            lambda: QuizVersion.objects.get(id=version_id),  # pylint: disable=no-member
+            None)
+
+    def question(self, question_id: int) -> dict | None:
+        """Returns a question of the version by id."""
+        return next((question for question in self.questions
+                     if question['id'] == question_id), None)
+
+    def question_ids(self) -> List[int]:
+        """Returns the ids of the questions of the version."""
+        return [question['id'] for question in self.questions]
+
+    def student_questions(self, scores: dict | None = None) -> List[dict]:
+        """Returns the questions without their answers, with the scores of
+            a student's responses by question id."""
+        scores = scores or {}
+        return [{
+            'id': question['id'],
+            'quiz': self.quiz_id,  # pylint: disable=no-member
+            'question': question['question'],
+            'options': question['options'],
+            'weight': question['weight'],
+            'score': scores.get(question['id']),
+        } for question in self.questions]
+
+    def weights(self) -> dict:
+        """Returns the weight of each question of the version by id."""
+        return {
+            question['id']: question['weight']
+            for question in self.questions
+        }
+
+    class Meta:
+        """Versions are numbered from 1 per quiz."""
+        unique_together = ['quiz', 'number']
+
+
 class QuizResponse(models.Model):
     """Quiz response model.
         Represents a student's response to a quiz question."""
     id = models.AutoField(primary_key=True)
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
     question = models.ForeignKey(QuizQuestion, on_delete=models.CASCADE)
+    # Version the answer was scored against, none for legacy responses.
+    version = models.ForeignKey(QuizVersion,
+                                on_delete=models.CASCADE,
+                                null=True,
+                                blank=True)
     student = models.ForeignKey(User, on_delete=models.CASCADE)
     score = models.IntegerField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add, buffered responses keep their submission time.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     def __str__(self):
         return f"<QuizResponse: {self.question.question} - {self.student.username}>"  # pylint: disable=no-member
@@ -132,9 +301,187 @@ class QuizResponse(models.Model):
     class Meta:
         """Constrain the QuizResponse to be unique for each student, quiz and question."""
         unique_together = ['quiz', 'question', 'student']
+        indexes = [
+            # Activity lookups of `accounts.streaks`.
+            models.Index(fields=['student', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+
+
+class PlaybackProgress(models.Model):
+    """Playback progress model.
+        Represents how far a student got in a video or audio content,
+        written by `lessons.progress`."""
+    id = models.AutoField(primary_key=True)
+    student = models.ForeignKey(User, on_delete=models.CASCADE)
+    content = models.ForeignKey(Content, on_delete=models.CASCADE)
+    position = models.FloatField()  # seconds from the start
+    # Time of the last heartbeat, not of the write.
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"<PlaybackProgress: {self.student_id} - {self.content_id}>"  # pylint: disable=no-member
+
+    class Meta:
+        """One position per student and content."""
+        unique_together = ['student', 'content']
+
+
+class UploadStatus(Enum):
+    """Enumeration for content upload session states."""
+    PENDING = 'pending'
+    COMPLETED = 'completed'
+    ABORTED = 'aborted'
+
+
+class ContentUpload(models.Model):
+    """Content upload model.
+        Represents a multipart upload session straight to object storage."""
+    id = models.AutoField(primary_key=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=100)
+    description = models.TextField()
+    content_type = models.CharField(max_length=10,
+                                    choices=[(tag.value, tag.value)
+                                             for tag in ContentFormat])
+    filename = models.CharField(max_length=255)
+    bucket = models.CharField(max_length=63)
+    key = models.CharField(max_length=1024)
+    storage_upload_id = models.CharField(max_length=1024)
+    size = models.BigIntegerField()  # bytes
+    part_size = models.BigIntegerField()  # bytes
+    status = models.CharField(max_length=10,
+                              choices=[(tag.value, tag.value)
+                                       for tag in UploadStatus],
+                              default=UploadStatus.PENDING.value)
+    content = models.OneToOneField(Content,
+                                   on_delete=models.SET_NULL,
+                                   null=True,
+                                   blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"<ContentUpload: {self.filename}>"
+
+    @property
+    def part_count(self) -> int:
+        """Returns the number of parts the file is split into."""
+        return max(1, -(-self.size // self.part_size))
+
+    def missing_parts(self) -> List[int]:
+        """Returns the part numbers that have not been uploaded yet."""
+        # pylint: disable=no-member
+        uploaded = set(self.parts.values_list('part_number', flat=True))
+        return [
+            number for number in range(1, self.part_count + 1)
+            if number not in uploaded
+        ]
+
+
+class ContentUploadPart(models.Model):
+    """Content upload part model.
+        Represents a part of a multipart upload that reached storage."""
+    id = models.AutoField(primary_key=True)
+    upload = models.ForeignKey(ContentUpload,
+                               on_delete=models.CASCADE,
+                               related_name='parts')
+    part_number = models.IntegerField()
+    etag = models.CharField(max_length=255)
+    size = models.BigIntegerField()  # bytes
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"<ContentUploadPart: {self.part_number} of {self.upload.filename}>"  # pylint: disable=no-member
+
+    class Meta:
+        """Constrain the part number to be unique within an upload."""
+        unique_together = ['upload', 'part_number']
+
+
+class Tombstone(models.Model):
+    """Tombstone model.
+        Records a deleted lesson row so clients can sync the deletion."""
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=10)  # see `lessons.sync.SYNC_KINDS`
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"<Tombstone: {self.kind} {self.object_id}>"
 
 
 # Serializers Definitions
+class SparseFieldsetMixin:
+    """Serializer mixin that prunes fields before any of them are evaluated.
+
+    Fields are selected from the keyword arguments `fields`, `exclude` and
+    `view`, or, on the root serializer only, from the query parameters of the
+    same name of the request in the serializer context. Nested serializers
+    ignore the query parameters, which describe the response rather than
+    them. Named views are declared on the serializer through
+    `Meta.representations`, e.g. `{'summary': ['id', 'title']}`. Unknown
+    fields and views are a `ValidationError`. Pruned
+    `SerializerMethodField`s are never called, so their queries are never
+    executed.
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, view=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = fields
+        self.sparse_exclude = exclude
+        self.sparse_view = view
+
+    def get_fields(self):
+        """Returns the fields left once the fieldset is applied."""
+        all_fields = super().get_fields()
+        fields = self.sparse_fields
+        exclude = self.sparse_exclude
+        view = self.sparse_view
+        request = self.context.get('request')
+        if request is not None and self._is_root():
+            params = request.query_params
+            fields = fields or self._split_param(params.get('fields'))
+            exclude = exclude or self._split_param(params.get('exclude'))
+            view = view or params.get('view')
+
+        unknown = (set(fields or []) | set(exclude or [])) - set(all_fields)
+        if unknown:
+            raise exceptions.ValidationError(
+                f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+        selected = set(fields) if fields else None
+        if view:
+            representations = getattr(self.Meta, 'representations', {})
+            if view not in representations:
+                raise exceptions.ValidationError(
+                    f"Unknown view '{view}'. Expected one of: "
+                    f"{', '.join(sorted(representations))}.")
+            view_fields = set(representations[view])
+            selected = view_fields if selected is None else selected & view_fields
+        if selected is not None:
+            for name in set(all_fields) - selected:
+                all_fields.pop(name)
+        for name in set(exclude or []):
+            all_fields.pop(name, None)
+        return all_fields
+
+    def _is_root(self) -> bool:
+        """Returns True for the top-level serializer, or the child of a
+            top-level list serializer."""
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    @staticmethod
+    def _split_param(value: str | None) -> List[str]:
+        """Splits a comma separated query parameter into field names."""
+        if not value:
+            return []
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+
 class ContentTypeSerializer(serializers.Serializer):
     """Serializer for the lesson content type."""
     value = serializers.CharField(max_length=10)
@@ -166,21 +513,35 @@ class CreateContentSerializer(serializers.HyperlinkedModelSerializer):
         fields = ['id', 'title', 'description', 'content_uri', 'content_type']
 
 
-class ContentSerializer(serializers.ModelSerializer):
+class ContentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the lesson content model."""
 
     content_type = ContentTypeSerializer()
 
     def get_quiz_id_list(self, obj):
-        """Returns the list of quizzes for the content."""
-        return set(obj.quiz_id_list)  # pylint: disable=no-member
+        """Returns the list of quizzes for the content the requesting
+            user may see."""
+        request = self.context.get('request')
+        if request is None:
+            return set(obj.quiz_id_list)  # pylint: disable=no-member
+        return set(
+            Quiz.visible_to(request.user).filter(content_id=obj).values_list(
+                'id', flat=True))
+
+    def get_download_url(self, obj) -> str:
+        """Returns a short-lived download URL for the content file."""
+        return get_delivery_service().presigned_url(obj)
 
     quiz_id_list = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
 
     class Meta:
         """Content serializer meta class."""
         model = Content
         fields = '__all__'
+        representations = {
+            'summary': ['id', 'title', 'content_type', 'updated_at'],
+        }
 
 
 class CreateQuizSerializer(serializers.HyperlinkedModelSerializer):
@@ -194,14 +555,16 @@ class CreateQuizSerializer(serializers.HyperlinkedModelSerializer):
         fields = ['id', 'title', 'class_id', 'content_id', 'description']
 
 
-class QuizSerializer(serializers.ModelSerializer):
+class QuizSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for the lesson quiz model."""
 
     def get_question_list(self, obj):
         """Returns the list of questions for the quiz."""
-        return RestrictedQuizQuestionSerializer(obj.questions,
-                                                many=True,
-                                                context=self.context).data
+        if 'request' not in self.context:
+            raise ValueError("Request context is required.")
+        return VersionQuestionSerializer(obj.student_questions(
+            self.context['request'].user),
+                                         many=True).data
 
     def get_is_completed(self, obj):
         """Returns True if the quiz is completed by the student."""
@@ -223,6 +586,9 @@ class QuizSerializer(serializers.ModelSerializer):
         """Quiz serializer meta class."""
         model = Quiz
         fields = '__all__'
+        representations = {
+            'summary': ['id', 'title', 'class_id', 'content_id'],
+        }
 
 
 class QuizQuestionSerializer(serializers.ModelSerializer):
@@ -243,23 +609,79 @@ class QuizQuestionSerializer(serializers.ModelSerializer):
         ]
 
 
-class RestrictedQuizQuestionSerializer(serializers.ModelSerializer):
-    """Serializer for the lesson quiz question model. Excludes the correct answer."""
-    score = serializers.SerializerMethodField()
+class VersionQuestionSerializer(serializers.Serializer):
+    """Serializer for a question of a published quiz version. Excludes the
+        correct answer."""
+    id = serializers.IntegerField()
+    quiz = serializers.IntegerField()
+    question = serializers.CharField()
+    options = serializers.JSONField()
+    weight = serializers.IntegerField()
+    score = serializers.IntegerField(allow_null=True)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
 
-    def get_score(self, obj):
-        """Returns the score from the quiz response, if any."""
-        # pylint: disable=no-member
-        response = QuizResponse.objects.filter(
-            question=obj, student=self.context['request'].user).first()
-        if response:
-            return response.score
-        return None
+
+class QuizVersionSerializer(serializers.ModelSerializer):
+    """Serializer for a published quiz version. Excludes the correct
+        answers."""
+    questions = serializers.SerializerMethodField()
+
+    def get_questions(self, obj) -> List[dict]:
+        """Returns the questions of the version."""
+        return VersionQuestionSerializer(obj.student_questions(),
+                                         many=True).data
 
     class Meta:
-        """Restricted quiz question serializer meta class."""
-        model = QuizQuestion
-        fields = ['id', 'quiz', 'question', 'options', 'weight', 'score']
+        """Quiz version serializer meta class."""
+        model = QuizVersion
+        fields = [
+            'id', 'quiz', 'number', 'title', 'description', 'questions',
+            'published_at'
+        ]
+
+
+class QuizVersionSummarySerializer(serializers.ModelSerializer):
+    """Serializer for the list of versions of a quiz."""
+    question_count = serializers.SerializerMethodField()
+
+    def get_question_count(self, obj) -> int:
+        """Returns the number of questions of the version."""
+        return len(obj.questions)
+
+    class Meta:
+        """Quiz version summary serializer meta class."""
+        model = QuizVersion
+        fields = [
+            'id', 'quiz', 'number', 'title', 'question_count', 'published_at',
+            'published_by'
+        ]
+
+
+class SyncQuizQuestionSerializer(serializers.Serializer):
+    """Serializer for syncing the questions of a published quiz version.
+        Excludes the correct answer."""
+    id = serializers.IntegerField()
+    quiz = serializers.IntegerField()
+    version = serializers.IntegerField()
+    question = serializers.CharField()
+    options = serializers.JSONField()
+    weight = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
 
 
 class CreateQuizQuestionSerializer(serializers.HyperlinkedModelSerializer):
@@ -272,6 +694,65 @@ class CreateQuizQuestionSerializer(serializers.HyperlinkedModelSerializer):
         fields = ['id', 'quiz_id', 'question', 'options', 'correct_index']
 
 
+class QuizDocumentQuestionSerializer(serializers.Serializer):
+    """Serializer for a question of a quiz document."""
+    question = serializers.CharField()
+    options = serializers.ListField(child=serializers.CharField(),
+                                    min_length=2)
+    correct_index = serializers.IntegerField(min_value=0)
+    weight = serializers.IntegerField(min_value=0, default=1)
+
+    def validate(self, attrs):
+        """Checks the correct answer is one of the options."""
+        if attrs['correct_index'] >= len(attrs['options']):
+            raise serializers.ValidationError(
+                {'correct_index': "Must be the index of an option."})
+        return attrs
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class QuizDocumentSerializer(serializers.Serializer):
+    """Serializer for a quiz of a quiz document."""
+    id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(max_length=100)
+    description = serializers.CharField(allow_blank=True)
+    class_id = serializers.IntegerField(allow_null=True, default=None)
+    questions = QuizDocumentQuestionSerializer(many=True, allow_empty=False)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class QuizBundleSerializer(serializers.Serializer):
+    """Serializer for a quiz document, the quizzes of one content."""
+    class_id = serializers.IntegerField(
+        allow_null=True,
+        required=False,
+        help_text="Class of every quiz, overriding their own. "
+        "Null imports them without a class.")
+    quizzes = QuizDocumentSerializer(many=True, allow_empty=False)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
 class QuizResponseSerializer(serializers.ModelSerializer):
     """Serializer for the lesson quiz response model."""
 
@@ -279,3 +760,162 @@ class QuizResponseSerializer(serializers.ModelSerializer):
         """Quiz response serializer meta class."""
         model = QuizResponse
         fields = '__all__'
+
+
+class CreateContentUploadSerializer(serializers.Serializer):
+    """Serializer for starting a content upload."""
+    title = serializers.CharField(max_length=100)
+    description = serializers.CharField()
+    content_type = serializers.ChoiceField(
+        choices=[tag.value for tag in ContentFormat])
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class ContentUploadSerializer(serializers.ModelSerializer):
+    """Serializer for the content upload model."""
+    part_count = serializers.ReadOnlyField()
+    missing_parts = serializers.SerializerMethodField()
+
+    def get_missing_parts(self, obj) -> List[int]:
+        """Returns the parts the client still has to upload."""
+        return obj.missing_parts()
+
+    class Meta:
+        """Content upload serializer meta class."""
+        model = ContentUpload
+        fields = [
+            'id', 'title', 'description', 'content_type', 'filename', 'size',
+            'part_size', 'part_count', 'missing_parts', 'status', 'content',
+            'created_at', 'updated_at'
+        ]
+
+
+class UploadPartUrlsSerializer(serializers.Serializer):
+    """Serializer for requesting presigned part upload URLs."""
+    part_numbers = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), max_length=1000)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class ContentUploadPartSerializer(serializers.ModelSerializer):
+    """Serializer for the content upload part model."""
+
+    class Meta:
+        """Content upload part serializer meta class."""
+        model = ContentUploadPart
+        fields = ['part_number', 'etag', 'size', 'created_at']
+        read_only_fields = ['part_number', 'created_at']
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """Serializer for a lesson search hit."""
+    kind = serializers.ChoiceField(choices=['content', 'quiz', 'question'])
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    text = serializers.CharField()
+    score = serializers.FloatField()
+    parent_id = serializers.IntegerField(
+        allow_null=True,
+        help_text="Content id of a quiz, quiz id of a question.")
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class SearchResultPageSerializer(serializers.Serializer):
+    """Serializer for a page of lesson search hits."""
+    count = serializers.IntegerField()
+    page = serializers.IntegerField()
+    page_size = serializers.IntegerField()
+    results = SearchResultSerializer(many=True)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class PlaybackProgressSerializer(serializers.Serializer):
+    """Serializer for a playback progress heartbeat."""
+    content = serializers.IntegerField(read_only=True)
+    position = serializers.FloatField(min_value=0,
+                                      help_text="Seconds from the start.")
+    updated_at = serializers.DateTimeField(read_only=True)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class LeaderboardEntrySerializer(serializers.Serializer):
+    """Serializer for a ranked student on a leaderboard."""
+    rank = serializers.IntegerField()
+    student = serializers.IntegerField()
+    username = serializers.CharField()
+    points = serializers.IntegerField()
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class LeaderboardSerializer(serializers.Serializer):
+    """Serializer for the top of a leaderboard."""
+    size = serializers.IntegerField(help_text="Number of ranked students.")
+    results = LeaderboardEntrySerializer(many=True)
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
+
+
+class LeaderboardRankSerializer(serializers.Serializer):
+    """Serializer for the rank of the current user on a leaderboard."""
+    rank = serializers.IntegerField(
+        allow_null=True, help_text="Null until the user has answered.")
+    points = serializers.IntegerField(allow_null=True)
+    size = serializers.IntegerField(help_text="Number of ranked students.")
+
+    def create(self, validated_data):
+        """overrides the create method."""
+        pass  # pylint: disable=unnecessary-pass
+
+    def update(self, instance, validated_data):
+        """overrides the update method."""
+        pass  # pylint: disable=unnecessary-pass
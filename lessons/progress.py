@@ -0,0 +1,155 @@
+"""
+    Playback progress.
+    Heartbeats from video and audio players update the latest position in
+    the cache at once. A background flusher upserts the positions that
+    changed, so the database sees one write per student and content per
+    flush interval rather than one per heartbeat.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from functools import lru_cache
+from typing import Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from accounts.models import User
+from capitalize.db import upsert_options
+from lessons.coalescing import get_single_flight
+from lessons.ingestion import format_value
+from lessons.models import Content, ContentFormat, PlaybackProgress
+
+PROGRESS_KEY = 'playback_progress_{student}_{content}'
+CONTENT_FORMAT_KEY = 'playback_content_format_{}'
+PLAYABLE = {ContentFormat.VIDEO.value, ContentFormat.AUDIO.value}
+
+logger = logging.getLogger(__name__)
+
+
+def content_format(content_id: int) -> str | None:
+    """Returns the format of a content, None if it does not exist.
+        Cached briefly so heartbeats do not read the content row."""
+
+    def load() -> str:
+        # pylint: disable=no-member
+        content_type = Content.objects.filter(id=content_id).values_list(
+            'content_type', flat=True).first()
+        return format_value(content_type) if content_type else ''
+
+    return get_single_flight().cached(CONTENT_FORMAT_KEY.format(content_id),
+                                      load, 300) or None
+
+
+class ProgressTracker:
+    """Coalesces playback heartbeats and flushes them periodically."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.dirty: Set[Tuple[int, int]] = set()
+        self.lock = threading.Lock()
+        self.flusher: threading.Thread | None = None
+
+    def heartbeat(self, student_id: int, content_id: int,
+                  position: float) -> dict:
+        """Records the latest position; it is written on the next flush."""
+        progress = {
+            'content': content_id,
+            'position': position,
+            'updated_at': timezone.now()
+        }
+        cache.set(PROGRESS_KEY.format(student=student_id, content=content_id),
+                  progress, settings.PLAYBACK['CACHE_TTL'])
+        with self.lock:
+            self.dirty.add((student_id, content_id))
+            if self.flusher is None or not self.flusher.is_alive():
+                self.flusher = threading.Thread(target=self.run,
+                                                name='playback-flusher',
+                                                daemon=True)
+                self.flusher.start()
+        return progress
+
+    def get(self, student_id: int, content_id: int) -> dict | None:
+        """Returns the latest position, from the cache or database."""
+        key = PROGRESS_KEY.format(student=student_id, content=content_id)
+        progress = cache.get(key)
+        if progress is None:
+            # pylint: disable=no-member
+            row = PlaybackProgress.objects.filter(
+                student_id=student_id,
+                content_id=content_id).values('position',
+                                              'updated_at').first()
+            if row is None:
+                return None
+            progress = {'content': content_id, **row}
+            cache.set(key, progress, settings.PLAYBACK['CACHE_TTL'])
+        return progress
+
+    def run(self):
+        """Flushes the heartbeats every interval."""
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-except
+                # Positions stay dirty, retried next round.
+                logger.exception("Flushing playback progress failed")
+            finally:
+                close_old_connections()
+
+    def flush(self) -> int:
+        """Upserts the latest position of every changed pair.
+            Returns the number of rows written."""
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        if not dirty:
+            return 0
+        keys = {
+            PROGRESS_KEY.format(student=student_id, content=content_id):
+            (student_id, content_id)
+            for student_id, content_id in dirty
+        }
+        try:
+            # Other workers may hold newer heartbeats of the same pair, the
+            # cache has the latest one.
+            latest = cache.get_many(keys)
+            # pylint: disable=no-member
+            students = set(
+                User.objects.filter(
+                    id__in={pair[0]
+                            for pair in dirty}).values_list('id', flat=True))
+            contents = set(
+                Content.objects.filter(
+                    id__in={pair[1]
+                            for pair in dirty}).values_list('id', flat=True))
+            rows = [
+                PlaybackProgress(student_id=student_id,
+                                 content_id=content_id,
+                                 position=latest[key]['position'],
+                                 updated_at=latest[key]['updated_at'])
+                for key, (student_id, content_id) in keys.items()
+                if key in latest and student_id in students
+                and content_id in contents
+            ]
+            PlaybackProgress.objects.bulk_create(
+                rows,
+                **upsert_options(['student', 'content'],
+                                 ['position', 'updated_at']))
+        except Exception:
+            with self.lock:
+                self.dirty |= dirty
+            raise
+        return len(rows)
+
+
+@lru_cache(maxsize=1)
+def get_progress_tracker() -> ProgressTracker:
+    """Returns the process-wide progress tracker.
+        Pending heartbeats are flushed when the process exits."""
+    tracker = ProgressTracker(settings.PLAYBACK['FLUSH_INTERVAL'])
+    atexit.register(tracker.flush)
+    return tracker
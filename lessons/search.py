@@ -0,0 +1,300 @@
+"""
+    Lesson search.
+    Full-text search over content, quizzes and quiz questions. MySQL serves
+    queries from FULLTEXT indexes; other databases (SQLite in tests and
+    development) use an in-process inverted index kept current by signals.
+"""
+
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from django.db import connection
+from django.db.models import F, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+from lessons.models import Content, Quiz, QuizQuestion
+
+TOKEN = re.compile(r'\w+')
+
+
+@dataclass
+class SearchDocument:
+    """A searchable model: its weighted fields and how to describe a hit."""
+    kind: str
+    model: type
+    fields: Dict[str, float]  # field name -> ranking weight
+    title_field: str
+    text_field: str
+    parent_field: str | None = None
+    # Field holding the id of the quiz a row is or belongs to.
+    quiz_field: str | None = None
+    # Field values a row needs to be searchable at all.
+    filters: Dict[str, Any] = field(default_factory=dict)
+    # Condition for the row's text to be the published text students see.
+    published: Q | None = None
+
+
+DOCUMENTS = {
+    'content':
+    SearchDocument('content', Content, {
+        'title': 2.0,
+        'description': 1.0
+    }, 'title', 'description'),
+    'quiz':
+    SearchDocument('quiz',
+                   Quiz, {
+                       'title': 2.0,
+                       'description': 1.0
+                   },
+                   'title',
+                   'description',
+                   parent_field='content_id_id',
+                   quiz_field='id',
+                   published=Q(title=F('published_version__title'),
+                               description=F(
+                                   'published_version__description'))),
+    'question':
+    SearchDocument('question',
+                   QuizQuestion, {'question': 1.0},
+                   'question',
+                   'question',
+                   parent_field='quiz_id',
+                   quiz_field='quiz_id',
+                   filters={'archived': False},
+                   published=Q(quiz__published_version__published_at__gte=F(
+                       'updated_at'))),
+}
+
+
+@dataclass
+class SearchHit:
+    """A ranked search result."""
+    kind: str
+    id: int
+    title: str
+    text: str
+    score: float
+    parent_id: int | None = None
+
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase search terms."""
+    return TOKEN.findall(text.lower())
+
+
+def document_for(model: type) -> SearchDocument | None:
+    """Returns the search document of a model, if it is searchable."""
+    for document in DOCUMENTS.values():
+        if document.model is model:
+            return document
+    return None
+
+
+def visible(document: SearchDocument, queryset: QuerySet,
+            quiz_ids: Set[int] | None) -> QuerySet:
+    """Limits rows to the searchable ones and, when `quiz_ids` is given,
+        to the quizzes and questions published as they read now."""
+    queryset = queryset.filter(**document.filters)
+    if quiz_ids is not None and document.quiz_field:
+        # Draft edits stay hidden until the quiz is published again.
+        queryset = queryset.filter(document.published,
+                                   **{f'{document.quiz_field}__in': quiz_ids})
+    return queryset
+
+
+def make_hit(document: SearchDocument, obj, score: float) -> SearchHit:
+    """Builds a search hit for a model instance."""
+    return SearchHit(kind=document.kind,
+                     id=obj.id,
+                     title=getattr(obj, document.title_field),
+                     text=getattr(obj, document.text_field),
+                     score=score,
+                     parent_id=getattr(obj, document.parent_field)
+                     if document.parent_field else None)
+
+
+class MySQLFullTextBackend:
+    """Searches the FULLTEXT indexes with boolean mode prefix queries."""
+
+    def search(self,
+               query: str,
+               kinds: Iterable[str],
+               offset: int,
+               limit: int,
+               quiz_ids: Set[int] | None = None) -> Tuple[int, List[SearchHit]]:
+        """Returns the total number of hits and one ranked page of them.
+            Quizzes and questions are limited to `quiz_ids` when given."""
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        # Every term is required and matches as a prefix.
+        against = ' '.join(f'+{term}*' for term in terms)
+        total, hits = 0, []
+        for kind in kinds:
+            document = DOCUMENTS[kind]
+            columns = ', '.join(document.fields)
+            matches = visible(
+                document,
+                document.model.objects.annotate(score=RawSQL(
+                    f"MATCH({columns}) AGAINST (%s IN BOOLEAN MODE)",
+                    (against, ))).filter(score__gt=0), quiz_ids)
+            total += matches.count()
+            # The page can only hold the best offset + limit of each kind.
+            hits += [
+                make_hit(document, obj, obj.score)
+                for obj in matches.order_by('-score')[:offset + limit]
+            ]
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return total, hits[offset:offset + limit]
+
+    def index(self, obj):
+        """The database maintains FULLTEXT indexes itself."""
+
+    def remove(self, obj):
+        """The database maintains FULLTEXT indexes itself."""
+
+
+class InvertedIndexBackend:
+    """In-process inverted index ranked by weighted TF-IDF.
+
+    The index is built from the database on the first search and then
+    updated incrementally through `index` and `remove`.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.built = False
+        # term -> {(kind, id): weighted term frequency}
+        self.postings: Dict[str, Dict[Tuple[str, int], float]] = {}
+        self.terms: List[str] = []  # sorted, for prefix lookups
+        self.documents: Dict[Tuple[str, int], Tuple[SearchHit, set]] = {}
+
+    def build(self):
+        """Indexes every searchable row."""
+        with self.lock:
+            if self.built:
+                return
+            for document in DOCUMENTS.values():
+                for obj in document.model.objects.filter(
+                        **document.filters).iterator():
+                    self._add(document, obj, keep_sorted=False)
+            self.terms = sorted(self.postings)
+            self.built = True
+
+    def index(self, obj):
+        """Adds or replaces a row in the index."""
+        document = document_for(type(obj))
+        with self.lock:
+            if document is None or not self.built:
+                return
+            self._discard((document.kind, obj.id))
+            # Rows leaving the filters, like archived questions, only drop.
+            if all(
+                    getattr(obj, name) == value
+                    for name, value in document.filters.items()):
+                self._add(document, obj)
+
+    def remove(self, obj):
+        """Removes a row from the index."""
+        document = document_for(type(obj))
+        with self.lock:
+            if document is None or not self.built:
+                return
+            self._discard((document.kind, obj.id))
+
+    def search(self,
+               query: str,
+               kinds: Iterable[str],
+               offset: int,
+               limit: int,
+               quiz_ids: Set[int] | None = None) -> Tuple[int, List[SearchHit]]:
+        """Returns the total number of hits and one ranked page of them.
+            Quizzes and questions are limited to `quiz_ids` when given."""
+        terms = tokenize(query)
+        if not terms:
+            return 0, []
+        self.build()
+        kinds = set(kinds)
+        allowed = None if quiz_ids is None else {
+            kind: set(
+                visible(document, document.model.objects.all(),
+                        quiz_ids).values_list('id', flat=True))
+            for kind, document in DOCUMENTS.items()
+            if kind in kinds and document.quiz_field
+        }
+        with self.lock:
+            total_docs = max(len(self.documents), 1)
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for indexed in self._prefixed(term):
+                    postings = self.postings[indexed]
+                    idf = math.log(1 + total_docs / len(postings))
+                    for key, frequency in postings.items():
+                        if key[0] in kinds and self._allowed(key, allowed):
+                            term_scores[key] = max(term_scores[key],
+                                                   frequency * idf)
+                # Every term is required.
+                scores = term_scores if scores is None else {
+                    key: score + term_scores[key]
+                    for key, score in scores.items() if key in term_scores
+                }
+            ranked = sorted(scores.items(), key=lambda item: item[1],
+                            reverse=True)
+            page = []
+            for key, score in ranked[offset:offset + limit]:
+                hit = self.documents[key][0]
+                page.append(SearchHit(**{**hit.__dict__, 'score': score}))
+        return len(ranked), page
+
+    @staticmethod
+    def _allowed(key: Tuple[str, int],
+                 allowed: Dict[str, Set[int]] | None) -> bool:
+        if allowed is None or key[0] not in allowed:
+            return True
+        return key[1] in allowed[key[0]]
+
+    def _prefixed(self, prefix: str) -> Iterable[str]:
+        position = bisect_left(self.terms, prefix)
+        while (position < len(self.terms)
+               and self.terms[position].startswith(prefix)):
+            yield self.terms[position]
+            position += 1
+
+    def _add(self, document: SearchDocument, obj, keep_sorted: bool = True):
+        key = (document.kind, obj.id)
+        frequencies = defaultdict(float)
+        for field, weight in document.fields.items():
+            for term in tokenize(getattr(obj, field) or ''):
+                frequencies[term] += weight
+        for term, frequency in frequencies.items():
+            if term not in self.postings:
+                self.postings[term] = {}
+                if keep_sorted:
+                    insort(self.terms, term)
+            self.postings[term][key] = frequency
+        self.documents[key] = (make_hit(document, obj, 0.0),
+                               set(frequencies))
+
+    def _discard(self, key: Tuple[str, int]):
+        _, terms = self.documents.pop(key, (None, set()))
+        for term in terms:
+            postings = self.postings.get(term, {})
+            postings.pop(key, None)
+            if not postings:
+                self.postings.pop(term, None)
+                self.terms.pop(bisect_left(self.terms, term))
+
+
+@lru_cache(maxsize=1)
+def get_search_backend():
+    """Returns the search backend for the default database."""
+    if connection.vendor == 'mysql':
+        return MySQLFullTextBackend()
+    return InvertedIndexBackend()
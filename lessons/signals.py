@@ -0,0 +1,119 @@
+"""
+    Lesson signal handlers.
+"""
+
+import copy
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from lessons.ingestion import METADATA_FIELDS, schedule_extraction
+from lessons.leaderboards import (class_board, get_leaderboards, quiz_board,
+                                  record_responses)
+from lessons.models import (CONTENT_CACHE_KEY, QUIZ_CACHE_KEY, Content, Quiz,
+                            QuizQuestion, QuizResponse)
+from lessons.search import get_search_backend
+from lessons.sync import record_deletion
+
+
+@receiver(pre_save, sender=Content)
+def reset_stale_metadata(sender, instance: Content, **kwargs):
+    """Clears the metadata of content whose file or format changed."""
+    # pylint: disable=no-member
+    previous = sender.objects.filter(id=instance.id).values(
+        'content_uri', 'content_type').first() if instance.id else None
+    instance.metadata_changed = previous != {
+        'content_uri': instance.content_uri,
+        'content_type': instance.content_type
+    }
+    if previous and instance.metadata_changed:
+        for field in METADATA_FIELDS:
+            setattr(instance, field, None)
+        instance.metadata_extracted_at = None
+
+
+@receiver(post_save, sender=Content)
+def extract_changed_metadata(sender, instance: Content, **kwargs):
+    """Queues metadata extraction for new or changed content."""
+    if getattr(instance, 'metadata_changed', False):
+        schedule_extraction(instance)
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=QuizQuestion)
+def index_for_search(sender, instance, **kwargs):
+    """Adds saved rows to the search index once committed."""
+    transaction.on_commit(lambda: get_search_backend().index(instance))
+
+
+@receiver(post_delete, sender=Content)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=QuizQuestion)
+def remove_from_search(sender, instance, **kwargs):
+    """Drops deleted rows from the search index once committed."""
+    # The instance loses its id once the delete is done.
+    removed = copy.copy(instance)
+    transaction.on_commit(lambda: get_search_backend().remove(removed))
+
+
+@receiver(post_delete, sender=Content)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=QuizQuestion)
+def write_tombstone(sender, instance, **kwargs):
+    """Records deletions for delta sync, in the deleting transaction."""
+    record_deletion(instance)
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_delete, sender=Content)
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def drop_shared_row(sender, instance, **kwargs):
+    """Drops the cached row of a changed content or quiz once committed."""
+    key = (CONTENT_CACHE_KEY if sender is Content else
+           QUIZ_CACHE_KEY).format(instance.id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_save, sender=QuizResponse)
+@receiver(post_delete, sender=QuizResponse)
+def update_leaderboards(sender, instance: QuizResponse, **kwargs):
+    """Adds or removes the response points once committed."""
+    if kwargs.get('created') is False:
+        return
+    points = -instance.score if 'created' not in kwargs else instance.score
+    # The quiz is usually loaded already, spare the class lookup.
+    classes = {
+        instance.quiz_id: instance.quiz.class_id_id
+    } if sender.quiz.is_cached(instance) else None
+    transaction.on_commit(lambda: record_responses(
+        [(instance.quiz_id, instance.student_id, points)], classes))
+
+
+@receiver(pre_save, sender=Quiz)
+def remember_quiz_class(sender, instance: Quiz, **kwargs):
+    """Keeps the previous class of a quiz to invalidate its board."""
+    # pylint: disable=no-member
+    instance.previous_class_id = sender.objects.filter(
+        id=instance.id).values_list('class_id', flat=True).first(
+        ) if instance.id else None
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_leaderboards(sender, instance: Quiz, **kwargs):
+    """Drops the boards a changed quiz contributes to."""
+    boards = {quiz_board(instance.id)}
+    for class_id in (instance.class_id_id,
+                     getattr(instance, 'previous_class_id', None)):
+        if class_id:
+            boards.add(class_board(class_id))
+
+    def invalidate():
+        for board in boards:
+            get_leaderboards().invalidate(board)
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,139 @@
+"""
+    Delta sync.
+    Lists the lesson rows created, updated or deleted after a watermark so
+    clients can keep a local copy of the catalog up to date.
+"""
+
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+
+from accounts.enrollments import enrolled_class_ids
+from lessons.models import (Content, ContentSerializer, Quiz, QuizQuestion,
+                            QuizSerializer, QuizVersion,
+                            SyncQuizQuestionSerializer, Tombstone)
+
+# Response key -> (model, serializer factory)
+SYNC_KINDS = {
+    'content': (Content, lambda rows: ContentSerializer(
+        rows, many=True, exclude=['quiz_id_list', 'download_url'])),
+    'quizzes': (Quiz, lambda rows: QuizSerializer(
+        rows,
+        many=True,
+        exclude=['question_list', 'is_completed', 'score'])),
+    # Listed from the published versions, see `published_questions`.
+    'questions': (QuizQuestion,
+                  lambda rows: SyncQuizQuestionSerializer(rows, many=True)),
+}
+
+
+class InvalidToken(ValueError):
+    """Raised when a sync token cannot be decoded."""
+
+
+def encode_token(watermark: datetime, scope: str) -> str:
+    """Encodes a watermark and a visibility scope as an opaque sync token."""
+    return f"{int(watermark.timestamp() * 1_000_000)}-{scope}"
+
+
+def decode_token(token: str) -> tuple:
+    """Decodes a sync token back into its watermark and visibility scope.
+        Tokens issued before scopes were recorded have none."""
+    micros, _, scope = token.partition('-')
+    try:
+        watermark = datetime.fromtimestamp(
+            int(micros) / 1_000_000, dt_timezone.utc)
+    except (ValueError, OverflowError, OSError) as e:
+        raise InvalidToken("Invalid sync token.") from e
+    return watermark, scope or None
+
+
+def visibility_scope(user) -> str:
+    """Returns a fingerprint of the classes whose quizzes the user sees."""
+    if user.is_staff:
+        return 'staff'
+    class_ids = ','.join(map(str, sorted(enrolled_class_ids(user.id))))
+    return hashlib.sha256(class_ids.encode()).hexdigest()[:16]
+
+
+def changes_since(token: str | None, user) -> dict:
+    """Returns the changes the user may see after the token's watermark, and
+    the next token.
+
+    Quizzes and questions are limited to those the user may see, see
+    `Quiz.visible_to`. The new watermark trails the clock by
+    `SYNC["SETTLE_SECONDS"]` so rows written by transactions still in
+    flight are picked up by the next sync rather than skipped. Clients get a
+    full snapshot with `reset` when their token cannot list every change:
+    when it is older than the tombstone retention, or when the classes the
+    user sees changed since, so quizzes of a new class are listed and those
+    of a class left are dropped.
+    """
+    now = timezone.now()
+    upper = now - timedelta(seconds=settings.SYNC['SETTLE_SECONDS'])
+    since, since_scope = decode_token(token) if token else (None, None)
+    scope = visibility_scope(user)
+    reset = (since is None or since_scope != scope or
+             since < now - timedelta(days=settings.SYNC['TOMBSTONE_DAYS']))
+    quizzes = Quiz.visible_to(user)
+
+    changes = {'token': encode_token(upper, scope), 'reset': reset}
+    for kind, (model, serializer) in SYNC_KINDS.items():
+        if model is QuizQuestion:
+            rows = published_questions(quizzes, None if reset else since,
+                                       upper)
+        else:
+            # pylint: disable=no-member
+            rows = model.objects.filter(updated_at__lte=upper)
+            if model is Quiz:
+                rows = rows.filter(id__in=quizzes)
+            if not reset:
+                rows = rows.filter(updated_at__gt=since)
+            rows = rows.order_by('updated_at', 'id')
+        deleted = []
+        if not reset:
+            deleted = list(
+                Tombstone.objects.filter(kind=kind,
+                                         deleted_at__gt=since,
+                                         deleted_at__lte=upper).values_list(
+                                             'object_id', flat=True))
+        changes[kind] = {'updated': serializer(rows).data, 'deleted': deleted}
+    return changes
+
+
+def published_questions(quizzes, since: datetime | None,
+                        upper: datetime) -> List[dict]:
+    """Returns the questions of the current versions of the quizzes that
+        were published after `since`, as students see them. Clients never
+        get the draft questions, and get every question of a quiz again
+        when it is published."""
+    # pylint: disable=no-member
+    versions = QuizVersion.objects.filter(
+        id__in=quizzes.values('published_version'), published_at__lte=upper)
+    if since is not None:
+        versions = versions.filter(published_at__gt=since)
+    return [
+        dict(question, version=version.id, updated_at=version.published_at)
+        for version in versions.order_by('published_at', 'id')
+        for question in version.student_questions()
+    ]
+
+
+def record_deletion(instance):
+    """Writes the tombstone of a deleted lesson row."""
+    record_deletions(type(instance), [instance.id])
+
+
+def record_deletions(model: type, object_ids: Iterable[int]):
+    """Writes the tombstones of deleted lesson rows of a model, or of
+        questions left out of a newly published version."""
+    for kind, (kind_model, _) in SYNC_KINDS.items():
+        if issubclass(model, kind_model):
+            # pylint: disable=no-member
+            Tombstone.objects.bulk_create(
+                Tombstone(kind=kind, object_id=object_id)
+                for object_id in object_ids)
+            return
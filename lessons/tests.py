@@ -1,3 +1,1112 @@
-from django.test import TestCase
+import io
+import struct
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import Future
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.idempotency import LOCK_KEY, scoped_key
+from accounts.models import Class, Enrollment, Institution
+from lessons.admin import QuizResponseAdmin
+from lessons.buffering import (DuplicateResponse, LocalQueue,
+                               ResponseBuffer)
+from lessons.coalescing import LOCK_KEY as FLIGHT_LOCK_KEY
+from lessons.coalescing import SingleFlight, metrics
+from lessons.delivery import ContentDeliveryService
+from lessons import media
+from lessons.ingestion import MetadataPool
+from lessons.leaderboards import (CacheLeaderboards, SortedBoard, class_board,
+                                  quiz_board)
+from lessons.models import (Content, PlaybackProgress, Quiz, QuizQuestion,
+                            QuizResponse, QuizSerializer)
+from lessons.progress import ProgressTracker
+from lessons.uploads import ContentUploadService, UploadConflict, UploadError
+from lessons.search import InvertedIndexBackend, get_search_backend
+from lessons.sync import decode_token, encode_token, visibility_scope
+from lessons.versions import PublishError, publish, remove_question
+
+
+class LessonsTestCase(TestCase):
+    """Lesson content with a published quiz of no class and one of a class
+        only the enrolled student may see."""
+
+    def setUp(self):
+        # Row ids are reused once a test rolls back.
+        cache.clear()
+        get_search_backend.cache_clear()
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.student = User.objects.create_user('student')
+        self.other = User.objects.create_user('other')
+        institution = Institution.objects.create(short_code='INST',
+                                                 name='Institution')
+        self.klass = Class.objects.create(institution=institution,
+                                          short_code='CS1',
+                                          long_name='Computing',
+                                          instructor=self.admin)
+        Enrollment.objects.create(student=self.student, class_id=self.klass)
+        self.content = Content.objects.create(title='Budgeting basics',
+                                              description='Saving money',
+                                              content_uri='videos/b.mp4',
+                                              content_type='video')
+        self.open_quiz = self.make_quiz('Budgeting quiz')
+        self.class_quiz = self.make_quiz('Compound interest quiz', self.klass)
+
+    def make_quiz(self, title: str, klass: Class = None,
+                  published: bool = True) -> Quiz:
+        """Creates a quiz with two questions, published unless told not."""
+        quiz = Quiz.objects.create(title=title,
+                                   description=f'{title} description',
+                                   class_id=klass,
+                                   content_id=self.content,
+                                   owner_id=self.admin)
+        for number in range(2):
+            QuizQuestion.objects.create(quiz=quiz,
+                                        question=f'{title} question {number}',
+                                        options=['a', 'b'],
+                                        correct_index=0,
+                                        weight=number + 1)
+        if published:
+            publish(quiz, self.admin)
+            quiz.refresh_from_db()
+        return quiz
+
+    def client_for(self, user: User) -> APIClient:
+        """Returns an API client authenticated as the user."""
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+@override_settings(SYNC={'SETTLE_SECONDS': 0, 'TOMBSTONE_DAYS': 90})
+class QuizVisibilityTests(LessonsTestCase):
+    """Class quizzes are only seen by the students of the class."""
+
+    def search(self, user: User, query: str) -> set:
+        response = self.client_for(user).get('/v1/lessons/search/',
+                                             {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return {(hit['kind'], hit['id']) for hit in response.json()['results']}
+
+    def test_search_hides_class_quizzes(self):
+        """Search leaves out class quizzes and their questions."""
+        hits = self.search(self.other, 'quiz')
+        self.assertIn(('quiz', self.open_quiz.id), hits)
+        self.assertNotIn(('quiz', self.class_quiz.id), hits)
+        self.assertEqual(self.search(self.other, 'compound'), set())
+        self.assertEqual(
+            len(self.search(self.student, 'compound')), 3,
+            "The enrolled student finds the quiz and its two questions.")
+
+    def test_search_hides_drafts(self):
+        """Unpublished quizzes are only found by staff."""
+        draft = self.make_quiz('Draft quiz', published=False)
+        self.assertNotIn(('quiz', draft.id), self.search(self.student, 'draft'))
+        self.assertIn(('quiz', draft.id), self.search(self.admin, 'draft'))
+
+    def test_sync_hides_class_quizzes(self):
+        """Delta sync leaves out class quizzes and their questions."""
+        changes = self.client_for(self.other).get(
+            '/v1/lessons/changes/').json()
+        self.assertEqual([quiz['id'] for quiz in changes['quizzes']['updated']],
+                         [self.open_quiz.id])
+        self.assertEqual(
+            {question['quiz'] for question in changes['questions']['updated']},
+            {self.open_quiz.id})
+
+        changes = self.client_for(self.student).get(
+            '/v1/lessons/changes/').json()
+        self.assertEqual(
+            {quiz['id'] for quiz in changes['quizzes']['updated']},
+            {self.open_quiz.id, self.class_quiz.id})
+
+    def test_content_lists_visible_quizzes(self):
+        """The quiz ids of a content only list the visible quizzes."""
+        content = self.client_for(self.other).get('/v1/lessons/').json()
+        self.assertEqual(content[0]['quiz_id_list'], [self.open_quiz.id])
+
+
+class SparseFieldsetTests(LessonsTestCase):
+    """Tests for the fields, exclude and view query parameters."""
+
+    def get(self, path: str, params: dict = None):
+        return self.client_for(self.student).get(path, params)
+
+    def test_fields_and_exclude(self):
+        """Only the listed fields are returned, excluded ones never are."""
+        content = self.get('/v1/lessons/', {'fields': 'id,title'}).json()
+        self.assertEqual(list(content[0]), ['id', 'title'])
+        content = self.get('/v1/lessons/', {
+            'exclude': 'quiz_id_list,download_url'
+        }).json()[0]
+        self.assertNotIn('quiz_id_list', content)
+        self.assertNotIn('download_url', content)
+        self.assertIn('description', content)
+
+    def test_summary_view_skips_method_fields(self):
+        """The summary view returns its fields without running the queries
+            of the pruned method fields."""
+        self.get('/v1/lessons/quizzes/')
+        with self.assertNumQueries(1):
+            quizzes = self.get('/v1/lessons/quizzes/', {
+                'view': 'summary'
+            }).json()
+        self.assertEqual({tuple(quiz) for quiz in quizzes},
+                         {('id', 'title', 'class_id', 'content_id')})
+
+    def test_unknown_fields_and_views(self):
+        """Unknown fields and views are rejected."""
+        response = self.get('/v1/lessons/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown fields: secret.", response.json())
+        response = self.get('/v1/lessons/quizzes/', {'view': 'full'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_nested_serializers_ignore_the_query(self):
+        """Query parameters only apply to the root serializer."""
+
+        class QuizHolder(serializers.Serializer):  # pylint: disable=abstract-method
+            quiz = QuizSerializer(view='summary')
+
+        request = Request(APIRequestFactory().get('/', {'fields': 'quiz'}))
+        data = QuizHolder({
+            'quiz': self.open_quiz
+        }, context={
+            'request': request
+        }).data
+        self.assertEqual(list(data['quiz']),
+                         ['id', 'title', 'class_id', 'content_id'])
+
+
+@override_settings(SYNC={'SETTLE_SECONDS': 0, 'TOMBSTONE_DAYS': 90})
+class SyncTests(LessonsTestCase):
+    """Tests for the delta sync."""
+
+    def sync(self, token: str = None) -> dict:
+        response = self.client_for(self.student).get(
+            '/v1/lessons/changes/', {'since': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_publishing_syncs_the_new_version(self):
+        """Draft edits reach synced clients once the quiz is published, with
+            every question of the new version."""
+        token = self.sync()['token']
+        question = self.open_quiz.questions.first()
+        question.question = 'Edited question'
+        question.save()
+        added = QuizQuestion.objects.create(quiz=self.open_quiz,
+                                            question='Added question',
+                                            options=['a', 'b'],
+                                            correct_index=1)
+        changes = self.sync(token)
+        self.assertEqual(changes['questions'], {'updated': [], 'deleted': []})
+
+        publish(self.open_quiz, self.admin)
+        changes = self.sync(changes['token'])
+        self.assertEqual([quiz['id'] for quiz in changes['quizzes']['updated']],
+                         [self.open_quiz.id])
+        self.assertEqual(
+            [(row['id'], row['question'])
+             for row in changes['questions']['updated']],
+            [(question.id, 'Edited question'),
+             (question.id + 1, 'Budgeting quiz question 1'),
+             (added.id, 'Added question')])
+        self.assertNotIn('correct_index', changes['questions']['updated'][0])
+
+    def test_archived_questions_get_tombstones(self):
+        """Archived questions are removed from synced clients once a version
+            without them is published."""
+        question = self.open_quiz.questions.first()
+        token = self.sync()['token']
+        remove_question(question)
+        changes = self.sync(token)
+        self.assertEqual(changes['questions'], {'updated': [], 'deleted': []})
+
+        publish(self.open_quiz, self.admin)
+        changes = self.sync(changes['token'])
+        self.assertFalse(changes['reset'])
+        self.assertEqual(changes['questions']['deleted'], [question.id])
+        self.assertEqual(
+            [row['id'] for row in changes['questions']['updated']],
+            [question.id + 1])
+        self.assertNotIn(
+            question.id,
+            [row['id'] for row in self.sync()['questions']['updated']])
+
+    def test_tokens_list_what_changed_since(self):
+        """A token lists the rows written or deleted after it, once."""
+        changes = self.sync()
+        self.assertTrue(changes['reset'])
+        self.assertEqual([content['id'] for content in changes['content']
+                          ['updated']], [self.content.id])
+        token = changes['token']
+        self.assertEqual(self.sync(token)['content'], {
+            'updated': [],
+            'deleted': []
+        })
+
+        self.content.title = 'Budgeting in depth'
+        self.content.save()
+        deleted = Content.objects.create(title='Old lesson',
+                                         description='Gone soon',
+                                         content_uri='videos/o.mp4',
+                                         content_type='video')
+        deleted_id = deleted.id
+        deleted.delete()
+        changes = self.sync(token)
+        self.assertFalse(changes['reset'])
+        self.assertEqual([content['title'] for content in changes['content']
+                          ['updated']], ['Budgeting in depth'])
+        self.assertEqual(changes['content']['deleted'], [deleted_id])
+        self.assertEqual(self.sync(changes['token'])['content']['updated'], [])
+
+    def test_stale_and_invalid_tokens(self):
+        """Tokens older than the tombstones get a full snapshot, tokens that
+            are not tokens are refused."""
+        stale = encode_token(timezone.now() - timedelta(days=91),
+                             visibility_scope(self.student))
+        changes = self.sync(stale)
+        self.assertTrue(changes['reset'])
+        self.assertEqual(len(changes['quizzes']['updated']), 2)
+
+        response = self.client_for(self.student).get('/v1/lessons/changes/',
+                                                      {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SYNC={'SETTLE_SECONDS': 60, 'TOMBSTONE_DAYS': 90})
+    def test_recent_rows_wait_for_the_next_sync(self):
+        """Rows written within the settle time are left for a later token."""
+        changes = self.sync()
+        self.assertEqual(changes['content']['updated'], [])
+        self.assertLess(decode_token(changes['token'])[0], timezone.now())
+
+    def test_class_changes_reset(self):
+        """Joining or leaving a class gets a full snapshot with the quizzes
+            the user now sees."""
+        token = self.sync()['token']
+        self.assertFalse(self.sync(token)['reset'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(student=self.student).delete()
+        changes = self.sync(token)
+        self.assertTrue(changes['reset'])
+        self.assertEqual(
+            [quiz['id'] for quiz in changes['quizzes']['updated']],
+            [self.open_quiz.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student,
+                                      class_id=self.klass)
+        changes = self.sync(changes['token'])
+        self.assertTrue(changes['reset'])
+        self.assertIn(self.class_quiz.id,
+                      [quiz['id'] for quiz in changes['quizzes']['updated']])
+
+        legacy = str(int(timezone.now().timestamp() * 1_000_000))
+        self.assertTrue(self.sync(legacy)['reset'])
+
+
+class ResponseBufferTests(LessonsTestCase):
+    """Tests for the write-behind buffer of quiz responses."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.buffer = ResponseBuffer(
+            LocalQueue(Path(directory.name) / 'queue.sqlite3'),
+            batch_size=10,
+            interval=0)
+        # Flushed by the tests, not by a background thread.
+        self.buffer.start = lambda: None
+
+    def response(self, question: QuizQuestion) -> QuizResponse:
+        return QuizResponse(quiz=self.open_quiz,
+                            question=question,
+                            version=self.open_quiz.published_version,
+                            student=self.student,
+                            score=1)
+
+    def test_flushes_and_rejects_duplicates(self):
+        """Queued responses are written once, duplicates are refused."""
+        question = self.open_quiz.questions.first()
+        self.buffer.submit(self.response(question))
+        with self.assertRaises(DuplicateResponse):
+            self.buffer.submit(self.response(question))
+        self.assertEqual(self.buffer.metrics()['depth'], 1)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertTrue(
+            QuizResponse.objects.filter(question=question,
+                                        student=self.student).exists())
+        self.assertEqual(self.buffer.metrics()['flushed'], 1)
+
+    def test_failed_flushes_keep_entries_and_are_reported(self):
+        """A failing flush is logged, counted and leaves entries queued."""
+
+        class Stop(Exception):
+            pass
+
+        self.buffer.submit(self.response(self.open_quiz.questions.first()))
+        with mock.patch.object(self.buffer,
+                               'write',
+                               side_effect=RuntimeError("database down")), \
+                mock.patch('lessons.buffering.time.sleep',
+                           side_effect=Stop), \
+                mock.patch('lessons.buffering.close_old_connections'), \
+                self.assertLogs('lessons.buffering', 'ERROR'), \
+                self.assertRaises(Stop):
+            self.buffer.run()
+        metrics = self.buffer.metrics()
+        self.assertEqual(metrics['depth'], 1)
+        self.assertEqual(metrics['failed'], 1)
+        self.assertIsNotNone(metrics['last_failure_at'])
+
+
+class BackgroundFailureTests(LessonsTestCase):
+    """Failures of background work are logged, never swallowed."""
+
+    def test_failed_extraction_is_logged(self):
+        """A failed metadata extraction is logged with its content."""
+        pool = MetadataPool(workers=1, max_pending=1)
+        self.addCleanup(pool.executor.shutdown)
+        pool.slots.acquire()
+        future = Future()
+        future.set_exception(OSError("unreadable file"))
+        with self.assertLogs('lessons.ingestion', 'ERROR') as logs:
+            pool._store(future, self.content.id, self.content.content_uri)  # pylint: disable=protected-access
+        self.assertEqual(logs.records[0].content_id, self.content.id)
+
+    def test_failed_progress_flush_is_logged(self):
+        """A failed progress flush is logged and retried."""
+
+        class Stop(Exception):
+            pass
+
+        tracker = ProgressTracker(interval=0)
+        with mock.patch.object(tracker,
+                               'flush',
+                               side_effect=RuntimeError("database down")), \
+                mock.patch('lessons.progress.time.sleep',
+                           side_effect=[None, Stop]), \
+                mock.patch('lessons.progress.close_old_connections'), \
+                self.assertLogs('lessons.progress', 'ERROR'), \
+                self.assertRaises(Stop):
+            tracker.run()
+
+
+@override_settings(CONTENT_STORAGE={
+    **settings.CONTENT_STORAGE, 'BUCKET': 'lessons'
+})
+class ContentUploadTests(LessonsTestCase):
+    """Tests for multipart content uploads against stubbed storage."""
+
+    def setUp(self):
+        super().setUp()
+        # Only imported by the tests that talk to storage.
+        import boto3  # pylint: disable=import-outside-toplevel
+        from botocore.stub import Stubber  # pylint: disable=import-outside-toplevel
+        self.s3 = boto3.client('s3',
+                               region_name='us-east-1',
+                               aws_access_key_id='test',
+                               aws_secret_access_key='test')
+        self.storage = Stubber(self.s3)
+        self.storage.activate()
+        self.addCleanup(self.storage.deactivate)
+        patcher = mock.patch('lessons.uploads.storage_client',
+                             return_value=self.s3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start(self):
+        self.storage.add_response('create_multipart_upload',
+                                  {'UploadId': 'upload-1'})
+        return ContentUploadService().start(self.admin, 'Budgeting',
+                                            'Saving money', 'video', 'b.mp4',
+                                            1024)
+
+    def test_start(self):
+        """Starting opens a multipart upload, refusals are UploadErrors."""
+        upload = self.start()
+        self.assertEqual(upload.storage_upload_id, 'upload-1')
+        self.assertEqual(upload.missing_parts(), [1])
+
+        self.storage.add_client_error('create_multipart_upload',
+                                      service_error_code='AccessDenied',
+                                      http_status_code=403)
+        response = self.client_for(self.admin).post(
+            '/v1/lessons/uploads/', {
+                'title': 'Budgeting',
+                'description': 'Saving money',
+                'content_type': 'video',
+                'filename': 'b.mp4',
+                'size': 1024
+            },
+            format='json')
+        self.assertEqual(response.status_code, 400)
+        self.storage.assert_no_pending_responses()
+
+    def test_complete_syncs_unreported_parts(self):
+        """Parts never reported are read back from storage on completion."""
+        upload = self.start()
+        self.storage.add_response(
+            'list_parts',
+            {'Parts': [{
+                'PartNumber': 1,
+                'ETag': '"part-1"',
+                'Size': 1024
+            }]})
+        self.storage.add_response('complete_multipart_upload',
+                                  {'ETag': '"object-1"'})
+        self.storage.add_response('head_object', {'ContentLength': 1024})
+        content = ContentUploadService().complete(upload)
+        self.assertEqual(content.content_uri, f's3://lessons/{upload.key}')
+        self.assertEqual((content.size, content.etag), (1024, 'object-1'))
+        self.assertEqual(list(upload.parts.values_list('etag', flat=True)),
+                         ['"part-1"'])
+        self.storage.assert_no_pending_responses()
+
+    def test_complete_of_an_upload_gone_from_storage(self):
+        """An upload storage no longer has is a conflict."""
+        upload = self.start()
+        upload.parts.create(part_number=1, etag='"part-1"', size=1024)
+        self.storage.add_client_error('complete_multipart_upload',
+                                      service_error_code='NoSuchUpload',
+                                      http_status_code=404)
+        response = self.client_for(self.admin).post(
+            f'/v1/lessons/uploads/{upload.id}/complete/')
+        self.assertEqual(response.status_code, 409)
+        self.storage.assert_no_pending_responses()
+
+    def test_abort(self):
+        """Aborting frees the parts once; later steps conflict."""
+        upload = self.start()
+        self.storage.add_response('abort_multipart_upload', {})
+        client = self.client_for(self.admin)
+        self.assertEqual(
+            client.delete(f'/v1/lessons/uploads/{upload.id}/').status_code,
+            204)
+        self.assertEqual(
+            client.delete(f'/v1/lessons/uploads/{upload.id}/').status_code,
+            409)
+        upload.refresh_from_db()
+        with self.assertRaises(UploadConflict):
+            ContentUploadService().part_urls(upload, [1])
+        self.storage.assert_no_pending_responses()
+
+    def test_abort_storage_errors(self):
+        """Storage refusing the abort leaves the upload pending."""
+        upload = self.start()
+        self.storage.add_client_error('abort_multipart_upload',
+                                      service_error_code='AccessDenied',
+                                      http_status_code=403)
+        with self.assertRaises(UploadError):
+            ContentUploadService().abort(upload)
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, 'pending')
+
+
+@override_settings(CONTENT_STORAGE={
+    **settings.CONTENT_STORAGE, 'BUCKET': 'lessons',
+    'ENDPOINT_URL': 'http://storage.local:9000'
+})
+class ContentDeliveryTests(TestCase):
+    """Tests for locating content in object storage."""
+
+    def test_parse_uri(self):
+        """Storage URIs and bare keys are located, other URIs are not."""
+        service = ContentDeliveryService()
+        cases = {
+            's3://media/videos/b.mp4': ('media', 'videos/b.mp4'),
+            'videos/b.mp4': ('lessons', 'videos/b.mp4'),
+            '/videos/b.mp4': ('lessons', 'videos/b.mp4'),
+            'https://media.s3.us-east-1.amazonaws.com/videos/b.mp4':
+            ('media', 'videos/b.mp4'),
+            'https://s3.us-east-1.amazonaws.com/media/videos/b.mp4':
+            ('media', 'videos/b.mp4'),
+            'http://storage.local:9000/media/videos/b.mp4':
+            ('media', 'videos/b.mp4'),
+            'https://cdn.example.com/videos/b.mp4': None,
+            'gs://media/videos/b.mp4': None,
+            'ftp://files.example.com/videos/b.mp4': None,
+            '': None,
+        }
+        for uri, location in cases.items():
+            with self.subTest(uri=uri):
+                self.assertEqual(service.parse_uri(uri), location)
+
+    def test_unknown_schemes_are_served_as_is(self):
+        """Content outside object storage keeps its own URI."""
+        content = Content(id=1,
+                          content_uri='gs://media/videos/b.mp4',
+                          content_type='video')
+        self.assertEqual(ContentDeliveryService().presigned_url(content),
+                         content.content_uri)
+
+
+class LeaderboardTests(LessonsTestCase):
+    """Tests for the quiz and class leaderboards kept in the cache."""
+
+    def answer(self, student: User, quiz: Quiz, score: int):
+        """Answers every question of a quiz, committing each response."""
+        for question in quiz.questions:
+            with self.captureOnCommitCallbacks(execute=True):
+                QuizResponse.objects.create(quiz=quiz,
+                                            question=question,
+                                            version=quiz.published_version,
+                                            student=student,
+                                            score=score)
+
+    def test_sorted_board(self):
+        """Students move to their rank as they gain points."""
+        board = SortedBoard({1: 5, 2: 3})
+        board.add(2, 4)
+        board.add(3, 1)
+        self.assertEqual(board.top(2), (3, [(2, 7), (1, 5)]))
+        self.assertEqual(board.standing(3), (2, 1, 3))
+        self.assertEqual(board.standing(4), (None, None, 3))
+
+    def test_boards_follow_responses(self):
+        """Boards built on first read are kept current by new responses."""
+        self.answer(self.student, self.class_quiz, 1)
+        client = self.client_for(self.student)
+        top = client.get(
+            f'/v1/lessons/quizzes/{self.class_quiz.id}/leaderboard/').json()
+        self.assertEqual(top['results'][0]['points'], 2)
+
+        self.answer(self.other, self.open_quiz, 3)
+        self.answer(self.student, self.open_quiz, 1)
+        top = client.get(
+            f'/v1/lessons/quizzes/{self.open_quiz.id}/leaderboard/').json()
+        self.assertEqual([(entry['username'], entry['points'])
+                          for entry in top['results']], [('other', 6),
+                                                          ('student', 2)])
+        me = client.get(
+            f'/v1/lessons/quizzes/{self.open_quiz.id}/leaderboard/me/').json()
+        self.assertEqual(me, {'rank': 2, 'points': 2, 'size': 2})
+
+        self.answer(self.other, self.make_quiz('Second quiz', self.klass), 1)
+        board = CacheLeaderboards()
+        self.assertEqual(
+            board.top(class_board(self.klass.id), 10)[1],
+            [(self.student.id, 2), (self.other.id, 2)])
+
+    def test_busy_boards_are_rebuilt(self):
+        """An add that cannot take the board's lock marks it stale, and the
+            next read rebuilds it from the database."""
+        board = CacheLeaderboards()
+        name = quiz_board(self.open_quiz.id)
+        self.assertEqual(board.top(name, 10), (0, []))
+        self.answer(self.student, self.open_quiz, 1)
+        self.assertEqual(board.top(name, 10), (1, [(self.student.id, 2)]))
+
+        cache.add(board._key(name) + '_lock', 1)  # pylint: disable=protected-access
+        with mock.patch('lessons.leaderboards.LOCK_WAIT', 0):
+            self.answer(self.other, self.open_quiz, 2)
+        cache.delete(board._key(name) + '_lock')  # pylint: disable=protected-access
+        self.assertEqual(board.rank(name, self.other.id), (0, 4, 2))
+
+    def test_admin_deletions_update_boards(self):
+        """Responses deleted from the admin take their points off the boards,
+            in the same few queries however many are deleted."""
+        self.answer(self.student, self.class_quiz, 1)
+        self.answer(self.other, self.class_quiz, 2)
+        self.answer(self.other, self.open_quiz, 3)
+        board = CacheLeaderboards()
+        name = class_board(self.klass.id)
+        self.assertEqual(board.top(name, 10)[0], 2)
+        self.assertEqual(board.top(quiz_board(self.open_quiz.id), 10)[0], 1)
+
+        model_admin = QuizResponseAdmin(QuizResponse, admin.site)
+        with mock.patch.object(model_admin, 'message_user') as message, \
+                self.captureOnCommitCallbacks(execute=True), \
+                self.assertNumQueries(8):
+            model_admin.delete_responses(
+                None,
+                QuizResponse.objects.filter(
+                    student=self.other).select_related('quiz', 'student'))
+        message.assert_called_once_with(None, "Deleted 4 responses.")
+        self.assertFalse(QuizResponse.objects.filter(student=self.other))
+        self.assertEqual(board.top(name, 10)[1][0], (self.student.id, 2))
+        self.assertEqual(board.rank(name, self.other.id)[1], 0)
+        self.assertEqual(
+            board.rank(quiz_board(self.open_quiz.id), self.other.id)[1], 0)
+
+
+class MediaMetadataTests(LessonsTestCase):
+    """Tests for the media metadata extraction."""
+
+    def test_extractors(self):
+        """Each format reads its metadata from the file header or body."""
+        audio = io.BytesIO()
+        with wave.open(audio, 'wb') as writer:
+            writer.setnchannels(1)
+            writer.setsampwidth(2)
+            writer.setframerate(8000)
+            writer.writeframes(b'\0\0' * 12000)
+        audio.seek(0)
+        self.assertEqual(media.wav_duration(audio), 1.5)
+
+        png = io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'\0\0\0\rIHDR' +
+                         struct.pack('>II', 640, 480))
+        self.assertEqual(media.image_dimensions(png), {
+            'width': 640,
+            'height': 480
+        })
+
+        pdf = io.BytesIO(b'<< /Type /Pages >> ' +
+                         b'<< /Type /Page >> ' * 3)
+        # Small chunks split the markers and the words.
+        with mock.patch('lessons.media.CHUNK_SIZE', 40):
+            self.assertEqual(media.pdf_page_count(pdf), {'page_count': 3})
+            self.assertEqual(
+                media.text_word_count(
+                    io.BytesIO(b'saving money ' * 10 + b'budget')),
+                {'word_count': 21})
+
+    def test_reads_storage_objects_by_range(self):
+        """Only the ranges a format needs are fetched from storage, and
+            URIs outside storage are skipped."""
+        # Only imported by the tests that talk to storage.
+        import boto3  # pylint: disable=import-outside-toplevel
+        from botocore.response import StreamingBody  # pylint: disable=import-outside-toplevel
+        from botocore.stub import Stubber  # pylint: disable=import-outside-toplevel
+        s3 = boto3.client('s3',
+                          region_name='us-east-1',
+                          aws_access_key_id='test',
+                          aws_secret_access_key='test')
+        storage = Stubber(s3)
+        location = {'Bucket': 'media', 'Key': 'images/a.png'}
+        head = (b'\x89PNG\r\n\x1a\n' + b'\0\0\0\rIHDR' +
+                struct.pack('>II', 640, 480)).ljust(media.CHUNK_SIZE, b'\0')
+        storage.add_response('head_object',
+                             {'ContentLength': 3 * media.CHUNK_SIZE},
+                             location)
+        storage.add_response(
+            'get_object',
+            {'Body': StreamingBody(io.BytesIO(head), len(head))}, {
+                **location, 'Range': f'bytes=0-{media.CHUNK_SIZE - 1}'
+            })
+        config = {**settings.CONTENT_STORAGE, 'BUCKET': 'lessons'}
+        with storage, mock.patch('boto3.client', return_value=s3):
+            metadata = media.extract_metadata('s3://media/images/a.png',
+                                              'image', config)
+            storage.assert_no_pending_responses()
+        self.assertEqual(metadata, {
+            'size': 3 * media.CHUNK_SIZE,
+            'width': 640,
+            'height': 480
+        })
+
+        with mock.patch('boto3.client') as client:
+            for uri in ('https://cdn.example.com/a.png', 'gs://media/a.png'):
+                self.assertEqual(media.extract_metadata(uri, 'image', config),
+                                 {})
+        client.assert_not_called()
+
+    def test_stores_metadata_unless_the_file_changed(self):
+        """Metadata of a file replaced meanwhile is dropped, and content
+            submitted while the queue is full is left for the command."""
+        pool = MetadataPool(workers=1, max_pending=1)
+        self.addCleanup(pool.executor.shutdown)
+        future = Future()
+        future.set_result({'size': 2048, 'duration': 1.5})
+        for uri in ('videos/old.mp4', self.content.content_uri):
+            pool.slots.acquire()
+            with mock.patch('lessons.ingestion.close_old_connections'):
+                pool._store(future, self.content.id, uri)  # pylint: disable=protected-access
+            self.content.refresh_from_db()
+            self.assertEqual(self.content.size,
+                             2048 if uri == self.content.content_uri else None)
+        self.assertIsNotNone(self.content.metadata_extracted_at)
+
+        pool.slots.acquire()
+        self.assertIsNone(pool.submit(self.content))
+
+
+@override_settings(MEDIA_METADATA={
+    **settings.MEDIA_METADATA, 'ENABLED': False
+})
+class SearchTests(LessonsTestCase):
+    """Tests for the in-process search index used outside MySQL."""
+
+    def search(self, query: str, kinds=('content', 'quiz', 'question'),
+               **kwargs) -> list:
+        return [(hit.kind, hit.id) for hit in InvertedIndexBackend().search(
+            query, kinds, 0, 20, **kwargs)[1]]
+
+    def test_prefixes_and_ranking(self):
+        """Every term must match, as a word or its prefix; title matches
+            rank first."""
+        questions = self.open_quiz.questions
+        hits = self.search('budget')
+        self.assertEqual(set(hits[:2]), {('content', self.content.id),
+                                         ('quiz', self.open_quiz.id)})
+        self.assertEqual(hits[2:], [('question', questions[0].id),
+                                    ('question', questions[1].id)])
+        self.assertEqual(self.search('budg quiz ques'),
+                         [('question', questions[0].id),
+                          ('question', questions[1].id)])
+        self.assertEqual(self.search('budgeting interest'), [])
+        self.assertEqual(self.search('budget', ['content']),
+                         [('content', self.content.id)])
+        self.assertEqual(self.search('quiz', ['quiz'], quiz_ids=set()), [])
+
+    def test_index_follows_changes(self):
+        """Saved and deleted rows are indexed once committed."""
+        backend = get_search_backend()
+        self.assertEqual(backend.search('mortgage', ['content'], 0, 20),
+                         (0, []))
+        with self.captureOnCommitCallbacks(execute=True):
+            content = Content.objects.create(title='Mortgages',
+                                             description='Home loans',
+                                             content_uri='videos/m.mp4',
+                                             content_type='video')
+        self.assertEqual(backend.search('mortgage', ['content'], 0, 20)[0], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            content.title = 'Renting'
+            content.save()
+        self.assertEqual(backend.search('mortgage', ['content'], 0, 20)[0], 0)
+        self.assertEqual(backend.search('rent', ['content'], 0, 20)[0], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            content.delete()
+        self.assertEqual(backend.search('rent', ['content'], 0, 20)[0], 0)
+
+    def test_archived_questions_are_dropped(self):
+        """Archiving a question removes it from the index."""
+        backend = get_search_backend()
+        question = self.open_quiz.questions[0]
+        self.assertEqual(backend.search('budgeting', ['question'], 0, 20)[0],
+                         2)
+        with self.captureOnCommitCallbacks(execute=True):
+            remove_question(question)
+        self.assertEqual(
+            [hit.id for hit in backend.search('budgeting', ['question'], 0,
+                                              20)[1]],
+            [self.open_quiz.questions[0].id])
+        self.assertNotIn(('question', question.id), self.search('budgeting'))
+
+    def test_drafts_wait_for_publishing(self):
+        """Students only find quiz and question text once it is published,
+            staff find the draft."""
+        quiz_ids = {self.open_quiz.id}
+        self.open_quiz.title = 'Mortgage quiz'
+        self.open_quiz.save()
+        added = QuizQuestion.objects.create(quiz=self.open_quiz,
+                                            question='Mortgage rates',
+                                            options=['a', 'b'],
+                                            correct_index=0)
+        self.assertEqual(self.search('mortgage', quiz_ids=quiz_ids), [])
+        self.assertEqual(self.search('mortgage'),
+                         [('quiz', self.open_quiz.id), ('question', added.id)])
+
+        publish(self.open_quiz, self.admin)
+        self.assertEqual(self.search('mortgage', quiz_ids=quiz_ids),
+                         [('quiz', self.open_quiz.id), ('question', added.id)])
+
+        response = self.client_for(self.admin).get('/v1/lessons/search/', {
+            'q': 'budget',
+            'page_size': 1
+        }).json()
+        self.assertEqual((response['count'], len(response['results'])),
+                         (4, 1))
+
+
+class IdempotencyTests(LessonsTestCase):
+    """Tests for Idempotency-Key on quiz submissions."""
+
+    def setUp(self):
+        super().setUp()
+        self.question = self.open_quiz.questions.first()
+        self.path = (f'/v1/lessons/quizzes/{self.open_quiz.id}/'
+                     f'{self.question.id}/')
+        self.client = self.client_for(self.student)
+
+    def submit(self, body: dict, key: str = 'attempt-1'):
+        return self.client.post(self.path,
+                                body,
+                                format='json',
+                                headers={'Idempotency-Key': key})
+
+    def test_retries_replay_the_first_response(self):
+        """A retry gets the stored response, from the database once the
+            cache lost it, and saves nothing."""
+        first = self.submit({'response': 0})
+        self.assertEqual(first.status_code, 201)
+        for clear in (False, True):
+            if clear:
+                cache.clear()
+            retry = self.submit({'response': 0})
+            self.assertEqual((retry.status_code, retry.json()),
+                             (201, first.json()))
+            self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(
+            QuizResponse.objects.filter(student=self.student).count(), 1)
+
+    def test_key_conflicts(self):
+        """A key reused for another body, or still running, is refused."""
+        self.submit({'response': 0})
+        self.assertEqual(self.submit({'response': 1}).status_code, 422)
+
+        request = mock.Mock(user=self.student, method='POST', path=self.path)
+        cache.add(LOCK_KEY.format(scoped_key(request, 'attempt-2')), 1)
+        self.assertEqual(
+            self.submit({'response': 0}, 'attempt-2').status_code, 409)
+
+    def test_failures_are_not_stored(self):
+        """A failed request can be retried with the same key."""
+        self.assertEqual(self.submit({}).status_code, 400)
+        retry = self.submit({'response': 0})
+        self.assertEqual(retry.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', retry)
+
+
+class PlaybackProgressTests(LessonsTestCase):
+    """Tests for the coalesced playback progress."""
+
+    def setUp(self):
+        super().setUp()
+        self.tracker = ProgressTracker(interval=0)
+        # Flushed by the tests, not by a background thread.
+        patcher = mock.patch.object(ProgressTracker, 'run')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_heartbeats_are_coalesced(self):
+        """Only the latest position of a pair is written, once."""
+        for position in (1.0, 6.0, 11.5):
+            self.tracker.heartbeat(self.student.id, self.content.id, position)
+        self.tracker.heartbeat(self.other.id, self.content.id, 3.0)
+        self.assertEqual(self.tracker.flush(), 2)
+        self.assertEqual(self.tracker.flush(), 0)
+        self.assertEqual(
+            PlaybackProgress.objects.get(student=self.student).position, 11.5)
+
+        cache.clear()
+        self.assertEqual(
+            self.tracker.get(self.student.id, self.content.id)['position'],
+            11.5)
+        self.assertIsNone(self.tracker.get(self.admin.id, self.content.id))
+
+    def test_endpoint(self):
+        """Positions are readable at once, for video and audio only."""
+        client = self.client_for(self.student)
+        path = f'/v1/lessons/{self.content.id}/progress/'
+        with mock.patch('lessons.views.get_progress_tracker',
+                        return_value=self.tracker):
+            self.assertEqual(client.get(path).status_code, 404)
+            self.assertEqual(
+                client.put(path, {'position': 42.0}, format='json').json()
+                ['position'], 42.0)
+            self.assertEqual(client.get(path).json()['position'], 42.0)
+            self.assertEqual(
+                client.put(path, {'position': -1}, format='json').status_code,
+                400)
+
+            text = Content.objects.create(title='Reading',
+                                          description='Notes',
+                                          content_uri='texts/r.txt',
+                                          content_type='text')
+            self.assertEqual(
+                client.put(f'/v1/lessons/{text.id}/progress/',
+                           {'position': 1.0},
+                           format='json').status_code, 400)
+        self.assertEqual(self.tracker.flush(), 1)
+
+
+class QuizImportTests(LessonsTestCase):
+    """Tests for exporting and importing whole quizzes."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.admin)
+        self.path = f'/v1/lessons/{self.content.id}/quizzes/'
+
+    def test_round_trip_creates_drafts(self):
+        """An exported document imports as new, unpublished quizzes and
+            leaves its source alone."""
+        document = self.client.get(self.path + 'export/').json()
+        self.assertEqual(len(document['quizzes']), 2)
+        response = self.client.post(self.path + 'import/',
+                                    {**document, 'class_id': None},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        copies = Quiz.objects.filter(
+            id__in=[quiz['id'] for quiz in response.json()['quizzes']])
+        self.assertEqual(len(copies), 2)
+        for copy in copies:
+            self.assertIsNone(copy.published_version_id)
+            self.assertIsNone(copy.class_id_id)
+            self.assertEqual(
+                list(copy.questions.values_list('question', 'weight')), [
+                    (f'{copy.title} question 0', 1),
+                    (f'{copy.title} question 1', 2),
+                ])
+        self.assertEqual(Quiz.objects.filter(published_version=None).count(),
+                         2)
+
+    def test_invalid_documents_create_nothing(self):
+        """Documents with a bad question, an unknown class or over the
+            limits are refused as a whole."""
+        quiz = {
+            'title': 'Imported',
+            'description': '',
+            'questions': [{
+                'question': 'Pick one',
+                'options': ['a', 'b'],
+                'correct_index': 1
+            }]
+        }
+        bad_question = {
+            **quiz, 'questions': [{
+                **quiz['questions'][0], 'correct_index': 2
+            }]
+        }
+        for document in ({'quizzes': [quiz, bad_question]},
+                         {'quizzes': [{**quiz, 'class_id': 999}]},
+                         {'quizzes': [quiz] * 3}):
+            with override_settings(QUIZ_IMPORT={
+                    'MAX_QUIZZES': 2,
+                    'MAX_QUESTIONS': 10
+            }):
+                response = self.client.post(self.path + 'import/',
+                                            document,
+                                            format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Quiz.objects.filter(title='Imported').exists())
+        response = self.client_for(self.student).post(self.path + 'import/',
+                                                      {'quizzes': [quiz]},
+                                                      format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class QuizVersionTests(LessonsTestCase):
+    """Tests for the immutable published quiz versions."""
+
+    def questions(self) -> list:
+        response = self.client_for(self.student).get(
+            f'/v1/lessons/quizzes/{self.open_quiz.id}/')
+        return [question['question'] for question in response.json()]
+
+    def test_students_see_the_published_version(self):
+        """Draft edits reach students once published, as a new version;
+            the old version is still served as it was."""
+        first = self.open_quiz.published_version
+        question = self.open_quiz.questions.first()
+        question.question = 'Edited question'
+        question.save()
+        self.assertEqual(self.questions(), [
+            'Budgeting quiz question 0', 'Budgeting quiz question 1'
+        ])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.admin).post(
+                f'/v1/lessons/manage/quizzes/{self.open_quiz.id}/versions/')
+        self.assertEqual((response.status_code, response.json()['number']),
+                         (201, 2))
+        self.assertEqual(self.questions(),
+                         ['Edited question', 'Budgeting quiz question 1'])
+
+        response = self.client_for(self.student).get(
+            f'/v1/lessons/quizzes/{self.open_quiz.id}/versions/{first.id}/')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.json()['questions'][0]['question'],
+                         'Budgeting quiz question 0')
+        self.assertNotIn('correct_index', response.json()['questions'][0])
+
+    def test_versions_never_change(self):
+        version = self.open_quiz.published_version
+        version.title = 'Changed'
+        with self.assertRaisesMessage(ValueError,
+                                      "Quiz versions are immutable."):
+            version.save()
+        empty = Quiz.objects.create(title='Empty',
+                                    description='No questions',
+                                    content_id=self.content,
+                                    owner_id=self.admin)
+        with self.assertRaises(PublishError):
+            publish(empty, self.admin)
+
+
+class SingleFlightTests(TestCase):
+    """Tests for the coalesced reads."""
+
+    def setUp(self):
+        cache.clear()
+        self.flight = SingleFlight(lock_ttl=5, lock_wait=1, poll_interval=0.01)
+
+    def test_concurrent_calls_compute_once(self):
+        """Callers arriving while a key is computed share its result, or
+            its error."""
+        for outcome in ('value', RuntimeError("database down")):
+            release = threading.Event()
+            calls, results = [], []
+
+            def compute(outcome=outcome, release=release, calls=calls):
+                calls.append(1)
+                release.wait(5)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+            def call(results=results):
+                try:
+                    results.append(self.flight.do('quiz_1', compute))
+                except RuntimeError as e:
+                    results.append(e)
+
+            threads = [threading.Thread(target=call) for _ in range(4)]
+            threads[0].start()
+            while 'quiz_1' not in self.flight.flights:
+                time.sleep(0.001)
+            for thread in threads[1:]:
+                thread.start()
+            while self.flight.flights['quiz_1'].waiters < 3:
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual((len(calls), results), (1, [outcome] * 4))
+        self.assertEqual(metrics()['coalesced'], 6)
+
+    def test_cached_waits_for_the_lock_holder(self):
+        """Another process filling a key is waited for, up to lock_wait;
+            None results are not cached."""
+        cache.add(FLIGHT_LOCK_KEY.format('quiz_2'), 1)
+        threading.Timer(0.05, lambda: cache.set('quiz_2', 'filled')).start()
+        self.assertEqual(
+            self.flight.cached('quiz_2', lambda: 'computed', None), 'filled')
+
+        self.flight.lock_wait = 0
+        cache.add(FLIGHT_LOCK_KEY.format('quiz_3'), 1)
+        self.assertEqual(
+            self.flight.cached('quiz_3', lambda: 'computed', None),
+            'computed')
+        self.assertEqual(
+            {key: metrics()[key]
+             for key in ('computed', 'lock_waits', 'lock_timeouts')}, {
+                 'computed': 0,
+                 'lock_waits': 1,
+                 'lock_timeouts': 1
+             })
+
+        cache.delete(FLIGHT_LOCK_KEY.format('quiz_3'))
+        self.assertIsNone(self.flight.cached('quiz_4', lambda: None, None))
+        self.assertEqual(self.flight.cached('quiz_4', lambda: 'later', None),
+                         'later')
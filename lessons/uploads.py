@@ -0,0 +1,200 @@
+"""
+    Content uploads.
+    Multipart upload sessions that send lesson media straight to object
+    storage. Parts are uploaded in parallel through presigned URLs, tracked
+    in `ContentUploadPart` so clients can resume, and finalized into a
+    `Content` row.
+"""
+
+from contextlib import contextmanager
+from typing import Dict, Iterable
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.text import get_valid_filename
+
+from capitalize.db import upsert_options
+from lessons.delivery import storage_client
+from lessons.models import (Content, ContentUpload, ContentUploadPart,
+                            UploadStatus)
+
+# Storage limits for multipart uploads.
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10_000
+
+
+class UploadError(ValueError):
+    """Raised when an upload session cannot perform the requested step."""
+
+
+class UploadConflict(UploadError):
+    """Raised when the upload is no longer pending, here or in storage."""
+
+
+@contextmanager
+def storage_errors():
+    """Raises the errors storage returns as UploadError, and a missing
+        multipart upload as UploadConflict."""
+    # Loaded with the storage client, never at startup.
+    from botocore.exceptions import ClientError  # pylint: disable=import-outside-toplevel
+    try:
+        yield
+    except ClientError as ce:
+        code = ce.response.get('Error', {}).get('Code', 'Unknown')
+        if code == 'NoSuchUpload':
+            raise UploadConflict(
+                "The upload no longer exists in storage.") from ce
+        raise UploadError(f"Storage refused the request ({code}).") from ce
+
+
+class ContentUploadService:
+    """Service for multipart uploads of lesson content to object storage"""
+
+    def __init__(self):
+        storage = settings.CONTENT_STORAGE
+        self.bucket = storage['BUCKET']
+        self.part_size = max(storage['UPLOAD_PART_SIZE'], MIN_PART_SIZE)
+        self.ttl = storage['URL_TTL']
+        self.s3 = storage_client()
+
+    def start(self, owner: User, title: str, description: str,
+              content_type: str, filename: str, size: int) -> ContentUpload:
+        """Opens a multipart upload in storage and records the session."""
+        if not self.bucket:
+            raise UploadError("Content storage is not configured.")
+        if size <= 0:
+            raise UploadError("The file size must be positive.")
+        part_size = max(self.part_size, -(-size // MAX_PARTS))
+        key = f"content/{uuid4().hex}/{get_valid_filename(filename)}"
+        with storage_errors():
+            res = self.s3.create_multipart_upload(Bucket=self.bucket, Key=key)
+        # pylint: disable=no-member
+        return ContentUpload.objects.create(
+            owner=owner,
+            title=title,
+            description=description,
+            content_type=content_type,
+            filename=filename,
+            bucket=self.bucket,
+            key=key,
+            storage_upload_id=res['UploadId'],
+            size=size,
+            part_size=part_size)
+
+    def part_urls(self, upload: ContentUpload,
+                  part_numbers: Iterable[int]) -> Dict[int, str]:
+        """Returns presigned URLs to PUT each of the given parts."""
+        self._check_pending(upload)
+        urls = {}
+        for number in part_numbers:
+            if not 1 <= number <= upload.part_count:
+                raise UploadError(f"Invalid part number {number}.")
+            with storage_errors():
+                urls[number] = self.s3.generate_presigned_url(
+                    'upload_part',
+                    Params={
+                        'Bucket': upload.bucket,
+                        'Key': upload.key,
+                        'UploadId': upload.storage_upload_id,
+                        'PartNumber': number
+                    },
+                    ExpiresIn=self.ttl)
+        return urls
+
+    def record_part(self, upload: ContentUpload, part_number: int, etag: str,
+                    size: int) -> ContentUploadPart:
+        """Records a part the client finished uploading.
+            Re-uploaded parts replace the previous record."""
+        self._check_pending(upload)
+        if not 1 <= part_number <= upload.part_count:
+            raise UploadError(f"Invalid part number {part_number}.")
+        # pylint: disable=no-member
+        part, _ = ContentUploadPart.objects.update_or_create(
+            upload=upload,
+            part_number=part_number,
+            defaults={
+                'etag': etag,
+                'size': size
+            })
+        return part
+
+    def sync_parts(self, upload: ContentUpload):
+        """Records parts that reached storage but were never reported,
+            e.g. when the client failed before recording them."""
+        paginator = self.s3.get_paginator('list_parts')
+        with storage_errors():
+            pages = paginator.paginate(Bucket=upload.bucket,
+                                       Key=upload.key,
+                                       UploadId=upload.storage_upload_id)
+            parts = [
+                ContentUploadPart(upload=upload,
+                                  part_number=part['PartNumber'],
+                                  etag=part['ETag'],
+                                  size=part['Size']) for page in pages
+                for part in page.get('Parts', [])
+            ]
+        # pylint: disable=no-member
+        ContentUploadPart.objects.bulk_create(
+            parts,
+            **upsert_options(['upload', 'part_number'], ['etag', 'size']))
+
+    def complete(self, upload: ContentUpload) -> Content:
+        """Assembles the parts in storage and creates the content."""
+        if upload.status == UploadStatus.COMPLETED.value:
+            return upload.content
+        self._check_pending(upload)
+        if upload.missing_parts():
+            self.sync_parts(upload)
+        missing = upload.missing_parts()
+        if missing:
+            raise UploadError(
+                f"Parts not uploaded yet: {', '.join(map(str, missing))}.")
+
+        # pylint: disable=no-member
+        parts = upload.parts.order_by('part_number')
+        with storage_errors():
+            res = self.s3.complete_multipart_upload(
+                Bucket=upload.bucket,
+                Key=upload.key,
+                UploadId=upload.storage_upload_id,
+                MultipartUpload={
+                    'Parts': [{
+                        'ETag': part.etag,
+                        'PartNumber': part.part_number
+                    } for part in parts]
+                })
+            head = self.s3.head_object(Bucket=upload.bucket, Key=upload.key)
+
+        with transaction.atomic():
+            content = Content.objects.create(
+                title=upload.title,
+                description=upload.description,
+                content_uri=f"s3://{upload.bucket}/{upload.key}",
+                content_type=upload.content_type,
+                size=head['ContentLength'],
+                etag=res['ETag'].strip('"'))
+            upload.content = content
+            upload.status = UploadStatus.COMPLETED.value
+            upload.save()
+        return content
+
+    def abort(self, upload: ContentUpload):
+        """Cancels the upload and frees the parts held in storage."""
+        self._check_pending(upload)
+        try:
+            with storage_errors():
+                self.s3.abort_multipart_upload(
+                    Bucket=upload.bucket,
+                    Key=upload.key,
+                    UploadId=upload.storage_upload_id)
+        except UploadConflict:
+            pass  # already gone from storage, nothing left to free
+        upload.status = UploadStatus.ABORTED.value
+        upload.save()
+
+    @staticmethod
+    def _check_pending(upload: ContentUpload):
+        if upload.status != UploadStatus.PENDING.value:
+            raise UploadConflict(f"The upload is already {upload.status}.")
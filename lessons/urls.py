@@ -5,15 +5,46 @@ import lessons.views as lessons_views
 
 urlpatterns = [
     path("", lessons_views.LessonsRoot.as_view()),
+    path("search/", lessons_views.LessonsSearch.as_view()),
+    path("changes/", lessons_views.LessonsChanges.as_view()),
     path("<int:content_id>/", lessons_views.LessonsDetail.as_view()),
+    path("<int:content_id>/progress/",
+         lessons_views.ContentProgress.as_view()),
     path("<int:content_id>/quizzes/",
          lessons_views.LessonsDetailQuizzes.as_view()),
+    path("<int:content_id>/quizzes/export/",
+         lessons_views.LessonsDetailQuizzesExport.as_view()),
+    path("<int:content_id>/quizzes/import/",
+         lessons_views.LessonsDetailQuizzesImport.as_view()),
     path("quizzes/", lessons_views.QuizzesRoot.as_view()),
     path("manage/quizzes/<int:quiz_id>/",
          lessons_views.ManageQuizzes.as_view()),
     path("manage/quizzes/<int:quiz_id>/<int:question_id>/",
-         lessons_views.ManageQuizzes.as_view()),
+         lessons_views.ManageQuizQuestions.as_view()),
+    path("manage/quizzes/<int:quiz_id>/versions/",
+         lessons_views.ManageQuizVersions.as_view()),
     path("quizzes/<int:quiz_id>/", lessons_views.StudentQuizQuestions.as_view()),
     path("quizzes/<int:quiz_id>/<int:question_id>/",
          lessons_views.StudentQuizDetail.as_view()),
+    path("quizzes/<int:quiz_id>/versions/<int:version_id>/",
+         lessons_views.StudentQuizVersion.as_view()),
+    path("quizzes/<int:quiz_id>/leaderboard/",
+         lessons_views.Leaderboard.as_view()),
+    path("quizzes/<int:quiz_id>/leaderboard/me/",
+         lessons_views.LeaderboardRank.as_view()),
+    path("classes/<int:class_id>/leaderboard/",
+         lessons_views.Leaderboard.as_view()),
+    path("classes/<int:class_id>/leaderboard/me/",
+         lessons_views.LeaderboardRank.as_view()),
+    path("responses/buffer/", lessons_views.ResponseBufferMetrics.as_view()),
+    path("reads/coalescing/", lessons_views.SingleFlightMetrics.as_view()),
+    path("uploads/", lessons_views.ContentUploadsRoot.as_view()),
+    path("uploads/<int:upload_id>/",
+         lessons_views.ContentUploadDetail.as_view()),
+    path("uploads/<int:upload_id>/parts/",
+         lessons_views.ContentUploadParts.as_view()),
+    path("uploads/<int:upload_id>/parts/<int:part_number>/",
+         lessons_views.ContentUploadPartDetail.as_view()),
+    path("uploads/<int:upload_id>/complete/",
+         lessons_views.ContentUploadComplete.as_view()),
 ]
@@ -0,0 +1,80 @@
+"""
+    Quiz versions.
+    Publishing a quiz freezes it and its questions into a new version.
+    Students answer and are scored against the published version while
+    staff edit the quiz as the next draft, so a version can be cached
+    forever: nothing ever invalidates it.
+"""
+
+from django.db import transaction
+from django.db.models import Max
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from lessons.coalescing import get_single_flight
+from lessons.models import (VERSION_QUESTION_FIELDS, Quiz, QuizQuestion,
+                            QuizResponse, QuizVersion, QuizVersionSerializer)
+from lessons.sync import record_deletions
+
+PAYLOAD_CACHE_KEY = 'quiz_version_payload_{}'
+
+
+class PublishError(ValueError):
+    """Raised when a quiz cannot be published."""
+
+
+def publish(quiz: Quiz, user: User) -> QuizVersion:
+    """Freezes the quiz and its questions into its next version."""
+    with transaction.atomic():
+        # Serializes publishing, the version numbers are taken in order.
+        # pylint: disable=no-member
+        quiz = Quiz.objects.select_for_update().get(id=quiz.id)
+        questions = list(
+            quiz.questions.order_by('id').values(*VERSION_QUESTION_FIELDS))
+        if not questions:
+            raise PublishError("A quiz without questions cannot be published.")
+        number = (quiz.versions.aggregate(number=Max('number'))['number']
+                  or 0) + 1
+        version = QuizVersion.objects.create(quiz=quiz,
+                                             number=number,
+                                             title=quiz.title,
+                                             description=quiz.description,
+                                             questions=questions,
+                                             published_by=user)
+        if quiz.published_version_id is not None:
+            # Synced clients drop the questions left out of the new version.
+            previous = QuizVersion.frozen(quiz.published_version_id)
+            record_deletions(
+                QuizQuestion,
+                set(previous.question_ids()) - set(version.question_ids()))
+        quiz.published_version = version
+        quiz.save(update_fields=['published_version', 'updated_at'])
+    return version
+
+
+def version_payload(version_id: int) -> bytes:
+    """Returns the rendered JSON of a version as students see it, rendered
+        once and then kept in the cache forever."""
+    return get_single_flight().cached(
+        PAYLOAD_CACHE_KEY.format(version_id),
+        lambda: JSONRenderer().render(
+            QuizVersionSerializer(QuizVersion.frozen(version_id)).data),
+        None)
+
+
+def remove_question(question: QuizQuestion):
+    """Deletes a question from the draft of its quiz.
+        Questions of a published version are archived instead, its
+        responses and later answers still point at them. Synced clients
+        drop them once a version without them is published."""
+    # pylint: disable=no-member
+    published = QuizVersion.objects.filter(
+        quiz_id=question.quiz_id).values_list('questions', flat=True)
+    if QuizResponse.objects.filter(question=question).exists() or any(
+            entry['id'] == question.id
+            for questions in published
+            for entry in questions):
+        question.archived = True
+        question.save(update_fields=['archived', 'updated_at'])
+    else:
+        question.delete()
@@ -3,14 +3,65 @@
     This module contains the views for the lessons app. 
 """
 
+import logging
+
+from django.conf import settings
 from django.db import IntegrityError
-from drf_spectacular.utils import extend_schema
-from rest_framework import exceptions, status
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from drf_spectacular.utils import (OpenApiParameter, extend_schema,
+                                   inline_serializer)
+from rest_framework import exceptions, serializers, status
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from lessons import models
+from accounts.enrollments import enrolled_class_ids
+from accounts.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
+from accounts.models import Class, User
+from lessons import coalescing, models
+from lessons.authoring import export_quizzes, import_quizzes
+from lessons.buffering import DuplicateResponse, get_response_buffer
+from lessons.leaderboards import class_board, get_leaderboards, quiz_board
+from lessons.progress import PLAYABLE, content_format, get_progress_tracker
+from lessons.search import DOCUMENTS, get_search_backend
+from lessons.sync import InvalidToken, changes_since
+from lessons.versions import (PublishError, publish, remove_question,
+                              version_payload)
+from lessons.uploads import (ContentUploadService, UploadConflict,
+                             UploadError)
+
+logger = logging.getLogger(__name__)
+
+# Published quiz versions never change.
+VERSION_MAX_AGE = 365 * 24 * 60 * 60
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        str,
+        description="Comma separated list of fields to include."),
+    OpenApiParameter(
+        "exclude",
+        str,
+        description="Comma separated list of fields to exclude."),
+    OpenApiParameter("view",
+                     str,
+                     enum=["summary"],
+                     description="Named slim representation to return."),
+]
+
+
+def visible_quiz_or_404(user, quiz_id: int) -> models.Quiz:
+    """Returns a quiz the user may see, see `Quiz.visible_to`, or raises
+        NotFound. The quiz row is shared by concurrent requests."""
+    quiz = models.Quiz.shared(quiz_id)
+    if quiz is None or not user.is_staff and (
+            quiz.published_version_id is None or
+            quiz.class_id_id is not None and  # pylint: disable=no-member
+            quiz.class_id_id not in enrolled_class_ids(user.id)):  # pylint: disable=no-member
+        raise exceptions.NotFound("The requested quiz does not exist.")
+    return quiz
 
 
 class LessonsRoot(APIView):
@@ -19,6 +70,7 @@ class LessonsRoot(APIView):
     serializer_class = models.ContentSerializer
 
     @extend_schema(description="List lesson content.",
+                   parameters=SPARSE_FIELDSET_PARAMETERS,
                    responses={200: models.ContentSerializer(many=True)})
     def get(self, request):
         """Returns the list of all lesson content."""
@@ -52,6 +104,7 @@ class LessonsDetail(APIView):
     serializer_class = models.ContentSerializer
 
     @extend_schema(description="Retrieve lesson content by id.",
+                   parameters=SPARSE_FIELDSET_PARAMETERS,
                    responses={200: models.ContentSerializer})
     def get(self, request, content_id: int):
         """Returns the content by id."""
@@ -97,13 +150,14 @@ class LessonsDetailQuizzes(APIView):
     serializer_class = models.QuizSerializer
 
     @extend_schema(description="List quizzes for a content.",
+                   parameters=SPARSE_FIELDSET_PARAMETERS,
                    responses={200: models.QuizSerializer(many=True)})
     def get(self, request, content_id: int):
         """Returns the list of quizzes for a content."""
-        content = models.Content.objects.filter(id=content_id).first()  # pylint: disable=no-member
+        content = models.Content.shared(content_id)
         if not content:
             raise exceptions.NotFound("The requested content does not exist.")
-        quizzes = models.Quiz.objects.filter(content_id=content_id)  # pylint: disable=no-member
+        quizzes = models.Quiz.visible_to(request.user).filter(content_id=content_id)
         return Response(
             models.QuizSerializer(quizzes,
                                   many=True,
@@ -132,16 +186,81 @@ class LessonsDetailQuizzes(APIView):
             "You do not have permission to perform this action.")
 
 
+class LessonsDetailQuizzesExport(APIView):
+    """Export the quizzes of a content."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.QuizBundleSerializer
+
+    @extend_schema(
+        description="Export the quizzes of a content with their questions "
+        "and answers as one document, to import into another content or "
+        "class. Requires staff permissions.",
+        parameters=[
+            OpenApiParameter("quiz",
+                             int,
+                             many=True,
+                             description="Quizzes to export, all by default.")
+        ],
+        responses={200: models.QuizBundleSerializer})
+    def get(self, request, content_id: int):
+        """Returns the quiz document."""
+        content = models.Content.objects.filter(id=content_id).first()  # pylint: disable=no-member
+        if not content:
+            raise exceptions.NotFound("The requested content does not exist.")
+        quizzes = models.Quiz.objects.filter(content_id=content).order_by('id')  # pylint: disable=no-member
+        if 'quiz' in request.query_params:
+            try:
+                quizzes = quizzes.filter(id__in=[
+                    int(quiz_id)
+                    for quiz_id in request.query_params.getlist('quiz')
+                ])
+            except ValueError as ve:
+                raise exceptions.ValidationError(
+                    "quiz must be an integer.") from ve
+        return Response(
+            models.QuizBundleSerializer(export_quizzes(quizzes)).data)
+
+
+class LessonsDetailQuizzesImport(APIView):
+    """Import quizzes into a content."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.QuizBundleSerializer
+
+    @extend_schema(
+        description="Create the quizzes of a document, with all their "
+        "questions, in one transaction. Documents are the output of the "
+        "export endpoint, ids are ignored. Requires staff permissions.",
+        request=models.QuizBundleSerializer,
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+        responses={201: models.QuizBundleSerializer})
+    @idempotent
+    def post(self, request, content_id: int):
+        """Creates the quizzes of the document."""
+        content = models.Content.objects.filter(id=content_id).first()  # pylint: disable=no-member
+        if not content:
+            raise exceptions.NotFound("The requested content does not exist.")
+        document = models.QuizBundleSerializer(data=request.data)
+        document.is_valid(raise_exception=True)
+        quizzes = import_quizzes(content, document.validated_data,
+                                 request.user)
+        return Response(models.QuizBundleSerializer(
+            export_quizzes(quizzes)).data,
+                        status=status.HTTP_201_CREATED)
+
+
 class QuizzesRoot(APIView):
-    """List all quizzes."""
+    """List quizzes."""
     permission_classes = [IsAuthenticated]
     serializer_class = models.QuizSerializer
 
-    @extend_schema(description="List all quizzes.",
+    @extend_schema(description="List the published quizzes of the classes the "
+                   "user is enrolled in and those of no class. Staff see all "
+                   "quizzes.",
+                   parameters=SPARSE_FIELDSET_PARAMETERS,
                    responses={200: models.QuizSerializer(many=True)})
     def get(self, request):
-        """Returns the list of all quizzes."""
-        quizzes = models.Quiz.objects.all()  # pylint: disable=no-member
+        """Returns the list of quizzes visible to the user."""
+        quizzes = models.Quiz.visible_to(request.user)
         return Response(
             models.QuizSerializer(quizzes,
                                   many=True,
@@ -156,6 +275,7 @@ class ManageQuizzes(APIView):
     serializer_class = models.QuizSerializer
 
     @extend_schema(description="Retrieve a quiz by id.",
+                   parameters=SPARSE_FIELDSET_PARAMETERS,
                    responses={200: models.QuizSerializer})
     def get(self, request, quiz_id: int):
         """Returns the quiz by id."""
@@ -201,20 +321,19 @@ class ManageQuizQuestions(APIView):
     def get(self, _, quiz_id: int, question_id: int):
         """Returns the question by id with correct answer."""
         question = models.QuizQuestion.objects.filter(id=question_id).first()  # pylint: disable=no-member
-        if not question:
-            raise exceptions.NotFound("The requested question does not exist.")
-        if question.quiz != quiz_id:
+        if not question or question.quiz_id != quiz_id:
             raise exceptions.NotFound("The requested question does not exist.")
         return Response(models.QuizQuestionSerializer(question).data)
 
-    @extend_schema(description="Updates a question.",
+    @extend_schema(description="Updates a question of the draft. Students "
+                   "see the change once the quiz is published again.",
                    request=models.CreateQuizQuestionSerializer,
                    responses={200: models.QuizQuestionSerializer})
     def put(self, request, quiz_id: int, question_id: int):
         """Updates a question."""
         # pylint: disable=no-member
         question = models.QuizQuestion.objects.filter(id=question_id).first()
-        if not question or question.quiz != quiz_id:
+        if not question or question.quiz_id != quiz_id:
             raise exceptions.NotFound("The requested question does not exist.")
         question = models.CreateQuizQuestionSerializer(question,
                                                        data=request.data)
@@ -223,43 +342,108 @@ class ManageQuizQuestions(APIView):
             return Response(question.data, status=status.HTTP_200_OK)
         raise exceptions.ValidationError(question.errors)
 
-    @extend_schema(description="Deletes a question.", responses={204: None})
+    @extend_schema(description="Deletes a question from the draft. "
+                   "Questions of published versions are archived.",
+                   responses={204: None})
     def delete(self, _, quiz_id: int, question_id: int):
         """Deletes a question. Requires staff permissions."""
         question = models.QuizQuestion.objects.filter(id=question_id).first()  # pylint: disable=no-member
-        if not question or question.quiz != quiz_id:
+        if not question or question.quiz_id != quiz_id:
             raise exceptions.NotFound("The requested question does not exist.")
-        question.delete()
+        remove_question(question)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ManageQuizVersions(APIView):
+    """List or publish the versions of a quiz."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.QuizVersionSummarySerializer
+
+    @extend_schema(description="List the published versions of a quiz.",
+                   responses={200: models.QuizVersionSummarySerializer(many=True)})
+    def get(self, _, quiz_id: int):
+        """Returns the versions of the quiz, latest first."""
+        # pylint: disable=no-member
+        if not models.Quiz.objects.filter(id=quiz_id).exists():
+            raise exceptions.NotFound("The requested quiz does not exist.")
+        versions = models.QuizVersion.objects.filter(
+            quiz_id=quiz_id).order_by('-number')
+        return Response(
+            models.QuizVersionSummarySerializer(versions, many=True).data)
+
+    @extend_schema(
+        description="Publish the quiz: its questions are frozen into a new "
+        "version that students answer until the next one is published.",
+        request=None,
+        responses={201: models.QuizVersionSummarySerializer})
+    def post(self, request, quiz_id: int):
+        """Publishes the quiz."""
+        quiz = models.Quiz.objects.filter(id=quiz_id).first()  # pylint: disable=no-member
+        if not quiz:
+            raise exceptions.NotFound("The requested quiz does not exist.")
+        try:
+            version = publish(quiz, request.user)
+        except PublishError as pe:
+            raise exceptions.ValidationError(str(pe)) from pe
+        return Response(models.QuizVersionSummarySerializer(version).data,
+                        status=status.HTTP_201_CREATED)
+
+
+class StudentQuizVersion(APIView):
+    """Retrieve a published version of a quiz."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = models.QuizVersionSerializer
+
+    @extend_schema(
+        description="Retrieve a published version of a quiz with correct "
+        "answers excluded. Versions never change and may be cached "
+        "indefinitely; `published_version` of the quiz names the current "
+        "one.",
+        responses={200: models.QuizVersionSerializer})
+    def get(self, request, quiz_id: int, version_id: int):
+        """Returns the frozen version."""
+        visible_quiz_or_404(request.user, quiz_id)
+        try:
+            version = models.QuizVersion.frozen(version_id)
+        except models.QuizVersion.DoesNotExist as dne:  # pylint: disable=no-member
+            raise exceptions.NotFound(
+                "The requested version does not exist.") from dne
+        if version.quiz_id != quiz_id:  # pylint: disable=no-member
+            raise exceptions.NotFound("The requested version does not exist.")
+        response = HttpResponse(version_payload(version_id),
+                                content_type='application/json')
+        patch_cache_control(response,
+                            private=True,
+                            max_age=VERSION_MAX_AGE,
+                            immutable=True)
+        return response
+
+
 class StudentQuizQuestions(APIView):
     """Retrieve all questions for a quiz or submit a question."""
     permission_classes = [IsAuthenticated]
-    serializer_class = models.RestrictedQuizQuestionSerializer
+    serializer_class = models.VersionQuestionSerializer
 
     @extend_schema(
-        description="Retrieve all questions for a quiz.",
-        responses={200: models.RestrictedQuizQuestionSerializer(many=True)})
+        description="Retrieve all questions of the published version of a "
+        "quiz.",
+        responses={200: models.VersionQuestionSerializer(many=True)})
     def get(self, request, quiz_id: int):
         """Returns the list of questions for a quiz."""
-        # pylint: disable=no-member
-        quiz = models.Quiz.objects.filter(id=quiz_id).first()
-        if not quiz:
-            raise exceptions.NotFound("The requested quiz does not exist.")
-        questions = quiz.questions.all()
-        for question in questions:
-            # pylint: disable=no-member
-            response = models.QuizResponse.objects.filter(
-                quiz=quiz, question=question, student=request.user).first()
-            if response:
-                question.response = response.score
+        quiz = visible_quiz_or_404(request.user, quiz_id)
         return Response(
-            models.RestrictedQuizQuestionSerializer(questions,
-                                                    many=True,
-                                                    context={
-                                                        'request': request
-                                                    }).data)
+            models.VersionQuestionSerializer(quiz.student_questions(
+                request.user),
+                                             many=True).data)
+
+
+def version_question_or_404(quiz: models.Quiz, question_id: int) -> dict:
+    """Returns a question of the published version of a quiz, or raises
+        NotFound."""
+    question = quiz.current_version().question(question_id)
+    if question is None:
+        raise exceptions.NotFound("The requested question does not exist.")
+    return question
 
 
 class StudentQuizDetail(APIView):
@@ -269,61 +453,77 @@ class StudentQuizDetail(APIView):
 
     @extend_schema(
         description="Retrieve a question by id with correct answer excluded.",
-        responses={200: models.RestrictedQuizQuestionSerializer})
+        responses={200: models.VersionQuestionSerializer})
     def get(self, request, quiz_id: int, question_id: int):
         """Returns the question by id with correct answer excluded."""
-        # pylint: disable=no-member
-        quiz = models.Quiz.objects.filter(id=quiz_id).first()
-        if not quiz:
-            raise exceptions.NotFound("The requested quiz does not exist.")
-        question = quiz.questions.filter(id=question_id).first()
-        if not question:
-            raise exceptions.NotFound("The requested question does not exist.")
+        quiz = visible_quiz_or_404(request.user, quiz_id)
+        question = version_question_or_404(quiz, question_id)
         # pylint: disable=no-member
         response = models.QuizResponse.objects.filter(
-            quiz=quiz, question=question, student=request.user).first()
+            quiz=quiz, question_id=question_id, student=request.user).first()
         if response:
             return Response(
                 models.QuizResponseSerializer(response,
                                               context={
                                                   'request': request
                                               }).data)
+        # The serializer leaves the correct answer out.
         return Response(
-            models.RestrictedQuizQuestionSerializer(question,
-                                                    context={
-                                                        'request': request
-                                                    }).data)
-
-    @extend_schema(description="Submits an answer to a question.",
-                   request=models.QuizResponseSerializer,
-                   responses={201: models.QuizResponseSerializer})
+            models.VersionQuestionSerializer({
+                **question, 'quiz': quiz.id,
+                'score': None
+            }).data)
+
+    @extend_schema(
+        description="Submits an answer to a question. "
+        "When write-behind buffering is enabled the answer is queued and "
+        "acknowledged with 202, it is saved within a few seconds.",
+        request=models.QuizResponseSerializer,
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+        responses={
+            201: models.QuizResponseSerializer,
+            202: models.QuizResponseSerializer
+        })
+    @idempotent
     def post(self, request, quiz_id: int, question_id: int):
         """Submits an answer to a question."""
-        # pylint: disable=no-member
-        quiz = models.Quiz.objects.filter(id=quiz_id).first()
-        if not quiz:
-            raise exceptions.NotFound("The requested quiz does not exist.")
-        question = quiz.questions.filter(id=question_id).first()
-        if not question:
-            raise exceptions.NotFound("The requested question does not exist.")
+        quiz = visible_quiz_or_404(request.user, quiz_id)
+        question = version_question_or_404(quiz, question_id)
         selected_answer = request.data.get('response')
         if selected_answer is None:
             raise exceptions.ValidationError(
                 "The response field is required to submit an answer.")
-        is_correct = question.check_answer(int(selected_answer))
+        is_correct = int(selected_answer) == question['correct_index']
+        response = models.QuizResponse(
+            quiz=quiz,
+            question_id=question_id,
+            version_id=quiz.published_version_id,
+            score=int(is_correct * question['weight']),
+            student=request.user)
+        if settings.QUIZ_RESPONSE_BUFFER['ENABLED']:
+            try:
+                get_response_buffer().submit(response)
+            except DuplicateResponse as dr:
+                raise exceptions.ValidationError(
+                    "You have already submitted a response to this question."
+                ) from dr
+            return Response(models.QuizResponseSerializer(response,
+                                                          context={
+                                                              'request': request
+                                                          }).data,
+                            status=status.HTTP_202_ACCEPTED)
         try:
-            response = models.QuizResponse(quiz=quiz,
-                                           question=question,
-                                           score=int(is_correct *
-                                                     question.weight),
-                                           student=request.user)
             response.save()
         except IntegrityError as ie:
             raise exceptions.ValidationError(
                 "You have already submitted a response to this question."
             ) from ie
         except Exception as e:
-            print(e)
+            logger.exception("Saving a quiz response failed",
+                             extra={
+                                 'quiz_id': quiz.id,
+                                 'question_id': question_id
+                             })
             raise exceptions.APIException(
                 "An error occurred while processing your request.") from e
         return Response(models.QuizResponseSerializer(response,
@@ -331,3 +531,437 @@ class StudentQuizDetail(APIView):
                                                           'request': request
                                                       }).data,
                         status=status.HTTP_201_CREATED)
+
+
+def leaderboard_or_404(user,
+                       quiz_id: int = None,
+                       class_id: int = None) -> str:
+    """Returns the board name of a quiz or class visible to the user, or
+        raises NotFound."""
+    if quiz_id is not None:
+        visible_quiz_or_404(user, quiz_id)
+        return quiz_board(quiz_id)
+    if not user.is_staff and class_id not in enrolled_class_ids(user.id):
+        raise exceptions.NotFound("The requested class does not exist.")
+    if not Class.objects.filter(id=class_id).exists():  # pylint: disable=no-member
+        raise exceptions.NotFound("The requested class does not exist.")
+    return class_board(class_id)
+
+
+def get_upload_or_404(upload_id: int) -> models.ContentUpload:
+    """Returns the upload session by id or raises NotFound."""
+    upload = models.ContentUpload.objects.filter(id=upload_id).first()  # pylint: disable=no-member
+    if not upload:
+        raise exceptions.NotFound("The requested upload does not exist.")
+    return upload
+
+
+class UploadNotPending(exceptions.APIException):
+    """Raised when an upload step conflicts with the state of the upload."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The upload is no longer pending."
+    default_code = 'upload_not_pending'
+
+
+def upload_error(error: UploadError) -> exceptions.APIException:
+    """Returns the API error of a failed upload step, a conflict when the
+        upload is no longer pending and a validation error otherwise."""
+    if isinstance(error, UploadConflict):
+        return UploadNotPending(str(error))
+    return exceptions.ValidationError(str(error))
+
+
+class ContentUploadsRoot(APIView):
+    """Start a multipart content upload."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.ContentUploadSerializer
+
+    @extend_schema(
+        description="Start a multipart upload of a content file straight "
+        "to object storage. Requires staff permissions.",
+        request=models.CreateContentUploadSerializer,
+        responses={201: models.ContentUploadSerializer})
+    def post(self, request):
+        """Opens an upload session."""
+        data = models.CreateContentUploadSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        try:
+            upload = ContentUploadService().start(request.user,
+                                                  **data.validated_data)
+        except UploadError as ue:
+            raise upload_error(ue) from ue
+        return Response(models.ContentUploadSerializer(upload).data,
+                        status=status.HTTP_201_CREATED)
+
+
+class ContentUploadDetail(APIView):
+    """Retrieve or abort a content upload."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.ContentUploadSerializer
+
+    @extend_schema(
+        description="Retrieve an upload session and its missing parts.",
+        responses={200: models.ContentUploadSerializer})
+    def get(self, _, upload_id: int):
+        """Returns the upload session, used to resume an upload."""
+        return Response(
+            models.ContentUploadSerializer(get_upload_or_404(upload_id)).data)
+
+    @extend_schema(description="Abort an upload session.",
+                   responses={204: None})
+    def delete(self, _, upload_id: int):
+        """Aborts the upload and discards its parts."""
+        try:
+            ContentUploadService().abort(get_upload_or_404(upload_id))
+        except UploadError as ue:
+            raise upload_error(ue) from ue
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ContentUploadParts(APIView):
+    """Issue presigned URLs for upload parts."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.UploadPartUrlsSerializer
+
+    @extend_schema(
+        description="Returns a presigned PUT URL per requested part. "
+        "Parts can be uploaded in parallel.",
+        request=models.UploadPartUrlsSerializer,
+        responses={200: {
+            'type': 'object',
+            'additionalProperties': {
+                'type': 'string'
+            }
+        }})
+    def post(self, request, upload_id: int):
+        """Returns presigned URLs keyed by part number."""
+        data = models.UploadPartUrlsSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        try:
+            urls = ContentUploadService().part_urls(
+                get_upload_or_404(upload_id),
+                data.validated_data['part_numbers'])
+        except UploadError as ue:
+            raise upload_error(ue) from ue
+        return Response(urls)
+
+
+class ContentUploadPartDetail(APIView):
+    """Record an uploaded part."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.ContentUploadPartSerializer
+
+    @extend_schema(
+        description="Records a part once storage accepted it, with the "
+        "ETag storage returned.",
+        request=models.ContentUploadPartSerializer,
+        responses={200: models.ContentUploadPartSerializer})
+    def put(self, request, upload_id: int, part_number: int):
+        """Records the part."""
+        data = models.ContentUploadPartSerializer(data=request.data)
+        data.is_valid(raise_exception=True)
+        try:
+            part = ContentUploadService().record_part(
+                get_upload_or_404(upload_id), part_number,
+                **data.validated_data)
+        except UploadError as ue:
+            raise upload_error(ue) from ue
+        return Response(models.ContentUploadPartSerializer(part).data)
+
+
+class ContentUploadComplete(APIView):
+    """Finalize a content upload."""
+    permission_classes = [IsAdminUser]
+    serializer_class = models.ContentSerializer
+
+    @extend_schema(
+        description="Assembles the uploaded parts and creates the content.",
+        request=None,
+        responses={201: models.ContentSerializer})
+    def post(self, request, upload_id: int):
+        """Completes the upload and returns the new content."""
+        try:
+            content = ContentUploadService().complete(
+                get_upload_or_404(upload_id))
+        except UploadError as ue:
+            raise upload_error(ue) from ue
+        return Response(models.ContentSerializer(content,
+                                                 context={
+                                                     'request': request
+                                                 }).data,
+                        status=status.HTTP_201_CREATED)
+
+
+class LessonsSearch(APIView):
+    """Search lesson content, quizzes and questions."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = models.SearchResultSerializer
+    max_page_size = 100
+
+    @extend_schema(
+        description="Full-text search with prefix matching over content "
+        "titles and descriptions, quiz titles and descriptions and quiz "
+        "questions. Results are ranked by relevance.",
+        parameters=[
+            OpenApiParameter("q", str, required=True,
+                             description="Search terms."),
+            OpenApiParameter(
+                "kind",
+                str,
+                description="Comma separated kinds to search: content, "
+                "quiz, question. Defaults to all."),
+            OpenApiParameter("page", int, description="Page number."),
+            OpenApiParameter("page_size", int,
+                             description="Results per page, up to 100."),
+        ],
+        responses={200: models.SearchResultPageSerializer})
+    def get(self, request):
+        """Returns one page of ranked search results."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise exceptions.ValidationError("The q parameter is required.")
+        kinds = [
+            kind.strip()
+            for kind in request.query_params.get('kind', '').split(',')
+            if kind.strip()
+        ] or list(DOCUMENTS)
+        unknown = set(kinds) - set(DOCUMENTS)
+        if unknown:
+            raise exceptions.ValidationError(
+                f"Unknown kinds: {', '.join(sorted(unknown))}.")
+        try:
+            page = int(request.query_params.get('page', 1))
+            page_size = int(request.query_params.get('page_size', 20))
+        except ValueError as ve:
+            raise exceptions.ValidationError(
+                "page and page_size must be integers.") from ve
+        if page < 1 or not 1 <= page_size <= self.max_page_size:
+            raise exceptions.ValidationError(
+                f"page must be positive and page_size between 1 and "
+                f"{self.max_page_size}.")
+
+        quiz_ids = None if request.user.is_staff else set(
+            models.Quiz.visible_to(request.user).values_list('id', flat=True))
+        count, hits = get_search_backend().search(query, kinds,
+                                                  (page - 1) * page_size,
+                                                  page_size, quiz_ids)
+        return Response(
+            models.SearchResultPageSerializer({
+                'count': count,
+                'page': page,
+                'page_size': page_size,
+                'results': hits
+            }).data)
+
+
+def changes_schema(name: str, serializer) -> serializers.Serializer:
+    """Describes the changes of one kind in the delta sync response."""
+    return inline_serializer(
+        name, {
+            'updated': serializer,
+            'deleted': serializers.ListField(child=serializers.IntegerField())
+        })
+
+
+class LessonsChanges(APIView):
+    """Delta sync of lesson content, quizzes and questions."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        description="Lists content, quizzes and questions created, updated "
+        "or deleted since the token of a previous sync. Without a token, "
+        "with one too old to list every deletion, or with one issued before "
+        "the user joined or left a class, returns a full snapshot and sets "
+        "`reset`.",
+        parameters=[
+            OpenApiParameter("since",
+                             str,
+                             description="Token returned by the last sync.")
+        ],
+        responses={
+            200:
+            inline_serializer(
+                'LessonChanges', {
+                    'token':
+                    serializers.CharField(),
+                    'reset':
+                    serializers.BooleanField(),
+                    'content':
+                    changes_schema('ContentChanges',
+                                   models.ContentSerializer(many=True)),
+                    'quizzes':
+                    changes_schema('QuizChanges',
+                                   models.QuizSerializer(many=True)),
+                    'questions':
+                    changes_schema(
+                        'QuestionChanges',
+                        models.SyncQuizQuestionSerializer(many=True)),
+                })
+        })
+    def get(self, request):
+        """Returns the changes since the given token."""
+        try:
+            return Response(
+                changes_since(request.query_params.get('since'),
+                              request.user))
+        except InvalidToken as it:
+            raise exceptions.ValidationError(str(it)) from it
+
+
+class ResponseBufferMetrics(APIView):
+    """Metrics of the quiz response write-behind buffer."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        description="Returns the depth of the quiz response queue, the age "
+        "in seconds of its oldest response and the flush and failure "
+        "counters.",
+        responses={
+            200:
+            inline_serializer(
+                'ResponseBufferMetrics', {
+                    'enabled': serializers.BooleanField(),
+                    'backend': serializers.CharField(),
+                    'depth': serializers.IntegerField(),
+                    'lag_seconds': serializers.FloatField(),
+                    'flushed': serializers.IntegerField(),
+                    'last_flush_at': serializers.DateTimeField(allow_null=True),
+                    'failed': serializers.IntegerField(),
+                    'last_failure_at':
+                    serializers.DateTimeField(allow_null=True),
+                })
+        })
+    def get(self, request):
+        """Returns the response buffer metrics."""
+        return Response({
+            'enabled': settings.QUIZ_RESPONSE_BUFFER['ENABLED'],
+            **get_response_buffer().metrics()
+        })
+
+
+class SingleFlightMetrics(APIView):
+    """Metrics of the single-flight reads of hot quizzes and content."""
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        description="Returns, over all processes, the shared reads computed, "
+        "the requests coalesced onto a read already in flight, the reads "
+        "that waited for another process and those that timed out waiting.",
+        responses={
+            200:
+            inline_serializer(
+                'SingleFlightMetrics', {
+                    metric: serializers.IntegerField()
+                    for metric in coalescing.METRICS
+                })
+        })
+    def get(self, request):
+        """Returns the single-flight metrics."""
+        return Response(coalescing.metrics())
+
+
+class Leaderboard(APIView):
+    """Top students of a quiz or class leaderboard."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = models.LeaderboardSerializer
+
+    @extend_schema(
+        description="Returns the students with the most points on a quiz, "
+        "or on every quiz of a class, best first.",
+        parameters=[
+            OpenApiParameter("limit",
+                             int,
+                             description="Number of students, up to 100.")
+        ],
+        responses={200: models.LeaderboardSerializer})
+    def get(self, request, quiz_id: int = None, class_id: int = None):
+        """Returns the top of the leaderboard."""
+        board = leaderboard_or_404(request.user, quiz_id, class_id)
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError as ve:
+            raise exceptions.ValidationError(
+                "limit must be an integer.") from ve
+        max_limit = settings.LEADERBOARDS['MAX_LIMIT']
+        if not 1 <= limit <= max_limit:
+            raise exceptions.ValidationError(
+                f"limit must be between 1 and {max_limit}.")
+        size, entries = get_leaderboards().top(board, limit)
+        # pylint: disable=no-member
+        usernames = dict(
+            User.objects.filter(id__in=[student for student, _ in entries
+                                        ]).values_list('id', 'username'))
+        return Response(
+            models.LeaderboardSerializer({
+                'size':
+                size,
+                'results': [{
+                    'rank': rank,
+                    'student': student,
+                    'username': usernames.get(student, ''),
+                    'points': points
+                } for rank, (student, points) in enumerate(entries, 1)]
+            }).data)
+
+
+class LeaderboardRank(APIView):
+    """Rank of the current user on a quiz or class leaderboard."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = models.LeaderboardRankSerializer
+
+    @extend_schema(description="Returns the rank and points of the current "
+                   "user on a quiz, or on every quiz of a class.",
+                   responses={200: models.LeaderboardRankSerializer})
+    def get(self, request, quiz_id: int = None, class_id: int = None):
+        """Returns the rank of the current user."""
+        board = leaderboard_or_404(request.user, quiz_id, class_id)
+        rank, points, size = get_leaderboards().rank(board, request.user.id)
+        return Response(
+            models.LeaderboardRankSerializer({
+                'rank': None if rank is None else rank + 1,
+                'points': points,
+                'size': size
+            }).data)
+
+
+class ContentProgress(APIView):
+    """Playback progress of video and audio content."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = models.PlaybackProgressSerializer
+
+    @staticmethod
+    def check_playable(content_id: int):
+        """Raises unless the content is video or audio."""
+        content_format_value = content_format(content_id)
+        if content_format_value is None:
+            raise exceptions.NotFound("The requested content does not exist.")
+        if content_format_value not in PLAYABLE:
+            raise exceptions.ValidationError(
+                "Progress is only tracked for video and audio content.")
+
+    @extend_schema(description="Returns the latest playback position of the "
+                   "current user.",
+                   responses={200: models.PlaybackProgressSerializer})
+    def get(self, request, content_id: int):
+        """Returns the latest playback position."""
+        self.check_playable(content_id)
+        progress = get_progress_tracker().get(request.user.id, content_id)
+        if progress is None:
+            raise exceptions.NotFound("No progress recorded for this content.")
+        return Response(models.PlaybackProgressSerializer(progress).data)
+
+    @extend_schema(
+        description="Heartbeat from the player with the current position. "
+        "The position is readable at once and saved to the database "
+        "periodically.",
+        request=models.PlaybackProgressSerializer,
+        responses={200: models.PlaybackProgressSerializer})
+    def put(self, request, content_id: int):
+        """Records the current playback position."""
+        self.check_playable(content_id)
+        serializer = models.PlaybackProgressSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        progress = get_progress_tracker().heartbeat(
+            request.user.id, content_id,
+            serializer.validated_data['position'])
+        return Response(models.PlaybackProgressSerializer(progress).data)